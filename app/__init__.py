@@ -1,15 +1,37 @@
 import os
+
+# Açılış ölçümü açıksa import'lar bundan sonra ölçülür; diğer import'lardan önce kalmalı.
+from startup_profile import finish_startup_profile, startup_step
+
 from flask import Flask
-from flask import session
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import datetime
 
-from database import get_db_path, init_db
+from assets import init_assets
+from cart_store import cart_count, init_cart_store
+from database import get_db_path, init_db, init_db_app
+from fragment_cache import init_fragment_cache
+from http_cache import init_http_cache
+from image_variants import init_image_helpers
+from metrics import init_metrics
+from request_profile import init_request_profile
+from reservations import start_reaper
+from sales_stats import bootstrap_sales_stats
+from upload_queue import init_upload_queue
+from upload_store import init_upload_store
 from app.routes.admin import admin_bp
 from app.routes.client import client_bp
 
 
 def create_app():
-    app = Flask(__name__, template_folder="templates", static_folder="static")
+    with startup_step("flask"):
+        app = Flask(__name__, template_folder="templates", static_folder="static")
+
+    # Render'da istekler bir proxy üzerinden gelir; istemci IP'si X-Forwarded-For'dan okunur.
+    # Proxy'siz çalışırken bu başlığa güvenilmez (PROXY_FIX_HOPS=0).
+    proxy_hops = int(os.environ.get("PROXY_FIX_HOPS", "1" if os.environ.get("RENDER") else "0"))
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
 
     # Güvenlik: gerçek projede bunu environment değişkeni ile yönetmek gerekir.
     app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-key-change-me")
@@ -17,12 +39,44 @@ def create_app():
     # DB konumu
     app.config["DB_PATH"] = get_db_path(os.environ.get("DB_PATH"))
 
+    # Bağlantı havuzu ve istek sonunda bağlantıların havuza iadesi.
+    with startup_step("db_pool"):
+        init_db_app(app)
+
+    # REQUEST_PROFILE=1 ise her isteğin SQL/şablon süreleri ölçülür (Server-Timing, /admin/debug/requests).
+    with startup_step("request_profile"):
+        init_request_profile(app)
+
     # İlk açılışta tabloları oluştur.
-    init_db(app.config["DB_PATH"])
+    # Şema güncelse tek PRAGMA okumasıyla geçilir; yalnızca migration çalıştıysa satış özetleri kontrol edilir.
+    with startup_step("migrations"):
+        if init_db(app.config["DB_PATH"]):
+            bootstrap_sales_stats(app.config["DB_PATH"])
+    with startup_step("reservations"):
+        start_reaper(app.config["DB_PATH"])
+
+    # Sepet içeriği sunucuda; cookie'de yalnızca sepet id'si.
+    with startup_step("cart_store"):
+        init_cart_store(app)
+
+    # Statik dosyalar içerik hash'iyle sürümlenir ve uzun süre cache'lenir.
+    with startup_step("assets"):
+        init_assets(app)
+        init_image_helpers(app)
+        init_fragment_cache(app)
+        init_upload_store(app)
+        init_http_cache(app)
+    with startup_step("upload_queue"):
+        init_upload_queue(app)
+
+    # İstek süreleri, checkout sonuçları ve cache oranları /admin/metrics'te.
+    with startup_step("metrics"):
+        init_metrics(app)
 
     # Blueprint kayıtları
-    app.register_blueprint(client_bp)
-    app.register_blueprint(admin_bp)
+    with startup_step("blueprints"):
+        app.register_blueprint(client_bp)
+        app.register_blueprint(admin_bp)
 
     @app.template_filter('datetime_tr')
     def datetime_tr_filter(date_str):
@@ -45,17 +99,7 @@ def create_app():
     @app.context_processor
     def inject_globals():
         # Template'lerde navbar sepet sayacı için.
-        cart = session.get("cart", [])
-        cart_count = 0
-        if isinstance(cart, list):
-            for it in cart:
-                try:
-                    cart_count += int(it.get("qty", 1))
-                except Exception:
-                    cart_count += 1
-        
-        # Cache-busting için timestamp
-        import time
-        return {"cart_count": cart_count, "cache_bust": int(time.time())}
+        return {"cart_count": cart_count()}
 
+    finish_startup_profile()
     return app
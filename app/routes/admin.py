@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import os
-import uuid
+from datetime import date, datetime, timedelta
 from functools import wraps
 
 from flask import (
     Blueprint,
+    abort,
     current_app,
     flash,
     redirect,
@@ -14,16 +15,18 @@ from flask import (
     session,
     url_for,
 )
-from werkzeug.security import check_password_hash, generate_password_hash
-from werkzeug.utils import secure_filename
+from werkzeug.security import generate_password_hash
 
-from database import execute, execute_many, fetch_all, fetch_one, now_str
-
-
-def get_upload_dir():
-    """Static folder döner"""
-    static_folder = current_app.static_folder
-    return os.path.join(static_folder, "images")
+from catalog_cache import invalidate_catalog
+from catalog_search import RANK_SQL, build_match_query
+from database import execute, execute_many, fetch_all, fetch_one, now_str, tr_day_bounds, tr_now
+from image_variants import is_local_image, schedule_variants
+from metrics import metrics_response
+from pagination import InvalidCursorError, date_range_bounds, fetch_keyset_page
+from request_profile import get_profile, profiling_enabled, query_plan, recent_profiles
+from sales_stats import sales_report
+from upload_queue import enqueue_uploads
+from upload_store import UnsupportedImageError, save_upload
 
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
@@ -31,12 +34,14 @@ admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
 ROAST_TYPES = ["Açık", "Orta", "Koyu"]
 ORDER_STATUSES = ["alındı", "hazırlanıyor", "hazır", "teslim edildi"]
+# "!= 'teslim edildi'" index kullanamaz; aktif durumlar açıkça listelenir.
+ACTIVE_ORDER_STATUSES = [s for s in ORDER_STATUSES if s != "teslim edildi"]
 
 
 _ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "admin")
 # Varsayılan şifre: admin123 (yalnızca demo amaçlı)
 _ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "admin123")
-_ADMIN_PASSWORD_HASH = generate_password_hash(_ADMIN_PASSWORD)
+_ADMIN_PASSWORD_HASH: str | None = None
 
 
 def _admin_username() -> str:
@@ -44,6 +49,10 @@ def _admin_username() -> str:
 
 
 def _admin_password_hash() -> str:
+    # Hash bilerek yavaştır (scrypt); her açılışta değil, ilk giriş denemesinde üretilir.
+    global _ADMIN_PASSWORD_HASH
+    if _ADMIN_PASSWORD_HASH is None:
+        _ADMIN_PASSWORD_HASH = generate_password_hash(_ADMIN_PASSWORD)
     return _ADMIN_PASSWORD_HASH
 
 
@@ -57,30 +66,30 @@ def admin_required(view_func):
     return wrapper
 
 
+# Dashboard sorguları; query_plans.py bunların index kullandığını doğrular.
+DASHBOARD_TODAY_SQL = """
+SELECT COUNT(*) AS c, COALESCE(SUM(total_amount), 0) AS revenue
+FROM orders
+WHERE created_at >= ? AND created_at < ?
+"""
+# IN (...) + ORDER BY created_at geçici B-tree'de sıralama ister; her durum
+# (status, created_at) index'inden zaten sıralı okunur ve birleştirilir.
+DASHBOARD_ACTIVE_SQL = (
+    " UNION ALL ".join("SELECT * FROM orders WHERE status = ?" for _ in ACTIVE_ORDER_STATUSES)
+    + " ORDER BY created_at DESC"
+)
+
+
 @admin_bp.route("/")
 def dashboard():
     db_path = current_app.config["DB_PATH"]
 
-    daily_count = fetch_one(
-        db_path,
-        "SELECT COUNT(*) AS c FROM orders WHERE date(created_at)=date('now','localtime')",
-    )["c"]
-
-    daily_revenue_row = fetch_one(
-        db_path,
-        """
-        SELECT COALESCE(SUM(oi.price), 0) AS revenue
-        FROM orders o
-        JOIN order_items oi ON oi.order_id = o.id
-        WHERE date(o.created_at)=date('now','localtime')
-        """,
-    )
-    daily_revenue = float(daily_revenue_row["revenue"])
+    # Gün sınırları created_at ile aynı saat diliminde (TR) hesaplanır.
+    today = fetch_one(db_path, DASHBOARD_TODAY_SQL, tr_day_bounds())
+    daily_count = today["c"]
+    daily_revenue = float(today["revenue"])
 
-    active_orders = fetch_all(
-        db_path,
-        "SELECT * FROM orders WHERE status != 'teslim edildi' ORDER BY created_at DESC",
-    )
+    active_orders = fetch_all(db_path, DASHBOARD_ACTIVE_SQL, tuple(ACTIVE_ORDER_STATUSES))
 
     return render_template(
         "admin/dashboard.html",
@@ -90,10 +99,6 @@ def dashboard():
     )
 
 
-
-
-
-
 @admin_bp.route("/products")
 def products_list():
     db_path = current_app.config["DB_PATH"]
@@ -104,22 +109,26 @@ def products_list():
     where = []
     params: list[object] = []
 
-    if q:
-        where.append("name LIKE ?")
-        params.append(f"%{q}%")
+    match = build_match_query(q)
+    if match:
+        where.append("products_fts MATCH ?")
+        params.append(match)
 
     if roast_type in ROAST_TYPES:
-        where.append("roast_type = ?")
+        where.append("p.roast_type = ?")
         params.append(roast_type)
 
     if active in ("0", "1"):
-        where.append("is_active = ?")
+        where.append("p.is_active = ?")
         params.append(int(active))
 
-    sql = "SELECT * FROM products"
+    if match:
+        sql = "SELECT p.* FROM products_fts JOIN products p ON p.id = products_fts.rowid"
+    else:
+        sql = "SELECT p.* FROM products p"
     if where:
         sql += " WHERE " + " AND ".join(where)
-    sql += " ORDER BY id DESC"
+    sql += f" ORDER BY {RANK_SQL}, p.id DESC" if match else " ORDER BY p.id DESC"
 
     products = fetch_all(db_path, sql, tuple(params))
     return render_template(
@@ -198,15 +207,17 @@ def products_new_post():
 
     image_path = (request.form.get("image_path") or "").strip() or None
 
-    # İsteğe bağlı: dosya upload
+    # İsteğe bağlı: dosya upload (ürün yazılmadan önce; geçersiz dosyada hiçbir şey kaydedilmez)
     file = request.files.get("image_file")
-    if file and file.filename:
-        filename = secure_filename(file.filename)
-        save_dir = get_upload_dir()
-        os.makedirs(save_dir, exist_ok=True)
-        file_path = os.path.join(save_dir, filename)
-        file.save(file_path)
-        image_path = f"images/{filename}"
+    try:
+        if file and file.filename:
+            image_path = save_upload(file, current_app.static_folder)
+        gallery_paths = [
+            save_upload(f, current_app.static_folder) for f in request.files.getlist("gallery_files") if f and f.filename
+        ]
+    except UnsupportedImageError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("admin.products_new"))
 
     product_id = execute(
         db_path,
@@ -241,19 +252,7 @@ def products_new_post():
         ),
     )
 
-    gallery_files = request.files.getlist("gallery_files")
-    rows = []
-    sort_order = 0
-    for f in gallery_files:
-        if not f or not f.filename:
-            continue
-        original = secure_filename(f.filename)
-        filename = f"{uuid.uuid4().hex}_{original}" if original else f"{uuid.uuid4().hex}.jpg"
-        save_dir = get_upload_dir()
-        os.makedirs(save_dir, exist_ok=True)
-        f.save(os.path.join(save_dir, filename))
-        rows.append((product_id, f"images/{filename}", sort_order, now_str()))
-        sort_order += 1
+    rows = [(product_id, path, sort_order, now_str()) for sort_order, path in enumerate(gallery_paths)]
 
     if rows:
         execute_many(
@@ -265,6 +264,13 @@ def products_new_post():
             rows,
         )
 
+    # Vitrin için küçük WebP/JPEG kopyalar arka planda üretilir.
+    uploaded = ([image_path] if file and file.filename else []) + [r[1] for r in rows]
+    schedule_variants(uploaded)
+    # CDN'e yükleme arka planda; bitene kadar yerel adres kullanılır.
+    enqueue_uploads(uploaded)
+
+    invalidate_catalog(db_path)
     flash("Ürün eklendi.", "success")
     return redirect(url_for("admin.products_list"))
 
@@ -331,14 +337,28 @@ def products_edit(product_id: int):
             return redirect(url_for("admin.products_edit", product_id=product_id))
 
         image_path = (request.form.get("image_path") or "").strip() or None
+        # Form açıkken arka plandaki CDN yüklemesi image_path'i değiştirmiş olabilir;
+        # kullanıcı alanı değiştirmediyse eski yerel yol geri yazılmaz.
+        image_path_changed = image_path != ((request.form.get("image_path_original") or "").strip() or None)
 
-        # Ürünü güncelle
+        # Görseller ürün güncellenmeden önce kaydedilir; geçersiz dosyada hiçbir şey değişmez.
+        try:
+            image_rows = [
+                (product_id, save_upload(image, current_app.static_folder), i + 1, now_str())
+                for i, image in enumerate(request.files.getlist("images"))
+                if image and image.filename
+            ]
+        except UnsupportedImageError as e:
+            flash(str(e), "danger")
+            return redirect(url_for("admin.products_edit", product_id=product_id))
+
+        # Ürünü güncelle (updated_at trigger'la, milisaniyeli UTC olarak yazılır)
         execute(
             db_path,
-            """
+            f"""
             UPDATE products SET name=?, description=?, roast_type=?, price_250=?, price_500=?, price_1000=?,
-            stock_gram=?, origin=?, process=?, tasting_notes=?, sweetness=?, espresso_compatible=?, image_path=?,
-            updated_at=CURRENT_TIMESTAMP
+            stock_gram=?, origin=?, process=?, tasting_notes=?, sweetness=?, espresso_compatible=?
+            {", image_path=?" if image_path_changed else ""}
             WHERE id=?
             """,
             (
@@ -354,32 +374,27 @@ def products_edit(product_id: int):
                 tasting_notes,
                 sweetness,
                 espresso_compatible,
-                image_path,
+                *([image_path] if image_path_changed else []),
                 product_id,
             ),
         )
-
-        # Görselleri işle
-        images = request.files.getlist("images")
-        if images:
-            rows = []
-            for i, image in enumerate(images):
-                if image and image.filename:
-                    filename = secure_filename(image.filename)
-                    image_path = f"images/{filename}"
-                    image.save(os.path.join(current_app.static_folder, image_path))
-                    rows.append((product_id, image_path, i + 1, now_str()))
-
-            if rows:
-                execute_many(
-                    db_path,
-                    """
-                    INSERT INTO product_images (product_id, image_path, sort_order, created_at)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    rows,
-                )
-
+        # Elle girilen yerel yol da CDN'e gider; daha önce yüklenmişse adres hemen değiştirilir.
+        if image_path_changed and is_local_image(image_path):
+            enqueue_uploads([image_path])
+
+        if image_rows:
+            execute_many(
+                db_path,
+                """
+                INSERT INTO product_images (product_id, image_path, sort_order, created_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                image_rows,
+            )
+            schedule_variants([r[1] for r in image_rows])
+            enqueue_uploads([r[1] for r in image_rows])
+
+        invalidate_catalog(db_path)
         flash("Ürün güncellendi.", "success")
         return redirect(url_for("admin.products_list"))
 
@@ -402,14 +417,45 @@ def products_edit(product_id: int):
 def product_image_delete(product_id: int, image_id: int):
     db_path = current_app.config["DB_PATH"]
     execute(db_path, "DELETE FROM product_images WHERE id=? AND product_id=?", (image_id, product_id))
+    invalidate_catalog(db_path)
     flash("Görsel kaldırıldı.", "success")
     return redirect(url_for("admin.products_edit", product_id=product_id))
 
 
+def _keyset_page(*args, **kwargs):
+    # Elle değiştirilmiş imleç istemci hatasıdır; ilk sayfaya sessizce dönülmez.
+    try:
+        return fetch_keyset_page(*args, after=request.args.get("after"), before=request.args.get("before"), **kwargs)
+    except InvalidCursorError:
+        abort(400)
+
+
 @admin_bp.route("/stock-movements")
 def stock_movements():
     db_path = current_app.config["DB_PATH"]
-    movements = fetch_all(
+    date_from = (request.args.get("date_from") or "").strip()
+    date_to = (request.args.get("date_to") or "").strip()
+    try:
+        product_id = int(request.args.get("product_id") or 0)
+    except ValueError:
+        product_id = 0
+
+    where = []
+    params: list[object] = []
+
+    if product_id:
+        where.append("sm.product_id = ?")
+        params.append(product_id)
+
+    start, end = date_range_bounds(date_from, date_to)
+    if start:
+        where.append("sm.created_at >= ?")
+        params.append(start)
+    if end:
+        where.append("sm.created_at < ?")
+        params.append(end)
+
+    page = _keyset_page(
         db_path,
         """
         SELECT
@@ -423,11 +469,26 @@ def stock_movements():
             sm.created_at
         FROM stock_movements sm
         JOIN products p ON p.id = sm.product_id
-        ORDER BY sm.created_at DESC, sm.id DESC
-        LIMIT 200
         """,
+        where,
+        params,
+        order_col="sm.created_at",
+        id_col="sm.id",
+    )
+
+    products = fetch_all(db_path, "SELECT id, name FROM products ORDER BY name ASC")
+    filters = {"product_id": product_id or "", "date_from": date_from, "date_to": date_to}
+    filters = {k: v for k, v in filters.items() if v}
+    return render_template(
+        "admin/stock_movements.html",
+        movements=page.rows,
+        page=page,
+        filters=filters,
+        products=products,
+        product_id=product_id,
+        date_from=date_from,
+        date_to=date_to,
     )
-    return render_template("admin/stock_movements.html", movements=movements)
 
 
 @admin_bp.route("/products/<int:product_id>/delete")
@@ -437,6 +498,7 @@ def products_delete(product_id: int):
     # Siparişlerde kullanılan ürünleri silmek FK nedeniyle engellenir; bu durumda pasif yapabilirsiniz.
     try:
         execute(db_path, "DELETE FROM products WHERE id=?", (product_id,))
+        invalidate_catalog(db_path)
         flash("Ürün silindi.", "success")
     except Exception:
         flash("Ürün silinemedi. Siparişlerde kullanılmış olabilir; pasif yapmayı deneyin.", "danger")
@@ -454,6 +516,7 @@ def products_toggle(product_id: int):
 
     new_state = 0 if int(product["is_active"]) == 1 else 1
     execute(db_path, "UPDATE products SET is_active=? WHERE id=?", (new_state, product_id))
+    invalidate_catalog(db_path)
     flash("Ürün durumu güncellendi.", "success")
     return redirect(url_for("admin.products_list"))
 
@@ -463,29 +526,70 @@ def orders_list():
     db_path = current_app.config["DB_PATH"]
     status = (request.args.get("status") or "").strip()
     selected_status = status if status in ORDER_STATUSES else ""
+    date_from = (request.args.get("date_from") or "").strip()
+    date_to = (request.args.get("date_to") or "").strip()
 
     where = []
     params: list[object] = []
 
+    # (status, created_at) ve (created_at) index'leri sıralamayı da karşılar.
     if selected_status:
         where.append("o.status = ?")
         params.append(selected_status)
 
-    sql = (
-        "SELECT o.*, COALESCE(SUM(oi.price), 0) AS total "
-        "FROM orders o "
-        "LEFT JOIN order_items oi ON oi.order_id = o.id "
+    start, end = date_range_bounds(date_from, date_to)
+    if start:
+        where.append("o.created_at >= ?")
+        params.append(start)
+    if end:
+        where.append("o.created_at < ?")
+        params.append(end)
+
+    page = _keyset_page(
+        db_path,
+        "SELECT o.*, o.total_amount AS total FROM orders o",
+        where,
+        params,
+        order_col="o.created_at",
+        id_col="o.id",
     )
-    if where:
-        sql += "WHERE " + " AND ".join(where) + " "
-    sql += "GROUP BY o.id ORDER BY o.created_at DESC"
 
-    orders = fetch_all(db_path, sql, tuple(params))
+    filters = {"status": selected_status, "date_from": date_from, "date_to": date_to}
+    filters = {k: v for k, v in filters.items() if v}
     return render_template(
         "admin/orders_list.html",
-        orders=orders,
+        orders=page.rows,
+        page=page,
+        filters=filters,
         statuses=ORDER_STATUSES,
         selected_status=selected_status,
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+
+@admin_bp.route("/reports/sales")
+def sales_report_view():
+    db_path = current_app.config["DB_PATH"]
+
+    def _day(key: str, default: date) -> date:
+        try:
+            return datetime.strptime((request.args.get(key) or "").strip(), "%Y-%m-%d").date()
+        except ValueError:
+            return default
+
+    today = tr_now().date()
+    day_to = _day("date_to", today)
+    day_from = _day("date_from", day_to - timedelta(days=29))
+    if day_from > day_to:
+        day_from, day_to = day_to, day_from
+
+    report = sales_report(db_path, day_from.isoformat(), day_to.isoformat())
+    return render_template(
+        "admin/sales_report.html",
+        report=report,
+        date_from=day_from.isoformat(),
+        date_to=day_to.isoformat(),
     )
 
 
@@ -506,14 +610,13 @@ def orders_detail(order_id: int):
             p.name AS product_name,
             oi.grind_type,
             oi.gram,
-            COUNT(*) AS qty,
+            oi.quantity AS qty,
             oi.price AS unit_price,
-            (COUNT(*) * oi.price) AS subtotal
+            (oi.quantity * oi.price) AS subtotal
         FROM order_items oi
         JOIN products p ON p.id = oi.product_id
         WHERE oi.order_id=?
-        GROUP BY oi.product_id, p.name, oi.grind_type, oi.gram, oi.price
-        ORDER BY p.name ASC
+        ORDER BY p.name ASC, oi.id ASC
         """,
         (order_id,),
     )
@@ -546,14 +649,13 @@ def orders_print(order_id: int):
             p.name AS product_name,
             oi.grind_type,
             oi.gram,
-            COUNT(*) AS qty,
+            oi.quantity AS qty,
             oi.price AS unit_price,
-            (COUNT(*) * oi.price) AS subtotal
+            (oi.quantity * oi.price) AS subtotal
         FROM order_items oi
         JOIN products p ON p.id = oi.product_id
         WHERE oi.order_id=?
-        GROUP BY oi.product_id, p.name, oi.grind_type, oi.gram, oi.price
-        ORDER BY p.name ASC
+        ORDER BY p.name ASC, oi.id ASC
         """,
         (order_id,),
     )
@@ -579,3 +681,34 @@ def orders_update_status(order_id: int):
     execute(db_path, "UPDATE orders SET status=? WHERE id=?", (status, order_id))
     flash("Sipariş durumu güncellendi.", "success")
     return redirect(url_for("admin.orders_detail", order_id=order_id))
+
+
+@admin_bp.route("/debug/requests")
+@admin_bp.route("/debug/requests/<int:profile_id>")
+def debug_requests(profile_id: int | None = None):
+    # Profil kapalıyken sayfa hiç yokmuş gibi davranır.
+    if not profiling_enabled(current_app):
+        abort(404)
+
+    selected = None
+    plans = []
+    if profile_id is not None:
+        selected = get_profile(profile_id)
+        if selected is None:
+            flash("Bu istek artık geçmişte yok.", "warning")
+            return redirect(url_for("admin.debug_requests"))
+        db_path = current_app.config["DB_PATH"]
+        plans = [(s, query_plan(db_path, s)) for s in selected.slowest()]
+
+    return render_template(
+        "admin/debug_requests.html",
+        profiles=recent_profiles(),
+        selected=selected,
+        plans=plans,
+    )
+
+
+@admin_bp.route("/metrics")
+def metrics():
+    # Prometheus metin formatı; METRICS_DIR varsa tüm worker'ların toplamı.
+    return metrics_response()
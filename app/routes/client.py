@@ -1,12 +1,12 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from typing import Any
 
 from flask import (
     Blueprint,
     current_app,
     flash,
+    make_response,
     redirect,
     render_template,
     request,
@@ -14,7 +14,21 @@ from flask import (
     url_for,
 )
 
-from database import execute, fetch_all, fetch_one, now_str
+from cart_store import attach_phone, current_cart_id, load_cart, recover_cart, recovery_allowed, save_cart
+from catalog_cache import (
+    get_active_products,
+    get_best_sellers,
+    get_new_arrivals,
+    get_product,
+    get_product_gallery,
+    invalidate_catalog,
+)
+from catalog_search import RANK_SQL, build_match_query
+from checkout import StockShortageError, place_order, required_grams_by_product
+from database import fetch_all, fetch_one, is_busy_error
+from http_cache import apply_validators, not_modified, page_validators
+from metrics import record_checkout
+from reservations import held_grams_by_product, release, reserve
 
 
 client_bp = Blueprint("client", __name__)
@@ -41,15 +55,17 @@ def _normalize_phone(phone: str) -> str | None:
 
 
 def _get_cart() -> list[dict[str, Any]]:
-    cart = session.get("cart")
+    cart = load_cart()
     if not isinstance(cart, list):
         cart = []
     return cart
 
 
 def _save_cart(cart: list[dict[str, Any]]):
-    session["cart"] = cart
-    session.modified = True
+    save_cart(cart)
+    # Sepet değişti; checkout'ta yapılan ayırmalar artık geçerli değil.
+    if session.pop("holding", None):
+        release(current_app.config["DB_PATH"], current_cart_id())
 
 
 def _product_price_by_gram(product_row, gram: int) -> float | None:
@@ -77,43 +93,26 @@ def home():
     best_sellers = []
     new_arrivals = []
     if show_landing:
-        best_sellers = fetch_all(
-            db_path,
-            """
-            SELECT p.*, COUNT(oi.id) AS sold_count
-            FROM products p
-            JOIN order_items oi ON oi.product_id = p.id
-            JOIN orders o ON o.id = oi.order_id
-            WHERE p.is_active=1
-            GROUP BY p.id
-            ORDER BY sold_count DESC, p.id DESC
-            LIMIT 4
-            """,
-        )
-        new_arrivals = fetch_all(
-            db_path,
-            "SELECT * FROM products WHERE is_active=1 ORDER BY id DESC LIMIT 4",
-        )
+        best_sellers = get_best_sellers(db_path, 4)
+        new_arrivals = get_new_arrivals(db_path, 4)
 
-    where = ["is_active=1"]
+    where = ["p.is_active=1"]
     params: list[object] = []
 
-    if q:
-        where.append("name LIKE ?")
-        params.append(f"%{q}%")
+    # Metin araması (isim/açıklama/menşei...) FTS5 index'i üzerinden yapılır.
+    match = build_match_query(q, origin)
+    if match:
+        where.append("products_fts MATCH ?")
+        params.append(match)
 
     if roast_type in ("Açık", "Orta", "Koyu"):
-        where.append("roast_type = ?")
+        where.append("p.roast_type = ?")
         params.append(roast_type)
     else:
         roast_type = ""
 
-    if origin:
-        where.append("origin LIKE ?")
-        params.append(f"%{origin}%")
-
     if espresso in ("1", "on", "true"):
-        where.append("espresso_compatible = 1")
+        where.append("p.espresso_compatible = 1")
         espresso = "1"
     else:
         espresso = ""
@@ -127,19 +126,31 @@ def home():
     min_p = _pf(min_price) if min_price else None
     max_p = _pf(max_price) if max_price else None
     if min_p is not None:
-        where.append("price_250 >= ?")
+        where.append("p.price_250 >= ?")
         params.append(min_p)
     if max_p is not None:
-        where.append("price_250 <= ?")
+        where.append("p.price_250 <= ?")
         params.append(max_p)
 
-    sql = "SELECT * FROM products"
-    if where:
+    if match:
+        sql = "SELECT p.* FROM products_fts JOIN products p ON p.id = products_fts.rowid"
         sql += " WHERE " + " AND ".join(where)
-    sql += " ORDER BY id DESC"
+        sql += f" ORDER BY {RANK_SQL}, p.id DESC"
+        products = fetch_all(db_path, sql, tuple(params))
+    elif len(where) > 1:
+        sql = "SELECT p.* FROM products p WHERE " + " AND ".join(where) + " ORDER BY p.id DESC"
+        products = fetch_all(db_path, sql, tuple(params))
+    else:
+        # Filtresiz liste tüm ziyaretçiler için aynı; cache'ten gelir.
+        products = get_active_products(db_path)
 
-    products = fetch_all(db_path, sql, tuple(params))
-    return render_template(
+    held = held_grams_by_product(db_path, current_cart_id())
+    validators = page_validators("home", [*best_sellers, *new_arrivals, *products], held)
+    cached = not_modified(validators)
+    if cached is not None:
+        return cached
+
+    html = render_template(
         "client/home.html",
         products=products,
         gram_options=GRAM_OPTIONS,
@@ -153,22 +164,27 @@ def home():
         show_landing=show_landing,
         best_sellers=best_sellers,
         new_arrivals=new_arrivals,
+        held=held,
     )
+    return apply_validators(make_response(html), validators)
 
 
 @client_bp.route("/product/<int:product_id>")
 def product_detail(product_id: int):
     db_path = current_app.config["DB_PATH"]
-    product = fetch_one(db_path, "SELECT * FROM products WHERE id=?", (product_id,))
+    product = get_product(db_path, product_id)
     if not product or int(product["is_active"]) != 1:
         flash("Ürün bulunamadı veya satışta değil.", "danger")
         return redirect(url_for("client.home"))
 
-    gallery = fetch_all(
-        db_path,
-        "SELECT image_path FROM product_images WHERE product_id=? ORDER BY sort_order ASC, id ASC",
-        (product_id,),
-    )
+    # Galeri değişiklikleri de ürünün updated_at'ini günceller.
+    held = held_grams_by_product(db_path, current_cart_id())
+    validators = page_validators("product", [product], held)
+    cached = not_modified(validators)
+    if cached is not None:
+        return cached
+
+    gallery = get_product_gallery(db_path, product_id)
 
     images = []
     if "image_path" in product.keys() and product["image_path"]:
@@ -180,13 +196,15 @@ def product_detail(product_id: int):
             continue
         images.append({"image_path": g["image_path"]})
 
-    return render_template(
+    html = render_template(
         "client/product_detail.html",
         product=product,
         images=images,
         gram_options=GRAM_OPTIONS,
         grind_options=GRIND_OPTIONS,
+        held=held,
     )
+    return apply_validators(make_response(html), validators)
 
 
 @client_bp.route("/cart/add", methods=["POST"])
@@ -214,7 +232,7 @@ def cart_add():
         flash("Geçersiz adet.", "danger")
         return redirect(url_for("client.product_detail", product_id=product_id))
 
-    product = fetch_one(db_path, "SELECT * FROM products WHERE id=?", (product_id,))
+    product = get_product(db_path, product_id)
     if not product or int(product["is_active"]) != 1:
         flash("Ürün bulunamadı.", "danger")
         return redirect(url_for("client.home"))
@@ -318,6 +336,20 @@ def cart():
     return render_template("client/cart.html", cart=cart, total=total)
 
 
+@client_bp.route("/cart/recover", methods=["POST"])
+def cart_recover():
+    phone = _normalize_phone(request.form.get("phone") or "")
+    if not phone:
+        flash("Telefon formatı geçersiz. Örn: 05xx xxx xx xx", "danger")
+    elif not recovery_allowed(current_app.config["DB_PATH"], request.remote_addr or "", phone):
+        flash("Çok fazla deneme yapıldı. Lütfen biraz sonra tekrar deneyin.", "warning")
+    elif recover_cart(phone):
+        flash("Sepetiniz getirildi.", "success")
+    else:
+        flash("Bu telefona ait kayıtlı sepet bulunamadı.", "warning")
+    return redirect(url_for("client.cart"))
+
+
 @client_bp.route("/cart/remove", methods=["POST"])
 def cart_remove():
     cart = _get_cart()
@@ -338,6 +370,7 @@ def cart_remove():
 
 @client_bp.route("/checkout")
 def checkout():
+    db_path = current_app.config["DB_PATH"]
     cart = _get_cart()
     if not cart:
         flash("Sepet boş.", "warning")
@@ -347,11 +380,16 @@ def checkout():
     for item in cart:
         total += float(item.get("unit_price", 0)) * int(item.get("qty", 1))
 
+    # Form doldurulurken sepetteki stok başkasına satılmasın diye süreli ayırma.
+    hold_shortages = reserve(db_path, current_cart_id(create=True), required_grams_by_product(cart))
+    session["holding"] = True
+
     return render_template(
         "client/checkout.html",
         cart=cart,
         total=total,
         last_phone=session.get("last_phone", ""),
+        hold_shortages=hold_shortages,
     )
 
 
@@ -360,6 +398,7 @@ def checkout_submit():
     db_path = current_app.config["DB_PATH"]
     cart = _get_cart()
     if not cart:
+        record_checkout("empty_cart")
         flash("Sepet boş.", "warning")
         return redirect(url_for("client.home"))
 
@@ -368,6 +407,7 @@ def checkout_submit():
     note = (request.form.get("note") or "").strip()
 
     if delivery_type not in ("pickup", "delivery"):
+        record_checkout("invalid_delivery")
         flash("Teslimat tipi geçersiz.", "danger")
         return redirect(url_for("client.checkout"))
 
@@ -375,117 +415,64 @@ def checkout_submit():
     customer_phone = (request.form.get("customer_phone") or "").strip()
 
     if len(customer_name) < 2:
+        record_checkout("invalid_name")
         flash("İsim alanı zorunludur.", "danger")
         return redirect(url_for("client.checkout"))
 
     normalized_phone = _normalize_phone(customer_phone)
     if not normalized_phone:
+        record_checkout("invalid_phone")
         flash("Telefon formatı geçersiz. Örn: 05xx xxx xx xx", "danger")
         return redirect(url_for("client.checkout"))
 
     customer_phone = normalized_phone
 
+    # Sipariş tamamlanmazsa sepet başka cihazdan bu telefonla geri getirilebilir.
+    attach_phone(customer_phone)
+
     if delivery_type == "delivery" and len(address) < 10:
+        record_checkout("invalid_address")
         flash("Adrese teslim için adres alanı zorunludur.", "danger")
         return redirect(url_for("client.checkout"))
 
     if len(note) > 250:
         note = note[:250]
 
-    # Stok kontrolü: ürün bazında toplam gram ihtiyacı
-    required_grams = defaultdict(int)
-    for item in cart:
-        pid = int(item["product_id"])
-        gram = int(item["gram"])
-        qty = int(item.get("qty", 1))
-        required_grams[pid] += gram * qty
-
-    # Ürünleri çekip stok kontrol et
-    for pid, need_gram in required_grams.items():
-        product = fetch_one(db_path, "SELECT id, name, stock_gram, is_active FROM products WHERE id=?", (pid,))
-        if not product or int(product["is_active"]) != 1:
-            flash("Sepette satışta olmayan ürün var. Lütfen sepeti güncelleyin.", "danger")
-            return redirect(url_for("client.cart"))
-
-        stock = int(product["stock_gram"]) if product["stock_gram"] is not None else 0
-        if stock < need_gram:
-            flash(f"Stok yetersiz: {product['name']} (Gerekli: {need_gram}g / Stok: {stock}g)", "danger")
-            return redirect(url_for("client.cart"))
-
-    # Sipariş oluşturma: transaction mantığı için tek connection ile ilerlemek daha sağlıklı.
-    from database import create_connection
-
-    conn = create_connection(db_path)
     try:
-        cur = conn.cursor()
-
-        cur.execute(
-            """
-            INSERT INTO orders (customer_name, customer_phone, status, created_at, delivery_type, address, note)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (customer_name, customer_phone, "alındı", now_str(), delivery_type, address or None, note or None),
-        )
-        order_id = cur.lastrowid
-
-        # Order item insert
-        item_rows = []
-        for item in cart:
-            pid = int(item["product_id"])
-            gram = int(item["gram"])
-            qty = int(item.get("qty", 1))
-            unit_price = float(item.get("unit_price", 0))
-            # Şemada qty yok; qty kadar satır ekleyerek ilerliyoruz.
-            for _ in range(qty):
-                item_rows.append((order_id, pid, item["grind_type"], gram, unit_price))
-
-        cur.executemany(
-            """
-            INSERT INTO order_items (order_id, product_id, grind_type, gram, price)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            item_rows,
+        order_id = place_order(
+            db_path,
+            cart,
+            {
+                "name": customer_name,
+                "phone": customer_phone,
+                "delivery_type": delivery_type,
+                "address": address,
+                "note": note,
+            },
+            holder=current_cart_id(),
         )
-
-        # Stok düş
-        for pid, need_gram in required_grams.items():
-            cur.execute(
-                "UPDATE products SET stock_gram = stock_gram - ? WHERE id=? AND stock_gram >= ?",
-                (need_gram, pid, need_gram),
-            )
-            if cur.rowcount != 1:
-                # Çok nadiren yarış durumunda (concurrency) stok düşmeyebilir.
-                raise RuntimeError("Stok güncellenemedi. Lütfen tekrar deneyin.")
-
-        movement_rows = []
-        for pid, need_gram in required_grams.items():
-            movement_rows.append(
-                (
-                    pid,
-                    -int(need_gram),
-                    "Sipariş ile stok düşümü",
-                    "order",
-                    int(order_id),
-                    now_str(),
+    except StockShortageError as e:
+        insufficient = any(s["reason"] == "insufficient" for s in e.shortages)
+        record_checkout("stock_shortage" if insufficient else "inactive_product")
+        for s in e.shortages:
+            if s["reason"] == "insufficient":
+                flash(
+                    f"Stok yetersiz: {s['name']} (Gerekli: {s['required_gram']}g / Stok: {s['stock_gram']}g)",
+                    "danger",
                 )
-            )
-        if movement_rows:
-            cur.executemany(
-                """
-                INSERT INTO stock_movements (product_id, change_gram, reason, ref_type, ref_id, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                movement_rows,
-            )
-
-        conn.commit()
-
+            else:
+                flash("Sepette satışta olmayan ürün var. Lütfen sepeti güncelleyin.", "danger")
+        return redirect(url_for("client.cart"))
     except Exception as e:
-        conn.rollback()
+        # Tekrar denemelere rağmen yazma kilidi alınamadıysa ayrı sayılır.
+        record_checkout("lock_contention" if is_busy_error(e) else "error")
         flash(f"Sipariş oluşturulamadı: {str(e)}", "danger")
         return redirect(url_for("client.checkout"))
-    finally:
-        conn.close()
+
+    record_checkout()
+
+    # Stoklar değişti; bu worker'daki katalog cache'i hemen tazelensin.
+    invalidate_catalog(db_path)
 
     # Sepeti temizle
     _save_cart([])
@@ -514,11 +501,9 @@ def orders():
         orders_rows = fetch_all(
             db_path,
             """
-            SELECT o.*, COALESCE(SUM(oi.price), 0) AS total
+            SELECT o.*, o.total_amount AS total
             FROM orders o
-            LEFT JOIN order_items oi ON oi.order_id = o.id
             WHERE o.customer_phone = ?
-            GROUP BY o.id
             ORDER BY o.created_at DESC
             """,
             (normalized,),
@@ -560,14 +545,13 @@ def order_detail(order_id: int):
             p.name AS product_name,
             oi.grind_type,
             oi.gram,
-            COUNT(*) AS qty,
+            oi.quantity AS qty,
             oi.price AS unit_price,
-            (COUNT(*) * oi.price) AS subtotal
+            (oi.quantity * oi.price) AS subtotal
         FROM order_items oi
         JOIN products p ON p.id = oi.product_id
         WHERE oi.order_id=?
-        GROUP BY oi.product_id, p.name, oi.grind_type, oi.gram, oi.price
-        ORDER BY p.name ASC
+        ORDER BY p.name ASC, oi.id ASC
         """,
         (order_id,),
     )
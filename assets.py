@@ -0,0 +1,241 @@
+"""
+Statik dosya sürümleme ve önceden sıkıştırılmış dosya sunumu
+
+`python assets.py build` static klasöründeki dosyaları içerik hash'iyle
+adlandırıp (client.3f2a9b1c04de.css) static/dist altına yazar; css/js
+küçültülür, metin dosyalarının .gz (ve brotli kuruluysa .br) kopyaları
+hazırlanır. Build varsa url_for('static', ...) hash'li adı üretir ve istek
+Accept-Encoding'e göre uygun kopyayla, strong ETag ve bir yıllık immutable
+cache ile sunulur.
+
+Build yoksa açılışta css/js için içerik hash manifest'i oluşturulur ve
+adreslere ?v=<hash> eklenir. Ürün görselleri çalışırken yüklendiği için
+iki durumda da sürümlenmez.
+
+Kullanım:
+    python assets.py build
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+
+from flask import abort, request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli isteğe bağlı; yoksa yalnızca gzip üretilir
+    brotli = None
+
+
+ASSET_EXTENSIONS = (".css", ".js", ".svg", ".ico", ".woff", ".woff2")
+# Sıkıştırmanın işe yaradığı (zaten sıkıştırılmış olmayan) türler.
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".ico")
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+HASH_LENGTH = 12
+
+BUILD_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+# Çalışırken oluşan/yüklenen dosyalar build'e alınmaz.
+RUNTIME_DIRS = ("images/cas", "images/variants", "images/cdn")
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def build_manifest(static_folder: str) -> dict[str, str]:
+    """static klasörüne göre göreli yol (/ ayraçlı) -> içerik hash'i."""
+    manifest = {}
+    for root, _dirs, files in os.walk(static_folder):
+        for name in files:
+            if not name.lower().endswith(ASSET_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, static_folder).replace(os.sep, "/")
+            if rel.startswith(BUILD_DIR + "/"):
+                continue
+            manifest[rel] = file_hash(path)
+    return manifest
+
+
+def minify_css(text: str) -> str:
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{}:;,>])\s*", r"\1", text)
+    return text.replace(";}", "}").strip()
+
+
+def minify_js(text: str) -> str:
+    # Yorumları silmek string/regex içeriklerini bozabilir; yalnızca boşluklar atılır.
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def _source_files(static_folder: str):
+    for root, dirs, files in os.walk(static_folder):
+        rel_root = os.path.relpath(root, static_folder).replace(os.sep, "/")
+        rel_root = "" if rel_root == "." else rel_root + "/"
+        dirs[:] = [
+            d for d in dirs
+            if (rel_root + d) != BUILD_DIR and (rel_root + d) not in RUNTIME_DIRS
+        ]
+        for name in sorted(files):
+            # Ürün görselleri (çok MB'lık png'ler) build'e kopyalanmaz.
+            if name.lower().endswith(ASSET_EXTENSIONS):
+                yield rel_root + name
+
+
+def build_assets(static_folder: str) -> dict[str, dict]:
+    """static/dist'i baştan üretir ve manifest'i döner."""
+    out_dir = os.path.join(static_folder, BUILD_DIR)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+
+    manifest = {}
+    for rel in list(_source_files(static_folder)):
+        with open(os.path.join(static_folder, rel), "rb") as f:
+            data = f.read()
+        ext = os.path.splitext(rel)[1].lower()
+        if ext == ".css":
+            data = minify_css(data.decode("utf-8")).encode("utf-8")
+        elif ext == ".js":
+            data = minify_js(data.decode("utf-8")).encode("utf-8")
+
+        digest = hashlib.sha256(data).hexdigest()
+        stem, _ = os.path.splitext(rel)
+        hashed = f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+        target = os.path.join(out_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+
+        encodings = []
+        if ext in COMPRESSIBLE_EXTENSIONS:
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    with open(target + ".br", "wb") as f:
+                        f.write(compressed)
+                    encodings.append("br")
+            # mtime=0: aynı içerik her build'de aynı bayt dizisini verir.
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                with open(target + ".gz", "wb") as f:
+                    f.write(compressed)
+                encodings.append("gzip")
+
+        manifest[rel] = {"path": hashed, "etag": digest[:32], "encodings": encodings}
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_build_manifest(static_folder: str) -> dict[str, dict]:
+    path = os.path.join(static_folder, BUILD_DIR, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+_ENCODING_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+
+def _choose_encoding(available: list[str]) -> str | None:
+    accepted = request.accept_encodings
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted[encoding] > 0:
+            return encoding
+    return None
+
+
+def _immutable(response):
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    response.cache_control.no_cache = None
+    return response
+
+
+def init_assets(app):
+    static_folder = app.static_folder
+    built = load_build_manifest(static_folder) if static_folder else {}
+    # Hash'li ad -> manifest kaydı (istek tarafında arama için).
+    by_hashed = {entry["path"]: entry for entry in built.values()}
+    manifest = {} if built or not static_folder else build_manifest(static_folder)
+    app.extensions["asset_manifest"] = manifest
+    app.extensions["asset_build"] = built
+
+    @app.url_defaults
+    def add_asset_version(endpoint, values):
+        if endpoint != "static":
+            return
+        filename = values.get("filename", "")
+        entry = built.get(filename)
+        if entry:
+            values["filename"] = entry["path"]
+            return
+        version = manifest.get(filename)
+        if version and "v" not in values:
+            values["v"] = version
+
+    default_static = app.view_functions.get("static")
+
+    def static(filename):
+        entry = by_hashed.get(filename)
+        if entry is None:
+            return default_static(filename=filename)
+
+        path = os.path.join(static_folder, BUILD_DIR, entry["path"])
+        if not os.path.isfile(path):
+            abort(404)
+        encoding = _choose_encoding(entry["encodings"])
+        mimetype = mimetypes.guess_type(entry["path"])[0] or "application/octet-stream"
+        # Dosya nesnesi WSGI file_wrapper ile verilir; gunicorn bunu sendfile ile gönderir.
+        response = send_file(
+            path + _ENCODING_SUFFIX[encoding] if encoding else path,
+            mimetype=mimetype,
+            etag=f"{entry['etag']}-{encoding}" if encoding else entry["etag"],
+            conditional=True,
+            max_age=ASSET_MAX_AGE,
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return _immutable(response)
+
+    if default_static is not None and built:
+        app.view_functions["static"] = static
+
+    @app.after_request
+    def cache_versioned_assets(response):
+        if request.endpoint != "static" or response.status_code != 200:
+            return response
+        version = request.args.get("v")
+        if version and version == manifest.get((request.view_args or {}).get("filename", "")):
+            _immutable(response)
+        return response
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command != "build":
+        print("Kullanım: python assets.py build")
+        sys.exit(1)
+
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "static")
+    result = build_assets(static_folder)
+    compressed = sum(1 for e in result.values() if e["encodings"])
+    print(f"Build tamamlandı: {len(result)} dosya, {compressed} sıkıştırılmış (brotli: {'var' if brotli else 'yok'})")
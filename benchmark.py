@@ -0,0 +1,390 @@
+"""
+Vitrin ve admin sıcak yolları için tekrarlanabilir benchmark
+
+Verilen ölçekte sentetik bir veritabanı üretir (ürünler sync_products'taki
+örnek ürünlerden türetilir; siparişler, sipariş satırları ve stok
+hareketleri sabit seed'li rastgele) ve her senaryoyu Flask test client'ı
+üzerinden ölçer: istek/saniye, p50/p95/p99. --processes ile aynı
+veritabanına birden çok process aynı anda yük verir (gunicorn worker'ları
+gibi). Sonuç JSON olarak yazılır; commit'ler arası karşılaştırma için.
+
+Kullanım:
+    python benchmark.py
+    python benchmark.py --products 500 --orders 20000 --requests 300 --output bench.json
+    python benchmark.py --processes 4 --scenarios home,checkout_submit
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from app.routes.admin import ORDER_STATUSES
+from app.routes.client import GRAM_OPTIONS, GRIND_OPTIONS
+from database import ORDER_TOTALS_UPDATE_SQL, TIMESTAMP_FORMAT, db_cursor, fetch_one, get_pool, init_db, tr_now
+from sync_products import SAMPLE_PRODUCT_COLUMNS, SAMPLE_PRODUCTS
+
+
+HISTORY_DAYS = 90
+# Checkout senaryosu stok yüzünden hata vermesin.
+BENCH_STOCK_GRAM = 10**9
+
+SCENARIOS = (
+    "home",
+    "home_filtered",
+    "product_detail",
+    "cart_add",
+    "checkout_submit",
+    "admin_dashboard",
+    "admin_orders_list",
+)
+
+
+# Aktif ürün ya da köken olmadan anlamsız (ya da hata veren) senaryolar.
+PRODUCT_SCENARIOS = ("product_detail", "cart_add", "checkout_submit")
+
+
+def unavailable_scenarios(db_path: str) -> dict[str, str]:
+    """Veritabanındaki veriyle çalıştırılamayan senaryolar -> neden (ör. boş --db)."""
+    init_db(db_path)
+    row = fetch_one(
+        db_path,
+        "SELECT COUNT(*) AS products, COUNT(DISTINCT NULLIF(origin, '')) AS origins FROM products WHERE is_active=1",
+    )
+    skipped = {}
+    if not row["products"]:
+        skipped.update({s: "aktif ürün yok" for s in PRODUCT_SCENARIOS})
+    if not row["origins"]:
+        skipped["home_filtered"] = "köken bilgisi olan ürün yok"
+    return skipped
+
+
+def _ago(rng: random.Random, days: int) -> str:
+    return (tr_now() - timedelta(seconds=rng.uniform(0, days * 86400))).strftime(TIMESTAMP_FORMAT)
+
+
+def seed_database(db_path: str, products: int, orders: int, items_per_order: int, movements: int, seed: int = 42):
+    """Boş bir veritabanını benchmark verisiyle doldurur."""
+    from sales_stats import rebuild_sales_stats
+
+    rng = random.Random(seed)
+    init_db(db_path)
+
+    price_index = {gram: SAMPLE_PRODUCT_COLUMNS.index(f"price_{gram}") for gram in GRAM_OPTIONS}
+    stock_index = SAMPLE_PRODUCT_COLUMNS.index("stock_gram")
+    rows = []
+    for i in range(products):
+        template = list(SAMPLE_PRODUCTS[i % len(SAMPLE_PRODUCTS)])
+        if i >= len(SAMPLE_PRODUCTS):
+            template[0] = f"{template[0]} #{i // len(SAMPLE_PRODUCTS) + 1}"
+        template[stock_index] = BENCH_STOCK_GRAM
+        rows.append(tuple(template))
+
+    with db_cursor(db_path) as (conn, cur):
+        # İlk migration'ın eklediği örnek ürünler yerine ölçekli katalog.
+        cur.execute("DELETE FROM products;")
+        cur.executemany(
+            f"INSERT INTO products ({', '.join(SAMPLE_PRODUCT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in SAMPLE_PRODUCT_COLUMNS)})",
+            rows,
+        )
+        cur.execute("SELECT id FROM products ORDER BY id;")
+        product_ids = [r["id"] for r in cur.fetchall()]
+        prices = {pid: row for pid, row in zip(product_ids, rows)}
+
+        order_rows, item_rows = [], []
+        for order_id in range(1, orders + 1):
+            created_at = _ago(rng, HISTORY_DAYS)
+            delivery = rng.random() < 0.4
+            order_rows.append(
+                (
+                    order_id,
+                    f"Müşteri {order_id}",
+                    f"05{rng.randrange(10**9):09d}",
+                    rng.choice(ORDER_STATUSES),
+                    created_at,
+                    "delivery" if delivery else "pickup",
+                    "Benchmark Mah. No: 1 Daire 2" if delivery else None,
+                )
+            )
+            for _ in range(rng.randint(1, items_per_order)):
+                pid = rng.choice(product_ids)
+                gram = rng.choice(GRAM_OPTIONS)
+                item_rows.append(
+                    (order_id, pid, rng.choice(GRIND_OPTIONS), gram, prices[pid][price_index[gram]], rng.randint(1, 3))
+                )
+        cur.executemany(
+            "INSERT INTO orders (id, customer_name, customer_phone, status, created_at, delivery_type, address) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            order_rows,
+        )
+        cur.executemany(
+            "INSERT INTO order_items (order_id, product_id, grind_type, gram, price, quantity) VALUES (?, ?, ?, ?, ?, ?)",
+            item_rows,
+        )
+        cur.execute(ORDER_TOTALS_UPDATE_SQL)
+
+        cur.executemany(
+            "INSERT INTO stock_movements (product_id, change_gram, reason, ref_type, ref_id, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (rng.choice(product_ids), rng.choice((-1, 1)) * rng.choice(GRAM_OPTIONS), "Benchmark", "admin", None, _ago(rng, HISTORY_DAYS))
+                for _ in range(movements)
+            ],
+        )
+    rebuild_sales_stats(db_path)
+    return {"products": products, "orders": orders, "order_items": len(item_rows), "stock_movements": movements}
+
+
+class ScenarioRunner:
+    """Senaryo başına tek isteği çalıştırır; hazırlık adımları (sepete ekleme vb.) ölçüme dahil değil."""
+
+    def __init__(self, app, seed: int):
+        self.app = app
+        self.rng = random.Random(seed)
+        self.client = app.test_client()
+        with app.app_context():
+            from database import fetch_all
+
+            rows = fetch_all(app.config["DB_PATH"], "SELECT id, origin FROM products WHERE is_active=1")
+        self.product_ids = [r["id"] for r in rows]
+        self.origins = sorted({r["origin"] for r in rows if r["origin"]})
+        self._cart_adds = 0
+
+    def _cart_form(self) -> dict:
+        return {
+            "product_id": self.rng.choice(self.product_ids),
+            "gram": self.rng.choice(GRAM_OPTIONS),
+            "grind_type": self.rng.choice(GRIND_OPTIONS),
+            "qty": 1,
+        }
+
+    def prepare(self, scenario: str):
+        if scenario == "cart_add":
+            # Sepet sınırsız büyümesin; birkaç eklemede bir yeni ziyaretçi.
+            self._cart_adds += 1
+            if self._cart_adds % 5 == 0:
+                self.client = self.app.test_client()
+        elif scenario == "checkout_submit":
+            self.client = self.app.test_client()
+            self.client.post("/cart/add", data=self._cart_form())
+
+    def request(self, scenario: str):
+        c, rng = self.client, self.rng
+        if scenario == "home":
+            return c.get("/")
+        if scenario == "home_filtered":
+            return c.get("/", query_string={"origin": rng.choice(self.origins), "roast_type": rng.choice(("Açık", "Orta", "Koyu"))})
+        if scenario == "product_detail":
+            return c.get(f"/product/{rng.choice(self.product_ids)}")
+        if scenario == "cart_add":
+            return c.post("/cart/add", data=self._cart_form())
+        if scenario == "checkout_submit":
+            return c.post(
+                "/checkout",
+                data={"customer_name": "Benchmark", "customer_phone": "0532 000 00 00", "delivery_type": "pickup"},
+            )
+        if scenario == "admin_dashboard":
+            return c.get("/admin/")
+        if scenario == "admin_orders_list":
+            return c.get("/admin/orders")
+        raise ValueError(f"Bilinmeyen senaryo: {scenario}")
+
+
+def measure(runner: ScenarioRunner, scenario: str, requests: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        runner.prepare(scenario)
+        runner.request(scenario)
+
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        runner.prepare(scenario)
+        t = time.perf_counter()
+        response = runner.request(scenario)
+        latencies.append(time.perf_counter() - t)
+        if response.status_code >= 400 or (scenario == "checkout_submit" and response.status_code != 200):
+            errors += 1
+    # Duvar saati hazırlık adımlarını da içerir (çok process'li ölçümdeki gibi).
+    return {"latencies": latencies, "errors": errors, "wall": time.perf_counter() - started}
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # En yakın sıra yöntemi.
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], errors: int, wall: float) -> dict:
+    values = sorted(latencies)
+
+    def ms(v: float) -> float:
+        return round(v * 1000, 3)
+
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / wall, 1) if wall > 0 else 0.0,
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+
+
+def _make_app(db_path: str):
+    os.environ["DB_PATH"] = db_path
+    from app import create_app
+
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+def _worker(db_path: str, scenarios: list[str], requests: int, warmup: int, seed: int, barrier, results):
+    app = _make_app(db_path)
+    runner = ScenarioRunner(app, seed)
+    for scenario in scenarios:
+        measure(runner, scenario, 0, warmup)
+        # Tüm process'ler aynı senaryoyu aynı anda çalıştırsın; ısınma duvar saatine girmez.
+        barrier.wait()
+        started = time.time()
+        result = measure(runner, scenario, requests, 0)
+        results.put((scenario, started, time.time(), result["latencies"], result["errors"]))
+
+
+def run_multiprocess(db_path: str, scenarios: list[str], requests: int, warmup: int, processes: int, seed: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(processes)
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=_worker, args=(db_path, scenarios, requests, warmup, seed + i, barrier, results))
+        for i in range(processes)
+    ]
+    for w in workers:
+        w.start()
+
+    collected: dict[str, list] = {s: [] for s in scenarios}
+    for _ in range(len(scenarios) * processes):
+        scenario, started, finished, latencies, errors = results.get()
+        collected[scenario].append((started, finished, latencies, errors))
+    for w in workers:
+        w.join()
+
+    summary = {}
+    for scenario, parts in collected.items():
+        # Toplam iş / duvar saati: en erken başlayandan en geç bitene.
+        wall = max(p[1] for p in parts) - min(p[0] for p in parts)
+        summary[scenario] = summarize([v for p in parts for v in p[2]], sum(p[3] for p in parts), wall)
+    return summary
+
+
+def run_single(db_path: str, scenarios: list[str], requests: int, warmup: int, seed: int) -> dict:
+    app = _make_app(db_path)
+    runner = ScenarioRunner(app, seed)
+    summary = {}
+    for scenario in scenarios:
+        result = measure(runner, scenario, requests, warmup)
+        summary[scenario] = summarize(result["latencies"], result["errors"], result["wall"])
+    return summary
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Vitrin ve admin sıcak yolları için benchmark")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--items-per-order", type=int, default=4, help="sipariş başına en fazla satır")
+    parser.add_argument("--movements", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=200, help="senaryo (ve process) başına ölçülen istek")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="var olan benchmark veritabanı (verilmezse geçici dosya üretilir)")
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"bilinmeyen senaryo: {', '.join(unknown)}")
+
+    tmp_dir = None
+    if args.db:
+        db_path, scale = args.db, None
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="kahveci-bench-")
+        db_path = os.path.join(tmp_dir, "bench.db")
+        t = time.perf_counter()
+        scale = seed_database(db_path, args.products, args.orders, args.items_per_order, args.movements, args.seed)
+        print(f"Veritabanı hazırlandı ({time.perf_counter() - t:.1f} sn): {scale}")
+
+    skipped = unavailable_scenarios(db_path)
+    for scenario in scenarios:
+        if scenario in skipped:
+            print(f"Atlandı: {scenario} ({skipped[scenario]})")
+    scenarios = [s for s in scenarios if s not in skipped]
+
+    if args.processes > 1:
+        results = run_multiprocess(db_path, scenarios, args.requests, args.warmup, args.processes, args.seed)
+    else:
+        results = run_single(db_path, scenarios, args.requests, args.warmup, args.seed)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": tr_now().strftime(TIMESTAMP_FORMAT),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processes": args.processes,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "scale": scale,
+            "db": args.db,
+            "skipped": {s: skipped[s] for s in args.scenarios.split(",") if s in skipped},
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{'senaryo':<20}{'istek/sn':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'hata':>6}")
+    for scenario, r in results.items():
+        print(f"{scenario:<20}{r['rps']:>10}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['errors']:>6}")
+    print(f"Sonuçlar: {args.output}")
+
+    if tmp_dir:
+        get_pool(db_path).close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
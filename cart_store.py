@@ -0,0 +1,318 @@
+"""
+Sunucu tarafı sepet deposu
+
+Cookie'de yalnızca sepet id'si ve kısa bir sürüm etiketi tutulur; sepet
+içeriği carts tablosunda saklanır. Önünde process içi LRU cache vardır;
+cookie'deki sürüm cache'tekiyle aynıysa veritabanına gidilmez (başka
+worker'da değişen sepet sürüm farkından anlaşılır).
+
+Kullanım:
+    python cart_store.py purge
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any
+
+from flask import current_app, g, session
+
+from database import TIMESTAMP_FORMAT, db_cursor, fetch_one, get_db_path, now_str, transaction, tr_now
+
+
+CART_CACHE_SIZE = int(os.environ.get("CART_CACHE_SIZE", "1024"))
+# Bu kadar gündür dokunulmayan sepetler purge ile silinir.
+CART_TTL_DAYS = int(os.environ.get("CART_TTL_DAYS", "30"))
+# Telefonla sepet getirme denemesi: pencere (sn) başına istemci + telefon için en fazla
+# CART_RECOVER_ATTEMPTS, tek istemciden (farklı telefonlarla) en fazla CART_RECOVER_IP_ATTEMPTS.
+CART_RECOVER_ATTEMPTS = int(os.environ.get("CART_RECOVER_ATTEMPTS", "5"))
+CART_RECOVER_IP_ATTEMPTS = int(os.environ.get("CART_RECOVER_IP_ATTEMPTS", "30"))
+CART_RECOVER_WINDOW = int(os.environ.get("CART_RECOVER_WINDOW", "600"))
+
+
+class CartBackend(ABC):
+    """Sepet deposu arayüzü. Sepet, JSON'a çevrilebilen satır listesidir."""
+
+    @abstractmethod
+    def load(self, cart_id: str, version: str | None = None) -> tuple[str, list[dict[str, Any]]] | None:
+        """(sürüm, satırlar) döner; sepet yoksa None."""
+
+    @abstractmethod
+    def save(self, cart_id: str, items: list[dict[str, Any]], version: str):
+        ...
+
+    @abstractmethod
+    def attach_phone(self, cart_id: str, phone: str):
+        ...
+
+    @abstractmethod
+    def find_by_phone(self, phone: str) -> str | None:
+        ...
+
+
+class SQLiteCartBackend(CartBackend):
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def load(self, cart_id, version=None):
+        row = fetch_one(self.db_path, "SELECT version, items FROM carts WHERE id=?", (cart_id,))
+        if not row:
+            return None
+        return row["version"], json.loads(row["items"])
+
+    def save(self, cart_id, items, version):
+        with db_cursor(self.db_path) as (conn, cur):
+            cur.execute(
+                """
+                INSERT INTO carts (id, items, version, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    items = excluded.items,
+                    version = excluded.version,
+                    updated_at = excluded.updated_at
+                """,
+                (cart_id, json.dumps(items, ensure_ascii=False), version, now_str()),
+            )
+
+    def attach_phone(self, cart_id, phone):
+        with db_cursor(self.db_path) as (conn, cur):
+            cur.execute("UPDATE carts SET phone=? WHERE id=?", (phone, cart_id))
+
+    def find_by_phone(self, phone):
+        row = fetch_one(
+            self.db_path,
+            "SELECT id FROM carts WHERE phone=? AND items != '[]' ORDER BY updated_at DESC LIMIT 1",
+            (phone,),
+        )
+        return row["id"] if row else None
+
+
+class LRUCartBackend(CartBackend):
+    """Başka bir backend'in önünde boyutu sınırlı, sürüm kontrollü cache."""
+
+    def __init__(self, backend: CartBackend, max_entries: int = CART_CACHE_SIZE):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit_ratio(self) -> float:
+        # Teşhis için; metrics oranı hits/misses sayaçlarından kendisi hesaplar.
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _put(self, cart_id: str, version: str, items: list[dict[str, Any]]):
+        # JSON olarak tutulur; çağıran satırları değiştirse de cache bozulmaz.
+        payload = json.dumps(items, ensure_ascii=False)
+        with self._lock:
+            self._entries[cart_id] = (version, payload)
+            self._entries.move_to_end(cart_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def load(self, cart_id, version=None):
+        if version is not None:
+            with self._lock:
+                cached = self._entries.get(cart_id)
+                if cached and cached[0] == version:
+                    self._entries.move_to_end(cart_id)
+                    self.hits += 1
+                    return version, json.loads(cached[1])
+                self.misses += 1
+
+        loaded = self.backend.load(cart_id)
+        if loaded is not None:
+            self._put(cart_id, *loaded)
+        return loaded
+
+    def save(self, cart_id, items, version):
+        self.backend.save(cart_id, items, version)
+        self._put(cart_id, version, items)
+
+    def attach_phone(self, cart_id, phone):
+        self.backend.attach_phone(cart_id, phone)
+
+    def find_by_phone(self, phone):
+        return self.backend.find_by_phone(phone)
+
+
+def init_cart_store(app, backend: CartBackend | None = None):
+    if backend is None:
+        backend = LRUCartBackend(SQLiteCartBackend(app.config["DB_PATH"]))
+    app.extensions["cart_store"] = backend
+
+
+def get_cart_store() -> CartBackend:
+    return current_app.extensions["cart_store"]
+
+
+def current_cart_id(create: bool = False) -> str | None:
+    cart_id = session.get("cart_id")
+    if not cart_id and create:
+        cart_id = uuid.uuid4().hex
+        session["cart_id"] = cart_id
+    return cart_id
+
+
+def count_items(items: list[dict[str, Any]]) -> int:
+    count = 0
+    for it in items:
+        try:
+            count += int(it.get("qty", 1))
+        except Exception:
+            count += 1
+    return count
+
+
+def cart_count() -> int:
+    """Navbar sayacı; sepet değiştikçe cookie'de güncellenir, sepet okunmaz."""
+    count = session.get("cart_n")
+    if count is None:
+        if "cart" not in session and "cart_id" not in session:
+            return 0
+        # Sayaç olmayan eski cookie'ler için bir kereye mahsus.
+        count = count_items(load_cart())
+        session["cart_n"] = count
+    return count
+
+
+def load_cart() -> list[dict[str, Any]]:
+    """İsteğin sepeti; istek boyunca bir kez okunur."""
+    if "_cart" in g:
+        return g._cart
+
+    # Eski cookie'deki sepet bir kereye mahsus depoya taşınır.
+    legacy = session.pop("cart", None)
+    if isinstance(legacy, list) and legacy:
+        save_cart(legacy)
+        return g._cart
+
+    items = []
+    cart_id = current_cart_id()
+    if cart_id:
+        loaded = get_cart_store().load(cart_id, session.get("cart_v"))
+        if loaded is not None:
+            items = loaded[1]
+    g._cart = items
+    return items
+
+
+def save_cart(items: list[dict[str, Any]]):
+    cart_id = current_cart_id(create=True)
+    version = uuid.uuid4().hex[:8]
+    get_cart_store().save(cart_id, items, version)
+    session["cart_v"] = version
+    session["cart_n"] = count_items(items)
+    g._cart = items
+
+
+def attach_phone(phone: str):
+    cart_id = current_cart_id()
+    if cart_id:
+        get_cart_store().attach_phone(cart_id, phone)
+
+
+class RateLimiter:
+    """Anahtar başına kayan pencerede en fazla `limit` deneme.
+
+    Denemeler rate_limit_attempts tablosunda tutulur; sınır tüm worker'lar
+    için ortaktır.
+    """
+
+    def __init__(self, limit: int, window: int):
+        self.limit = limit
+        self.window = window
+
+    def allow(self, db_path: str, key: str) -> bool:
+        now = tr_now()
+        cutoff = (now - timedelta(seconds=self.window)).strftime(TIMESTAMP_FORMAT)
+        with transaction(db_path) as cur:
+            cur.execute("DELETE FROM rate_limit_attempts WHERE key=? AND attempted_at <= ?", (key, cutoff))
+            cur.execute("SELECT COUNT(*) FROM rate_limit_attempts WHERE key=?", (key,))
+            if cur.fetchone()[0] >= self.limit:
+                return False
+            cur.execute(
+                "INSERT INTO rate_limit_attempts (key, attempted_at) VALUES (?, ?)",
+                (key, now.strftime(TIMESTAMP_FORMAT)),
+            )
+        return True
+
+
+recover_limiter = RateLimiter(CART_RECOVER_ATTEMPTS, CART_RECOVER_WINDOW)
+recover_ip_limiter = RateLimiter(CART_RECOVER_IP_ATTEMPTS, CART_RECOVER_WINDOW)
+
+
+def recovery_allowed(db_path: str, client_ip: str, phone: str) -> bool:
+    """Aynı numarayı tekrar tekrar denemek de, tek istemciden numara taramak da sınırlanır."""
+    return recover_ip_limiter.allow(db_path, f"recover-ip:{client_ip}") and recover_limiter.allow(
+        db_path, f"recover:{client_ip}:{phone}"
+    )
+
+
+def _line_key(item: dict[str, Any]) -> tuple:
+    return (str(item.get("product_id")), str(item.get("gram")), item.get("grind_type"))
+
+
+def merge_cart_items(current: list[dict[str, Any]], recovered: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Getirilen satırları mevcut sepete ekler; aynı satırda büyük adet kalır.
+
+    Toplanmaz; böylece aynı sepeti iki kez getirmek adetleri katlamaz.
+    """
+    merged = [dict(it) for it in current]
+    by_key = {_line_key(it): it for it in merged}
+    for item in recovered:
+        existing = by_key.get(_line_key(item))
+        if existing is None:
+            existing = by_key[_line_key(item)] = dict(item)
+            merged.append(existing)
+        else:
+            existing["qty"] = max(int(existing.get("qty", 1)), int(item.get("qty", 1)))
+    return merged
+
+
+def recover_cart(phone: str) -> bool:
+    """Telefona bağlı en son dolu sepetin satırlarını bu tarayıcının kendi sepetiyle birleştirir.
+
+    Bulunan sepetin id'si oturuma yazılmaz; böylece numarayı bilen biri
+    sahibinin sepetini ele geçirip değiştiremez. Mevcut sepetteki satırlar
+    korunur. Deneme sınırı çağıranda (recovery_allowed) uygulanır.
+    """
+    store = get_cart_store()
+    cart_id = store.find_by_phone(phone)
+    if not cart_id or cart_id == current_cart_id():
+        return False
+    loaded = store.load(cart_id)
+    if loaded is None or not loaded[1]:
+        return False
+    save_cart(merge_cart_items(load_cart(), loaded[1]))
+    return True
+
+
+def purge_stale_carts(db_path: str, days: int = CART_TTL_DAYS) -> int:
+    cutoff = (tr_now() - timedelta(days=days)).strftime(TIMESTAMP_FORMAT)
+    with db_cursor(db_path) as (conn, cur):
+        cur.execute("DELETE FROM carts WHERE updated_at < ?", (cutoff,))
+        removed = cur.rowcount
+        # Bir daha denenmeyen anahtarların süresi geçmiş denemeleri.
+        attempts_cutoff = (tr_now() - timedelta(seconds=CART_RECOVER_WINDOW)).strftime(TIMESTAMP_FORMAT)
+        cur.execute("DELETE FROM rate_limit_attempts WHERE attempted_at <= ?", (attempts_cutoff,))
+        return removed
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "purge"
+    if command != "purge":
+        print("Kullanım: python cart_store.py purge")
+        sys.exit(1)
+
+    db_path = get_db_path(os.environ.get("DB_PATH"))
+    n = purge_stale_carts(db_path)
+    print(f"Eski sepetler silindi: {n}")
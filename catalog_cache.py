@@ -0,0 +1,167 @@
+"""
+Katalog cache'i: ürün satırları, galeri görselleri, görsel varyantları, çok satanlar ve yeni gelenler
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from database import fetch_all, fetch_one
+from sales_stats import BEST_SELLER_WINDOW_DAYS, query_best_sellers
+
+
+# Bir kaydın en uzun cache'te kalma süresi (saniye).
+CATALOG_CACHE_TTL = float(os.environ.get("CATALOG_CACHE_TTL", "300"))
+# Diğer worker'ların yaptığı değişiklikler için imza kontrol aralığı (saniye).
+CATALOG_CHECK_INTERVAL = float(os.environ.get("CATALOG_CHECK_INTERVAL", "1"))
+
+_MISSING = object()
+
+
+def catalog_signature(db_path: str) -> tuple:
+    # updated_at trigger'larla her ürün/galeri değişikliğinde güncellenir;
+    # silinen ürünler ise COUNT(*) ile yakalanır. İkisi de index'ten okunur.
+    row = fetch_one(db_path, "SELECT COUNT(*) AS c, MAX(updated_at) AS m FROM products")
+    return (int(row["c"]), row["m"])
+
+
+class CatalogCache:
+    """TTL + açık invalidation ile çalışan, process içi katalog cache'i.
+
+    Admin route'ları yazma sonrası `invalidate` çağırır. Diğer gunicorn
+    worker'larındaki değişiklikler en geç `check_interval` saniye içinde
+    `catalog_signature` karşılaştırmasıyla fark edilir.
+    """
+
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL, check_interval: float = CATALOG_CHECK_INTERVAL):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, tuple], tuple[float, Any]] = {}
+        self._signatures: dict[str, tuple] = {}
+        self._checked_at: dict[str, float] = {}
+        self._generation = 0
+
+    def _drop(self, db_path: str | None):
+        if db_path is None:
+            self._entries.clear()
+            self._signatures.clear()
+            self._checked_at.clear()
+        else:
+            for key in [k for k in self._entries if k[0] == db_path]:
+                del self._entries[key]
+            self._signatures.pop(db_path, None)
+            self._checked_at.pop(db_path, None)
+        self._generation += 1
+
+    def invalidate(self, db_path: str | None = None):
+        with self._lock:
+            self._drop(db_path)
+
+    def _check_signature(self, db_path: str, now: float):
+        if now - self._checked_at.get(db_path, float("-inf")) < self.check_interval:
+            return
+        signature = catalog_signature(db_path)
+        with self._lock:
+            if self._signatures.get(db_path) != signature:
+                self._drop(db_path)
+                self._signatures[db_path] = signature
+            self._checked_at[db_path] = now
+
+    def get_or_load(self, db_path: str, key: tuple, loader: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        self._check_signature(db_path, now)
+
+        with self._lock:
+            entry = self._entries.get((db_path, key), _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            # Yükleme sırasında invalidate geldiyse eski veriyi cache'e yazma.
+            if generation == self._generation:
+                self._entries[(db_path, key)] = (now + self.ttl, value)
+        return value
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+catalog_cache = CatalogCache()
+
+
+def invalidate_catalog(db_path: str | None = None):
+    catalog_cache.invalidate(db_path)
+
+
+def get_product(db_path: str, product_id: int):
+    return catalog_cache.get_or_load(
+        db_path,
+        ("product", int(product_id)),
+        lambda: fetch_one(db_path, "SELECT * FROM products WHERE id=?", (product_id,)),
+    )
+
+
+def get_product_gallery(db_path: str, product_id: int) -> tuple:
+    return catalog_cache.get_or_load(
+        db_path,
+        ("gallery", int(product_id)),
+        lambda: tuple(
+            fetch_all(
+                db_path,
+                "SELECT image_path FROM product_images WHERE product_id=? ORDER BY sort_order ASC, id ASC",
+                (product_id,),
+            )
+        ),
+    )
+
+
+def get_active_products(db_path: str) -> tuple:
+    return catalog_cache.get_or_load(
+        db_path,
+        ("active_products",),
+        lambda: tuple(fetch_all(db_path, "SELECT * FROM products WHERE is_active=1 ORDER BY id DESC")),
+    )
+
+
+def get_new_arrivals(db_path: str, limit: int = 4) -> tuple:
+    return catalog_cache.get_or_load(
+        db_path,
+        ("new_arrivals", limit),
+        lambda: tuple(
+            fetch_all(db_path, "SELECT * FROM products WHERE is_active=1 ORDER BY id DESC LIMIT ?", (limit,))
+        ),
+    )
+
+
+def get_best_sellers(db_path: str, limit: int = 4, window_days: int = BEST_SELLER_WINDOW_DAYS) -> tuple:
+    return catalog_cache.get_or_load(
+        db_path,
+        ("best_sellers", limit, window_days),
+        lambda: tuple(query_best_sellers(db_path, limit, window_days)),
+    )
+
+
+def _load_image_variants(db_path: str) -> dict[str, list[tuple[int, str, str]]]:
+    variants: dict[str, list[tuple[int, str, str]]] = {}
+    for r in fetch_all(
+        db_path, "SELECT image_path, width, format, variant_path FROM image_variants ORDER BY image_path, width"
+    ):
+        variants.setdefault(r["image_path"], []).append((int(r["width"]), r["format"], r["variant_path"]))
+    return variants
+
+
+def get_image_variants(db_path: str) -> dict[str, list[tuple[int, str, str]]]:
+    """Kaynak görsel yolu -> [(genişlik, format, varyant yolu)]"""
+    return catalog_cache.get_or_load(db_path, ("image_variants",), lambda: _load_image_variants(db_path))
@@ -0,0 +1,49 @@
+"""
+Ürün arama: FTS5 sorgu hazırlama ve Türkçe karakter katlama
+"""
+
+from __future__ import annotations
+
+import re
+
+
+# products_fts'deki kolonlar ve bm25 ağırlıkları (isim eşleşmesi en değerlisi).
+FTS_COLUMNS = ("name", "description", "origin", "process", "tasting_notes")
+FTS_WEIGHTS = (10.0, 1.0, 4.0, 2.0, 3.0)
+RANK_SQL = "bm25(products_fts, " + ", ".join(str(w) for w in FTS_WEIGHTS) + ")"
+
+# Aramada dikkate alınan en fazla kelime sayısı.
+MAX_TERMS = 8
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fold_tr(text: str) -> str:
+    # unicode61 tokenizer (remove_diacritics 2) İ/I, ş, ğ, ç, ö, ü harflerini
+    # zaten katlıyor; sadece noktasız ı'yı i'ye çevirmek gerekiyor.
+    # Index tarafındaki karşılığı: database.FTS_FOLD_SQL
+    return (text or "").replace("ı", "i")
+
+
+def _terms(text: str) -> list[str]:
+    return _TERM_RE.findall(fold_tr(text))[:MAX_TERMS]
+
+
+def _prefix_expr(terms: list[str]) -> str:
+    # Her kelime ön ek olarak aranır: "kol" -> Kolombiya
+    return " AND ".join(f'"{t}"*' for t in terms)
+
+
+def build_match_query(q: str = "", origin: str = "") -> str | None:
+    """Serbest metin ve menşei filtresinden FTS5 MATCH ifadesi üretir."""
+    parts = []
+
+    q_terms = _terms(q)
+    if q_terms:
+        parts.append(_prefix_expr(q_terms))
+
+    origin_terms = _terms(origin)
+    if origin_terms:
+        parts.append(f"origin : ({_prefix_expr(origin_terms)})")
+
+    return " AND ".join(parts) or None
@@ -0,0 +1,157 @@
+"""
+Sipariş oluşturma: stok kontrolü, stok düşümü ve sipariş kayıtları tek transaction'da
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any
+
+from database import now_str, retry_on_busy, transaction
+from reservations import delete_holds, held_by_others
+from sales_stats import record_order_sales
+
+
+class StockShortageError(Exception):
+    """Sepetteki bir veya daha fazla ürün için stok yetersiz ya da ürün satışta değil."""
+
+    def __init__(self, shortages: list[dict[str, Any]]):
+        super().__init__("Stok yetersiz")
+        self.shortages = shortages
+
+
+def required_grams_by_product(cart: list[dict[str, Any]]) -> dict[int, int]:
+    required = defaultdict(int)
+    for item in cart:
+        required[int(item["product_id"])] += int(item["gram"]) * int(item.get("qty", 1))
+    return dict(required)
+
+
+def find_shortages(cur, required: dict[int, int], holder: str | None = None) -> list[dict[str, Any]]:
+    """Sepetteki tüm ürünleri tek sorguyla okuyup eksikleri raporlar.
+
+    Başka sepetlerin süresi dolmamış ayırmaları kullanılabilir stoktan düşülür.
+    Her kayıt: product_id, name, reason ("missing" | "inactive" | "insufficient"),
+    required_gram, stock_gram, held_gram, missing_gram.
+    """
+    ids = list(required)
+    placeholders = ", ".join("?" for _ in ids)
+    cur.execute(f"SELECT id, name, stock_gram, is_active FROM products WHERE id IN ({placeholders})", ids)
+    products = {int(r["id"]): r for r in cur.fetchall()}
+    held = held_by_others(cur, ids, holder)
+
+    shortages = []
+    for pid, need in required.items():
+        product = products.get(pid)
+        stock = max(int(product["stock_gram"] or 0) - held.get(pid, 0), 0) if product else 0
+        if product is None:
+            reason = "missing"
+        elif int(product["is_active"]) != 1:
+            reason = "inactive"
+        elif stock < need:
+            reason = "insufficient"
+        else:
+            continue
+        shortages.append(
+            {
+                "product_id": pid,
+                "name": product["name"] if product else None,
+                "reason": reason,
+                "required_gram": need,
+                "stock_gram": stock,
+                "held_gram": held.get(pid, 0),
+                "missing_gram": max(need - stock, 0),
+            }
+        )
+    return shortages
+
+
+def _place_order(
+    db_path: str, cart: list[dict[str, Any]], customer: dict[str, Any], holder: str | None = None
+) -> int:
+    required = required_grams_by_product(cart)
+    created_at = now_str()
+
+    with transaction(db_path) as cur:
+        shortages = find_shortages(cur, required, holder)
+        if shortages:
+            raise StockShortageError(shortages)
+
+        cur.execute(
+            """
+            INSERT INTO orders (
+                customer_name, customer_phone, status, created_at, delivery_type, address, note,
+                total_amount, item_count, total_gram
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                customer["name"],
+                customer["phone"],
+                "alındı",
+                created_at,
+                customer["delivery_type"],
+                customer.get("address") or None,
+                customer.get("note") or None,
+                round(sum(float(it.get("unit_price", 0)) * int(it.get("qty", 1)) for it in cart), 2),
+                sum(int(it.get("qty", 1)) for it in cart),
+                sum(required.values()),
+            ),
+        )
+        order_id = int(cur.lastrowid)
+
+        sales_lines = [
+            (
+                int(it["product_id"]),
+                int(it["gram"]),
+                it["grind_type"],
+                int(it.get("qty", 1)),
+                float(it.get("unit_price", 0)),
+            )
+            for it in cart
+        ]
+        cur.executemany(
+            """
+            INSERT INTO order_items (order_id, product_id, gram, grind_type, quantity, price)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [(order_id, *line) for line in sales_lines],
+        )
+
+        # Çok satanlar ve günlük satış özetleri aynı transaction içinde güncellenir.
+        record_order_sales(cur, sales_lines, created_at)
+
+        # Yazma kilidi transaction başından beri bizde; okunan stoklar hâlâ geçerli.
+        cur.executemany(
+            "UPDATE products SET stock_gram = stock_gram - ? WHERE id=? AND stock_gram >= ?",
+            [(need, pid, need) for pid, need in required.items()],
+        )
+        if cur.rowcount != len(required):
+            raise RuntimeError("Stok güncellenemedi. Lütfen tekrar deneyin.")
+
+        cur.executemany(
+            """
+            INSERT INTO stock_movements (product_id, change_gram, reason, ref_type, ref_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [(pid, -need, "Sipariş ile stok düşümü", "order", order_id, created_at) for pid, need in required.items()],
+        )
+
+        # Ayrılan stok artık gerçekten düşüldü.
+        if holder:
+            delete_holds(cur, holder)
+
+    return order_id
+
+
+def place_order(
+    db_path: str, cart: list[dict[str, Any]], customer: dict[str, Any], holder: str | None = None
+) -> int:
+    """Siparişi oluşturur ve id'sini döner.
+
+    customer: name, phone, delivery_type, address, note
+    holder: checkout'ta ayırma yapan sepetin anahtarı; kendi ayırmaları stoktan düşülmez.
+    Stok yetersizse StockShortageError; kilit alınamazsa (tekrar denemelerden
+    sonra) sqlite3.OperationalError yükselir.
+    """
+    return retry_on_busy(_place_order, db_path, cart, customer, holder)
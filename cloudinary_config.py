@@ -1,17 +1,35 @@
 """
 Cloudinary görsel yükleme ve yönetimi
+
+SDK ve .env yalnızca Cloudinary gerçekten kullanıldığında yüklenir;
+uygulama açılışında import edilmesi maliyetsizdir.
 """
 
 import os
-import cloudinary
-from cloudinary.uploader import upload
-from dotenv import load_dotenv
 
-# Environment variables'ı yükle
-load_dotenv()
+
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+
+
+def has_env_file() -> bool:
+    """dotenv import edilmeden .env olup olmadığına bakar."""
+    return os.path.exists(ENV_FILE)
+
+
+def load_env():
+    """.env dosyasındaki değişkenleri yükle (python-dotenv kurulu değilse atlanır)"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
 
 def init_cloudinary():
     """Cloudinary'i başlat"""
+    import cloudinary
+
+    load_env()
     cloudinary.config(
         cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
         api_key=os.getenv('CLOUDINARY_API_KEY'),
@@ -21,6 +39,8 @@ def init_cloudinary():
 def upload_image_to_cloudinary(file_path, folder="kahve"):
     """Görseli Cloudinary'e yükle"""
     try:
+        from cloudinary.uploader import upload
+
         result = upload(
             file_path,
             folder=folder,
@@ -33,5 +53,6 @@ def upload_image_to_cloudinary(file_path, folder="kahve"):
 
 def get_cloudinary_url(image_name, folder="kahve"):
     """Cloudinary URL'i oluştur"""
+    load_env()
     cloud_name = os.getenv('CLOUDINARY_CLOUD_NAME')
     return f"https://res.cloudinary.com/{cloud_name}/image/upload/{folder}/{image_name}"
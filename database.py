@@ -1,279 +1,398 @@
 import os
+import random
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
 
+from flask import g, has_app_context
+
 
 DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "kahveci.db")
 
+# Havuz ayarları: worker başına en fazla bu kadar açık bağlantı tutulur.
+DEFAULT_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+# Havuz doluyken yeni bağlantı için beklenecek en uzun süre (saniye).
+DEFAULT_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# Bu süreden uzun boşta kalan bağlantı tekrar verilmeden önce yoklanır.
+HEALTH_CHECK_INTERVAL = 30.0
+
+# Depolama profilleri: bağlantı açılırken uygulanan PRAGMA ayarları.
+# WAL modunda okuyucular yazan transaction'ı (örn. checkout) beklemez.
+STORAGE_PROFILES: dict[str, dict[str, object]] = {
+    "default": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # WAL ile güvenli; commit başına fsync yok
+        "cache_size": -16000,  # negatif değer KiB demek (~16 MB)
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+    # Eski davranış: rollback journal, SQLite varsayılanları.
+    "legacy": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+}
+DEFAULT_STORAGE_PROFILE = os.environ.get("DB_STORAGE_PROFILE", "default")
+
+# SQLITE_BUSY durumunda yazma işlemleri için tekrar deneme ayarları.
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05  # saniye; her denemede ikiye katlanır
+
+_storage_settings: dict[str, dict[str, object]] = {}
+
+# Yeni bağlantıların sınıfı; istek profili açıkken sorguları ölçen alt sınıfla değiştirilir.
+_connection_factory: type[sqlite3.Connection] = sqlite3.Connection
+
+# Milisaniye hassasiyetli UTC zaman damgası; aynı saniyedeki değişiklikler de ayırt edilir.
+UPDATED_AT_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# FTS index'ine yazılan metnin Türkçe katlaması (catalog_search.fold_tr ile aynı kural).
+FTS_FOLD_SQL = "replace(COALESCE({col}, ''), 'ı', 'i')"
+
+
+# orders üzerindeki denormalize toplamları order_items'tan yeniden hesaplar.
+ORDER_TOTALS_UPDATE_SQL = """
+UPDATE orders SET
+    total_amount = (SELECT COALESCE(SUM(oi.price * oi.quantity), 0) FROM order_items oi WHERE oi.order_id = orders.id),
+    item_count = (SELECT COALESCE(SUM(oi.quantity), 0) FROM order_items oi WHERE oi.order_id = orders.id),
+    total_gram = (SELECT COALESCE(SUM(oi.gram * oi.quantity), 0) FROM order_items oi WHERE oi.order_id = orders.id)
+"""
+
+
+# Tüm zaman damgaları (created_at vb.) Türkiye saatiyle (UTC+3) yazılır;
+# tarih aralıkları da aynı saat diliminde hesaplanmalı.
+TR_OFFSET = timedelta(hours=3)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def tr_now() -> datetime:
+    return (datetime.now(timezone.utc) + TR_OFFSET).replace(tzinfo=None)
+
 
 def _utc_now_str() -> str:
     # Türkiye saatine göre (UTC+3)
-    now_utc = datetime.now(timezone.utc)
-    now_tr = now_utc + timedelta(hours=3)
-    return now_tr.strftime("%Y-%m-%d %H:%M:%S")
+    return tr_now().strftime(TIMESTAMP_FORMAT)
+
+
+def tr_day_bounds(days_back: int = 0) -> tuple[str, str]:
+    """Bugünün (ya da `days_back` gün öncesinin) [00:00, ertesi gün 00:00) aralığı.
+
+    `date(created_at)` gibi kolonu fonksiyona saran filtreler index kullanamaz;
+    bunun yerine `created_at >= ? AND created_at < ?` ile bu sınırlar kullanılır.
+    """
+    start = tr_now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days_back)
+    end = start + timedelta(days=1)
+    return start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)
 
 
 def get_db_path(app_db_path: str | None = None) -> str:
     return app_db_path or DEFAULT_DB_PATH
 
 
-def create_connection(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+def configure_storage(db_path: str, profile: str | None = None, **overrides):
+    name = profile or DEFAULT_STORAGE_PROFILE
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Bilinmeyen depolama profili: {name}")
+    settings = dict(STORAGE_PROFILES[name])
+    settings.update(overrides)
+    _storage_settings[db_path] = settings
+    return settings
+
+
+def get_storage_settings(db_path: str) -> dict[str, object]:
+    settings = _storage_settings.get(db_path)
+    if settings is None:
+        settings = configure_storage(db_path)
+    return settings
+
+
+def set_connection_factory(factory: type[sqlite3.Connection] | None):
+    """Bundan sonra açılan bağlantıların sınıfını değiştirir (None: varsayılan)."""
+    global _connection_factory
+    _connection_factory = factory or sqlite3.Connection
+
+
+def create_connection(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    settings = get_storage_settings(db_path)
+    conn = sqlite3.connect(
+        db_path,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=check_same_thread,
+        timeout=int(settings["busy_timeout"]) / 1000,
+        factory=_connection_factory,
+    )
     conn.row_factory = sqlite3.Row
     # Foreign key kısıtları SQLite'ta default kapalı gelir.
     conn.execute("PRAGMA foreign_keys = ON;")
+    # Bağlantı bazlı ayarlar; journal_mode dosyaya kalıcı yazıldığı için migration sırasında uygulanır.
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']};")
+    conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])};")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])};")
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']};")
     return conn
 
 
-@contextmanager
-def db_cursor(db_path: str):
+def apply_journal_mode(db_path: str) -> str:
+    mode = str(get_storage_settings(db_path)["journal_mode"])
     conn = create_connection(db_path)
     try:
-        cur = conn.cursor()
-        yield conn, cur
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
+        return retry_on_busy(lambda: conn.execute(f"PRAGMA journal_mode = {mode};").fetchone()[0])
     finally:
         conn.close()
 
 
-def init_db(db_path: str):
-    with db_cursor(db_path) as (conn, cur):
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                roast_type TEXT NOT NULL,
-                price_250 REAL NOT NULL,
-                price_500 REAL NOT NULL,
-                price_1000 REAL NOT NULL,
-                stock_gram INTEGER NOT NULL DEFAULT 0,
-                image_path TEXT,
-                is_active INTEGER NOT NULL DEFAULT 1
-            );
-            """
-        )
-
-        cur.execute("PRAGMA table_info(products);")
-        product_cols = [r[1] for r in cur.fetchall()]
-        if "origin" not in product_cols:
-            cur.execute("ALTER TABLE products ADD COLUMN origin TEXT;")
-        if "process" not in product_cols:
-            cur.execute("ALTER TABLE products ADD COLUMN process TEXT;")
-        if "altitude" not in product_cols:
-            cur.execute("ALTER TABLE products ADD COLUMN altitude INTEGER;")
-        if "tasting_notes" not in product_cols:
-            cur.execute("ALTER TABLE products ADD COLUMN tasting_notes TEXT;")
-        if "acidity" not in product_cols:
-            cur.execute("ALTER TABLE products ADD COLUMN acidity INTEGER NOT NULL DEFAULT 3;")
-        if "body" not in product_cols:
-            cur.execute("ALTER TABLE products ADD COLUMN body INTEGER NOT NULL DEFAULT 3;")
-        if "sweetness" not in product_cols:
-            cur.execute("ALTER TABLE products ADD COLUMN sweetness INTEGER NOT NULL DEFAULT 3;")
-        if "espresso_compatible" not in product_cols:
-            cur.execute("ALTER TABLE products ADD COLUMN espresso_compatible INTEGER NOT NULL DEFAULT 0;")
-        if "updated_at" not in product_cols:
-            cur.execute("ALTER TABLE products ADD COLUMN updated_at TEXT;")
-            cur.execute("UPDATE products SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL;")
-
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_name TEXT NOT NULL,
-                customer_phone TEXT NOT NULL,
-                status TEXT NOT NULL,
-                created_at TEXT NOT NULL
-            );
-            """
-        )
-
-        cur.execute("PRAGMA table_info(orders);")
-        order_cols = [r[1] for r in cur.fetchall()]
-        if "delivery_type" not in order_cols:
-            cur.execute("ALTER TABLE orders ADD COLUMN delivery_type TEXT NOT NULL DEFAULT 'pickup';")
-        if "address" not in order_cols:
-            cur.execute("ALTER TABLE orders ADD COLUMN address TEXT;")
-        if "note" not in order_cols:
-            cur.execute("ALTER TABLE orders ADD COLUMN note TEXT;")
-
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS order_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_id INTEGER NOT NULL,
-                product_id INTEGER NOT NULL,
-                grind_type TEXT NOT NULL,
-                gram INTEGER NOT NULL,
-                price REAL NOT NULL,
-                FOREIGN KEY(order_id) REFERENCES orders(id) ON DELETE CASCADE,
-                FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE RESTRICT
-            );
-            """
-        )
-
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS product_images (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id INTEGER NOT NULL,
-                image_path TEXT NOT NULL,
-                sort_order INTEGER NOT NULL DEFAULT 0,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE CASCADE
-            );
-            """
-        )
-
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS stock_movements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id INTEGER NOT NULL,
-                change_gram INTEGER NOT NULL,
-                reason TEXT NOT NULL,
-                ref_type TEXT,
-                ref_id INTEGER,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE RESTRICT
-            );
-            """
-        )
-
-        # Basit migration: eski tabloda qty/unit_price varsa, yeni şemaya taşır.
-        cur.execute("PRAGMA table_info(order_items);")
-        cols = [r[1] for r in cur.fetchall()]
-        if "unit_price" in cols or "qty" in cols:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS order_items_new (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    order_id INTEGER NOT NULL,
-                    product_id INTEGER NOT NULL,
-                    grind_type TEXT NOT NULL,
-                    gram INTEGER NOT NULL,
-                    price REAL NOT NULL,
-                    FOREIGN KEY(order_id) REFERENCES orders(id) ON DELETE CASCADE,
-                    FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE RESTRICT
-                );
-                """
-            )
-
-            # Eski tabloda price alanı çoğunlukla toplam fiyat olduğu için direkt taşınır.
-            cur.execute(
-                """
-                INSERT INTO order_items_new (id, order_id, product_id, grind_type, gram, price)
-                SELECT id, order_id, product_id, grind_type, gram, price
-                FROM order_items;
-                """
-            )
-            cur.execute("DROP TABLE order_items;")
-            cur.execute("ALTER TABLE order_items_new RENAME TO order_items;")
-
-        # Basit index'ler
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_product_images_product_id ON product_images(product_id);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_product_id ON stock_movements(product_id);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_created_at ON stock_movements(created_at);")
-
-        # İlk kurulumda örnek ürünler (uygulama boş açılmasın diye).
-        cur.execute("SELECT COUNT(*) FROM products;")
-        count = int(cur.fetchone()[0])
-        if count == 0:
-            cur.executemany(
-                """
-                INSERT INTO products (name, description, roast_type, price_250, price_500, price_1000, stock_gram, image_path, is_active)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
-                """,
-                [
-                    (
-                        "Kolombiya Supremo",
-                        "Çikolata ve fındık notaları. Dengeli gövde.",
-                        "Orta",
-                        220.0,
-                        410.0,
-                        780.0,
-                        10000,  # 10 kg
-                        "https://res.cloudinary.com/doduufpwn/image/upload/kahve/f7zzfyfphqbkc02u8ikr",
-                    ),
-                    (
-                        "Etiyopya Yirgacheffe",
-                        "Çiçeksi aroma, narenciye asiditesi.",
-                        "Açık",
-                        250.0,
-                        470.0,
-                        890.0,
-                        10000,  # 10 kg
-                        "https://res.cloudinary.com/doduufpwn/image/upload/kahve/fy5s9rhdwrijm3wnzxpr",
-                    ),
-                    (
-                        "Brezilya Santos",
-                        "Karamel tatlılığı, düşük asidite.",
-                        "Koyu",
-                        210.0,
-                        395.0,
-                        750.0,
-                        10000,  # 10 kg
-                        "https://res.cloudinary.com/doduufpwn/image/upload/kahve/nz5z5tiwedvcxz9fcjrv",
-                    ),
-                    (
-                        "Guatemala Antigua",
-                        "Baharatlı bitiş, kakao notaları.",
-                        "Orta",
-                        235.0,
-                        440.0,
-                        840.0,
-                        10000,  # 10 kg
-                        "https://res.cloudinary.com/doduufpwn/image/upload/kahve/i5vxuwqxpeansc4mjag6",
-                    ),
-                    (
-                        "Kenya AA",
-                        "Canlı asidite, kırmızı meyve notaları.",
-                        "Açık",
-                        265.0,
-                        495.0,
-                        945.0,
-                        10000,  # 10 kg
-                        "https://res.cloudinary.com/doduufpwn/image/upload/kahve/icx6z4pf1z1subck6wn3",
-                    ),
-                    (
-                        "Costa Rica Tarrazu",
-                        "Temiz fincan, karamel ve narenciye.",
-                        "Orta",
-                        245.0,
-                        465.0,
-                        895.0,
-                        10000,  # 10 kg
-                        "https://res.cloudinary.com/doduufpwn/image/upload/kahve/yr9wetjfpypjg7pjgy5q",
-                    ),
-                    (
-                        "Espresso Harmanı",
-                        "Yoğun gövde, kremamsı bitiş. Espresso için ideal.",
-                        "Koyu",
-                        230.0,
-                        430.0,
-                        820.0,
-                        10000,  # 10 kg
-                        "https://res.cloudinary.com/doduufpwn/image/upload/kahve/zh9aqxetn75eyccwwytr",
-                    ),
-                    (
-                        "Filtre Harmanı",
-                        "Dengeli, aromatik. Günlük filtre için.",
-                        "Orta",
-                        215.0,
-                        405.0,
-                        770.0,
-                        10000,  # 10 kg
-                        "https://res.cloudinary.com/doduufpwn/image/upload/kahve/bmpdmvkeryapy5i2nvzw",
-                    ),
-                ],
-            )
+def is_busy_error(exc: BaseException) -> bool:
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        # Genişletilmiş kodların alt 8 biti ana kodu verir: 5 = SQLITE_BUSY, 6 = SQLITE_LOCKED
+        return code & 0xFF in (5, 6)
+    msg = str(exc).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+
+def retry_on_busy(func, *args, retries: int = BUSY_RETRIES, backoff: float = BUSY_BACKOFF, **kwargs):
+    """SQLITE_BUSY/LOCKED hatasında artan beklemeyle tekrar dener."""
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if attempt >= retries or not is_busy_error(e):
+                raise
+            # Aynı anda düşen worker'lar aynı anda tekrar denemesin diye jitter.
+            time.sleep(backoff * (2**attempt) * random.uniform(0.5, 1.5))
+            attempt += 1
+
+
+class PoolTimeoutError(RuntimeError):
+    pass
+
+
+class ConnectionPool:
+    """Tek bir veritabanı dosyası için sınırlı boyutlu bağlantı havuzu.
+
+    Boştaki bağlantılar LIFO tutulur; en son kullanılan (cache'i sıcak olan)
+    bağlantı ilk verilir. Uzun süre boşta kalan bağlantı verilmeden önce
+    `SELECT 1` ile yoklanır, bozuksa kapatılıp yerine yenisi açılır.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_POOL_TIMEOUT,
+        health_check_interval: float = HEALTH_CHECK_INTERVAL,
+    ):
+        self.db_path = db_path
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle: list[tuple[sqlite3.Connection, float]] = []
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def _open(self) -> sqlite3.Connection:
+        # Havuzdaki bağlantı farklı thread'lerde kullanılabilir; aynı anda
+        # tek thread'e verildiği için check_same_thread kapatılıyor.
+        return create_connection(self.db_path, check_same_thread=False)
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"Bağlantı havuzu dolu ({self.max_size}): {self.db_path}")
+                self._cond.wait(remaining)
+
+        if conn is not None:
+            if time.monotonic() - last_used < self.health_check_interval or self._is_healthy(conn):
+                return conn
+            self._discard(conn, release_slot=False)
+
+        try:
+            return self._open()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn: sqlite3.Connection, discard: bool = False):
+        if not discard and conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                discard = True
+
+        if discard:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, conn: sqlite3.Connection, release_slot: bool = True):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        if release_slot:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_pid = os.getpid()
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str, max_size: int | None = None) -> ConnectionPool:
+    global _pools_pid
+
+    with _pools_lock:
+        # gunicorn fork sonrası parent'tan gelen bağlantılar paylaşılmamalı.
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = ConnectionPool(db_path, max_size=max_size or DEFAULT_POOL_SIZE)
+            _pools[db_path] = pool
+        return pool
+
+
+def get_request_connection(db_path: str) -> sqlite3.Connection:
+    # Aynı istek içindeki tüm sorgular tek bağlantıyı paylaşır;
+    # bağlantı teardown_appcontext'te havuza geri verilir.
+    conns = g.setdefault("_db_conns", {})
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = get_pool(db_path).acquire()
+        conns[db_path] = conn
+    return conn
+
+
+def release_request_connections(exc: BaseException | None = None):
+    conns = g.pop("_db_conns", None)
+    if not conns:
+        return
+    for db_path, conn in conns.items():
+        get_pool(db_path).release(conn)
+
+
+def init_db_app(app):
+    configure_storage(app.config["DB_PATH"], app.config.get("DB_STORAGE_PROFILE"))
+    get_pool(app.config["DB_PATH"], max_size=app.config.get("DB_POOL_SIZE"))
+    app.teardown_appcontext(release_request_connections)
+
+
+@contextmanager
+def borrow_connection(db_path: str):
+    if has_app_context():
+        yield get_request_connection(db_path)
+        return
+
+    pool = get_pool(db_path)
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def transaction(db_path: str, immediate: bool = True):
+    """Birden çok yazmayı tek transaction'da toplar.
+
+    IMMEDIATE ile yazma kilidi en başta alınır; okunan stok değerleri commit'e
+    kadar başka bir yazar tarafından değiştirilemez. Kilit alınamazsa
+    SQLITE_BUSY transaction başında (henüz iş yapılmadan) yükselir.
+    """
+    with borrow_connection(db_path) as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE;" if immediate else "BEGIN;")
+            yield cur
+            conn.commit()
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+@contextmanager
+def db_cursor(db_path: str):
+    with borrow_connection(db_path) as conn:
+        cur = conn.cursor()
+        try:
+            yield conn, cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+def init_db(db_path: str) -> list[int]:
+    """Şemayı günceller; uygulanan migration sürümlerini döner (güncelse boş liste).
+
+    Şema güncelse yalnızca user_version okunur; journal_mode migration
+    çalışırken (veya `python migrations.py up` ile) uygulanır.
+    """
+    # migrations bu modülü import ediyor; döngüye girmemek için burada alınır.
+    from migrations import migrate
+
+    return migrate(db_path)
 
 
 def fetch_all(db_path: str, sql: str, params: tuple = ()):
@@ -288,16 +407,30 @@ def fetch_one(db_path: str, sql: str, params: tuple = ()):
         return cur.fetchone()
 
 
-def execute(db_path: str, sql: str, params: tuple = ()) -> int:
+def _execute(db_path: str, sql: str, params: tuple) -> int:
     with db_cursor(db_path) as (conn, cur):
         cur.execute(sql, params)
         return cur.lastrowid
 
 
-def execute_many(db_path: str, sql: str, seq_of_params: list[tuple]):
+def _execute_many(db_path: str, sql: str, seq_of_params: list[tuple]):
     with db_cursor(db_path) as (conn, cur):
         cur.executemany(sql, seq_of_params)
 
 
+def execute(db_path: str, sql: str, params: tuple = ()) -> int:
+    return retry_on_busy(_execute, db_path, sql, params)
+
+
+def execute_many(db_path: str, sql: str, seq_of_params: list[tuple]):
+    # Generator gelirse tekrar denemede tükenmiş olmasın.
+    seq_of_params = list(seq_of_params)
+    return retry_on_busy(_execute_many, db_path, sql, seq_of_params)
+
+
+def explain_query_plan(db_path: str, sql: str, params: tuple = ()) -> list[str]:
+    return [r["detail"] for r in fetch_all(db_path, "EXPLAIN QUERY PLAN " + sql, params)]
+
+
 def now_str() -> str:
     return _utc_now_str()
@@ -0,0 +1,86 @@
+"""
+Şablon parçası (fragment) cache'i: ürün kartları bir kez render edilip tekrar kullanılır
+
+Anahtar veritabanı + ürün id + updated_at + kullanılabilir stok + temadır;
+cache process genelinde tek olduğu için farklı veritabanlarının aynı id'li
+ürünleri karışmaz. Ürün değişince updated_at (trigger'larla) değiştiği için
+eski kart kendiliğinden kullanılmaz olur ve LRU sınırıyla zamanla düşer.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from flask import current_app, request
+from markupsafe import Markup
+
+
+FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", "512"))
+
+PRODUCT_CARD_TEMPLATE = "client/_product_card.html"
+PRODUCT_CARD_COMPACT_TEMPLATE = "client/_product_card_compact.html"
+
+
+class FragmentCache:
+    def __init__(self, max_entries: int = FRAGMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, Markup] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key: tuple, render: Callable[[], str]) -> Markup:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = Markup(render())
+
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+fragment_cache = FragmentCache()
+
+
+def _theme() -> str:
+    # Tema şu an tarayıcıda (localStorage) seçiliyor; cookie'ye taşınırsa anahtar ayrışır.
+    return request.cookies.get("theme", "")
+
+
+def cached_fragment(template_name: str, key: tuple, **context: Any) -> Markup:
+    """`template_name`'i context ile render eder; aynı anahtar için cache'ten döner."""
+    return fragment_cache.get_or_render(
+        (current_app.config.get("DB_PATH"), template_name, _theme(), *key),
+        lambda: current_app.jinja_env.get_template(template_name).render(**context),
+    )
+
+
+def product_card(p, held: dict[int, int] | None = None, compact: bool = False) -> Markup:
+    pid = int(p["id"])
+    stock = int((p["stock_gram"] or 0) - (held or {}).get(pid, 0))
+    template_name = PRODUCT_CARD_COMPACT_TEMPLATE if compact else PRODUCT_CARD_TEMPLATE
+    return cached_fragment(template_name, (pid, p["updated_at"], stock), p=p, stock=stock)
+
+
+def init_fragment_cache(app):
+    app.jinja_env.globals.update(product_card=product_card, cached_fragment=cached_fragment)
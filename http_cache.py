@@ -0,0 +1,109 @@
+"""
+Katalog sayfaları için koşullu GET (ETag / Last-Modified)
+
+ETag, sayfada gösterilen ürünlerin id + updated_at değerlerinden, ayrılmış
+stoktan ve sepet sayacından üretilir. Tarayıcının gönderdiği If-None-Match
+eşleşirse şablon hiç render edilmeden 304 döner.
+
+Last-Modified bilgi amaçlı gönderilir; sepet ve ayırmalar tarih olarak
+ifade edilemediği için 304 kararı yalnızca ETag ile verilir.
+
+ETag'e yayın kimliği de girer: RENDER_GIT_COMMIT, yoksa şablon dosyalarının
+ve statik dosya manifest'inin özeti. İkisi de içerikten türediği için
+bütün worker'larda aynıdır.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from flask import Response, current_app, request, session
+
+from cart_store import cart_count
+
+
+def release_id(app) -> str:
+    """Yeni sürüm yayına alınınca (şablonlar değişmiş olabilir) tüm ETag'ler değişir."""
+    commit = os.environ.get("RENDER_GIT_COMMIT")
+    if commit:
+        return commit
+
+    digest = hashlib.sha1()
+    template_folder = os.path.join(app.root_path, app.template_folder or "templates")
+    for root, dirs, files in os.walk(template_folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, template_folder).replace(os.sep, "/").encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    # Sayfalardaki statik adresler (?v=<hash> / hash'li adlar) manifest'ten gelir.
+    assets = {
+        "manifest": app.extensions.get("asset_manifest", {}),
+        "build": app.extensions.get("asset_build", {}),
+    }
+    digest.update(json.dumps(assets, sort_keys=True).encode())
+    return digest.hexdigest()[:12]
+
+
+def init_http_cache(app):
+    # init_assets'ten sonra çağrılmalı.
+    app.extensions["release_id"] = release_id(app)
+
+
+class PageValidators:
+    def __init__(self, etag: str, last_modified: datetime | None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def _parse_updated_at(value) -> datetime | None:
+    if not value:
+        return None
+    try:
+        # updated_at UTC tutulur ("YYYY-MM-DD HH:MM:SS[.fff]").
+        return datetime.strptime(str(value)[:19], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def page_validators(page: str, rows, held: dict[int, int] | None = None) -> PageValidators | None:
+    """Flash mesajı bekleyen isteklerde None döner (sayfa o ana özel)."""
+    if session.get("_flashes"):
+        return None
+
+    held = held or {}
+    digest = hashlib.sha1()
+    digest.update(f"{current_app.extensions['release_id']}|{page}|{cart_count()}".encode())
+    last_modified = None
+    for r in rows:
+        pid = int(r["id"])
+        updated_at = r["updated_at"] if "updated_at" in r.keys() else None
+        digest.update(f"|{pid}:{updated_at}:{held.get(pid, 0)}".encode())
+        parsed = _parse_updated_at(updated_at)
+        if parsed and (last_modified is None or parsed > last_modified):
+            last_modified = parsed
+    return PageValidators(digest.hexdigest()[:20], last_modified)
+
+
+def not_modified(validators: PageValidators | None) -> Response | None:
+    if validators is None or not request.if_none_match.contains(validators.etag):
+        return None
+    return apply_validators(Response(status=304), validators)
+
+
+def apply_validators(response: Response, validators: PageValidators | None) -> Response:
+    if validators is None:
+        return response
+    response.set_etag(validators.etag)
+    if validators.last_modified:
+        response.last_modified = validators.last_modified
+    # Sepet sayacı kullanıcıya özel: paylaşılan cache'lerde tutulmaz, her seferinde doğrulanır.
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+    response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,297 @@
+"""
+Ürün görselleri için küçük boyutlu WebP/JPEG varyantları ve srcset üretimi
+
+Yerel görseller (static/images) birkaç genişlikte yeniden boyutlanır ve
+image_variants tablosuna kaydedilir. Cloudinary görselleri için dosya
+üretilmez; aynı genişlikler URL dönüşümleriyle (f_auto, w_...) istenir.
+Admin yüklemelerinin varyantları istek içinde değil, arka plandaki tek bir
+thread'de üretilir; hazır olana kadar sayfalarda orijinal görsel gösterilir
+(process kapanırken bekleyen işler backfill ile tamamlanabilir).
+Pillow kurulu değilse (açılışta uyarı loglanır) varyant üretilmez, görseller eskisi gibi tek boyutta gösterilir.
+
+Kullanım:
+    python image_variants.py backfill [--force]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import os
+import queue
+import sys
+import threading
+
+from flask import current_app, url_for
+from markupsafe import Markup, escape
+
+from catalog_cache import get_image_variants
+from database import UPDATED_AT_SQL, db_cursor, fetch_all, get_db_path, now_str
+from upload_store import is_content_addressed
+
+VARIANT_WIDTHS = (320, 640, 1024)
+# (format, uzantı, kayıt parametreleri)
+VARIANT_FORMATS = (
+    ("webp", "webp", {"quality": 80, "method": 6}),
+    ("jpeg", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+)
+VARIANT_DIR = "images/variants"
+
+CARD_SIZES = "(max-width: 576px) 100vw, (max-width: 992px) 50vw, 33vw"
+THUMB_SIZES = "(max-width: 992px) 50vw, 25vw"
+DETAIL_SIZES = "(max-width: 992px) 100vw, 42vw"
+
+_CLOUDINARY_MARKER = "/image/upload/"
+
+
+def _pillow():
+    """(Image, ImageOps) ya da Pillow kurulu değilse None; açılışta yüklenmesin diye ilk kullanımda import edilir."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:  # Pillow isteğe bağlı
+        return None
+    return Image, ImageOps
+
+
+def is_local_image(image_path: str | None) -> bool:
+    return bool(image_path) and not image_path.startswith(("http://", "https://", "//", "/"))
+
+
+def image_url(image_path: str | None) -> str:
+    """Kayıtlı görselin adresi: CDN/tam adresler olduğu gibi, yerel yollar static altından."""
+    if not image_path:
+        return ""
+    if not is_local_image(image_path):
+        return image_path
+    return url_for("static", filename=image_path)
+
+
+def generate_variants(static_folder: str, image_path: str) -> list[tuple[int, str, str, int]]:
+    """Varyant dosyalarını yazar; (genişlik, format, varyant yolu, bayt) listesi döner."""
+    pil = _pillow()
+    if pil is None:
+        return []
+    Image, ImageOps = pil
+
+    source = os.path.join(static_folder, image_path)
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    # Farklı klasörlerdeki aynı adlı dosyalar çakışmasın.
+    tag = hashlib.sha1(image_path.encode("utf-8")).hexdigest()[:8]
+    os.makedirs(os.path.join(static_folder, VARIANT_DIR), exist_ok=True)
+
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        else:
+            img = img.convert("RGB")
+
+        widths = [w for w in VARIANT_WIDTHS if w < img.width] or [img.width]
+        variants = []
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.LANCZOS)
+            for fmt, ext, options in VARIANT_FORMATS:
+                variant_path = f"{VARIANT_DIR}/{stem}-{tag}-{width}.{ext}"
+                full_path = os.path.join(static_folder, variant_path)
+                resized.save(full_path, fmt.upper(), **options)
+                variants.append((width, fmt, variant_path, os.path.getsize(full_path)))
+    return variants
+
+
+def store_variants(db_path: str, image_path: str, variants: list[tuple[int, str, str, int]]):
+    with db_cursor(db_path) as (conn, cur):
+        cur.execute("DELETE FROM image_variants WHERE image_path=?", (image_path,))
+        cur.executemany(
+            """
+            INSERT INTO image_variants (image_path, width, format, variant_path, bytes, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [(image_path, w, fmt, path, size, now_str()) for w, fmt, path, size in variants],
+        )
+        # Görseli kullanan ürünler güncellenmiş sayılır; diğer worker'ların cache'i tazelenir.
+        cur.execute(
+            f"""
+            UPDATE products SET updated_at = {UPDATED_AT_SQL}
+            WHERE image_path = ? OR id IN (SELECT product_id FROM product_images WHERE image_path = ?)
+            """,
+            (image_path, image_path),
+        )
+
+
+def process_image(db_path: str, static_folder: str, image_path: str) -> int:
+    if _pillow() is None or not is_local_image(image_path):
+        return 0
+    if not os.path.exists(os.path.join(static_folder, image_path)):
+        return 0
+    variants = generate_variants(static_folder, image_path)
+    store_variants(db_path, image_path, variants)
+    return len(variants)
+
+
+def process_uploaded_images(db_path: str, static_folder: str, image_paths: list[str]):
+    """Admin yüklemelerinden sonra çağrılır; bozuk görsel yüklemeyi engellemez."""
+    done = set()
+    if image_paths:
+        placeholders = ", ".join("?" for _ in image_paths)
+        rows = fetch_all(
+            db_path,
+            f"SELECT DISTINCT image_path FROM image_variants WHERE image_path IN ({placeholders})",
+            tuple(image_paths),
+        )
+        done = {r["image_path"] for r in rows}
+    for image_path in image_paths:
+        # İçerik adresli dosyanın içeriği değişmez; daha önce işlendiyse tekrar gerekmez.
+        if image_path in done and is_content_addressed(image_path):
+            continue
+        try:
+            process_image(db_path, static_folder, image_path)
+        except Exception as e:
+            print(f"Görsel varyantı oluşturulamadı ({image_path}): {e}")
+
+
+class VariantWorker:
+    """Yüklenen görsellerin varyantlarını sırayla üreten arka plan thread'i."""
+
+    def __init__(self, db_path: str, static_folder: str):
+        self.db_path = db_path
+        self.static_folder = static_folder
+        self.jobs: queue.Queue[list[str]] = queue.Queue()
+        self.pid = os.getpid()
+        self.thread = threading.Thread(target=self._loop, name="image-variant-worker", daemon=True)
+
+    def _loop(self):
+        while True:
+            image_paths = self.jobs.get()
+            try:
+                process_uploaded_images(self.db_path, self.static_folder, image_paths)
+            except Exception as e:
+                print(f"Görsel varyantı kuyruğu hatası: {e}")
+            finally:
+                self.jobs.task_done()
+
+    def alive(self) -> bool:
+        # fork sonrası parent'ın thread'i child'da çalışmaz.
+        return self.pid == os.getpid() and self.thread.is_alive()
+
+
+def schedule_variants(image_paths: list[str]):
+    """Admin route'larından çağrılır; isteği bekletmeden varyant üretimini kuyruğa alır."""
+    image_paths = [p for p in image_paths if is_local_image(p)]
+    if not image_paths or _pillow_missing():
+        return
+    worker = current_app.extensions.get("image_variants")
+    if worker is None or not worker.alive():
+        # Thread ilk yüklemede başlar; açılışta ek thread yok.
+        worker = VariantWorker(current_app.config["DB_PATH"], current_app.static_folder)
+        worker.thread.start()
+        current_app.extensions["image_variants"] = worker
+    worker.jobs.put(image_paths)
+
+
+def backfill_variants(db_path: str, static_folder: str, force: bool = False) -> tuple[int, int]:
+    rows = fetch_all(
+        db_path,
+        """
+        SELECT image_path FROM products WHERE image_path IS NOT NULL
+        UNION
+        SELECT image_path FROM product_images WHERE image_path IS NOT NULL
+        """,
+    )
+    done = {r["image_path"] for r in fetch_all(db_path, "SELECT DISTINCT image_path FROM image_variants")}
+
+    images = 0
+    files = 0
+    for r in rows:
+        image_path = r["image_path"]
+        if not is_local_image(image_path) or (image_path in done and not force):
+            continue
+        try:
+            n = process_image(db_path, static_folder, image_path)
+        except Exception as e:
+            print(f"Atlandı ({image_path}): {e}")
+            continue
+        if n:
+            images += 1
+            files += n
+    return images, files
+
+
+def cloudinary_variant_url(url: str, width: int) -> str:
+    return url.replace(_CLOUDINARY_MARKER, f"{_CLOUDINARY_MARKER}f_auto,q_auto,c_limit,w_{width}/", 1)
+
+
+def _srcset(items: list[tuple[str, int]]) -> str:
+    return ", ".join(f"{escape(url)} {width}w" for url, width in items)
+
+
+def responsive_img(image_path: str | None, alt: str = "", sizes: str = CARD_SIZES, css_class: str = "", eager: bool = False):
+    """<img>/<picture> etiketi: srcset, sizes ve lazy-loading ile."""
+    if not image_path:
+        return Markup("")
+
+    loading = 'fetchpriority="high"' if eager else 'loading="lazy"'
+    attrs = f'class="{escape(css_class)}" alt="{escape(alt)}" {loading} decoding="async"'
+
+    if "res.cloudinary.com" in image_path and _CLOUDINARY_MARKER in image_path:
+        srcset = _srcset([(cloudinary_variant_url(image_path, w), w) for w in VARIANT_WIDTHS])
+        src = cloudinary_variant_url(image_path, VARIANT_WIDTHS[1])
+        return Markup(f'<img src="{escape(src)}" srcset="{srcset}" sizes="{escape(sizes)}" {attrs}>')
+
+    src = image_url(image_path)
+    if not is_local_image(image_path):
+        return Markup(f'<img src="{escape(src)}" {attrs}>')
+
+    variants = get_image_variants(current_app.config["DB_PATH"]).get(image_path)
+    if not variants:
+        return Markup(f'<img src="{escape(src)}" {attrs}>')
+
+    by_format: dict[str, list[tuple[str, int]]] = {}
+    for width, fmt, variant_path in variants:
+        by_format.setdefault(fmt, []).append((url_for("static", filename=variant_path), width))
+
+    jpeg = by_format.get("jpeg") or [(src, 0)]
+    fallback = jpeg[min(1, len(jpeg) - 1)][0]
+    img = f'<img src="{escape(fallback)}" srcset="{_srcset(jpeg)}" sizes="{escape(sizes)}" {attrs}>'
+    if "webp" not in by_format:
+        return Markup(img)
+    return Markup(
+        f'<picture><source type="image/webp" srcset="{_srcset(by_format["webp"])}" sizes="{escape(sizes)}">'
+        f"{img}</picture>"
+    )
+
+
+def _pillow_missing() -> bool:
+    # Açılışı yavaşlatmamak için Pillow import edilmeden yalnızca varlığına bakılır.
+    return importlib.util.find_spec("PIL") is None
+
+
+def init_image_helpers(app):
+    app.extensions["image_variants"] = None
+    if _pillow_missing():
+        app.logger.warning("Pillow kurulu değil; görsel varyantları üretilmeyecek (pip install Pillow).")
+    app.jinja_env.globals.update(
+        responsive_img=responsive_img,
+        image_url=image_url,
+        CARD_SIZES=CARD_SIZES,
+        THUMB_SIZES=THUMB_SIZES,
+        DETAIL_SIZES=DETAIL_SIZES,
+    )
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "backfill"
+    if command != "backfill":
+        print("Kullanım: python image_variants.py backfill [--force]")
+        sys.exit(1)
+    if _pillow() is None:
+        print("Pillow kurulu değil: pip install Pillow")
+        sys.exit(1)
+
+    db_path = get_db_path(os.environ.get("DB_PATH"))
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "static")
+    images, files = backfill_variants(db_path, static_folder, force="--force" in sys.argv)
+    print(f"Varyant üretildi: {images} görsel, {files} dosya")
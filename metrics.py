@@ -0,0 +1,380 @@
+"""
+Prometheus metin formatında metrikler: istek süreleri, DB süresi, checkout sonuçları, cache'ler
+
+Sayaçlar ve histogramlar process içinde tutulur. METRICS_DIR verilirse her
+worker kendi değerlerini en geç METRICS_FLUSH_INTERVAL saniyede bir
+METRICS_DIR/metrics-<pid>.json dosyasına yazar; /admin/metrics hangi
+worker'a düşerse düşsün tüm dosyaları toplayıp gösterir. Worker kapanırken
+kendi dosyasını siler; pid'i artık yaşamayan dosyalar (çöken worker'lar)
+toplanmaz ve temizlenir. Bu yüzden METRICS_DIR tek makineye ait olmalıdır. Cache isabet
+oranları toplanmış hit/miss sayılarından, DB ve WAL boyutu okuma anında
+dosyadan hesaplanır.
+
+İstek başına SQL süresi REQUEST_PROFILE=1 iken (request_profile) ölçülür.
+
+Kullanım:
+    python metrics.py            # METRICS_DIR'deki toplanmış metrikleri basar
+"""
+
+from __future__ import annotations
+
+import atexit
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable
+
+from flask import Response, current_app, g, request
+
+from request_profile import current_profile
+
+
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "1"))
+METRICS_PREFIX = "kahveci_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _label_key(labelnames: tuple[str, ...], labels: dict[str, object]) -> str:
+    # JSON dosyasında da anahtar olarak kullanılabilsin diye string.
+    return json.dumps([str(labels.get(name, "")) for name in labelnames], ensure_ascii=False)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # etiket -> [kova sayıları..., +Inf, toplam, adet]
+        self._values: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 3)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self) -> dict[str, list[float]]:
+        with self._lock:
+            return {k: list(v) for k, v in self._values.items()}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: dict[str, Counter | Histogram] = {}
+        # Okuma anında değeri alınan kümülatif sayılar (ör. cache hit/miss).
+        self._collectors: dict[str, Callable[[], dict[tuple, float]]] = {}
+        self._collector_meta: dict[str, tuple[str, tuple[str, ...]]] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = self.metrics[name] = Counter(name, documentation, labelnames)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        metric = self.metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return metric
+
+    def register_collector(
+        self, name: str, documentation: str, labelnames: tuple[str, ...], collect: Callable[[], dict[tuple, float]]
+    ):
+        """`collect` etiket değerleri tuple'ı -> kümülatif değer döner; sayaç olarak gösterilir."""
+        self._collectors[name] = collect
+        self._collector_meta[name] = (documentation, labelnames)
+
+    def snapshot(self) -> dict:
+        data = {name: metric.snapshot() for name, metric in self.metrics.items()}
+        for name, collect in self._collectors.items():
+            labelnames = self._collector_meta[name][1]
+            try:
+                values = collect()
+            except Exception:
+                values = {}
+            data[name] = {
+                _label_key(labelnames, dict(zip(labelnames, label_values))): float(v)
+                for label_values, v in values.items()
+            }
+        return data
+
+    def describe(self, name: str) -> tuple[str, str, tuple[str, ...]]:
+        metric = self.metrics.get(name)
+        if metric is not None:
+            return metric.kind, metric.documentation, metric.labelnames
+        documentation, labelnames = self._collector_meta[name]
+        return "counter", documentation, labelnames
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "request_duration_seconds", "İstek süresi (endpoint bazında)", ("endpoint", "method")
+)
+REQUESTS = registry.counter("requests_total", "Tamamlanan istekler", ("endpoint", "method", "status"))
+REQUEST_DB_TIME = registry.histogram(
+    "request_db_seconds", "İstek başına toplam SQL süresi (REQUEST_PROFILE=1)", ("endpoint",), DB_TIME_BUCKETS
+)
+CHECKOUTS = registry.counter("checkouts_total", "Checkout denemeleri (sonuç ve sebep)", ("outcome", "reason"))
+# Değerler init_metrics'te cache nesnelerine bağlanır.
+registry.register_collector("cache_hits_total", "Cache isabetleri", ("cache",), dict)
+registry.register_collector("cache_misses_total", "Cache ıskaları", ("cache",), dict)
+
+
+def record_checkout(reason: str | None = None):
+    """reason None ise başarılı sipariş; değilse başarısızlık sebebi (stock_shortage, invalid_phone, ...)."""
+    if reason is None:
+        CHECKOUTS.inc(outcome="success", reason="")
+    else:
+        CHECKOUTS.inc(outcome="failed", reason=reason)
+
+
+def merge_snapshots(snapshots: list[dict]) -> dict:
+    merged: dict[str, dict] = {}
+    for snapshot in snapshots:
+        for name, values in snapshot.items():
+            target = merged.setdefault(name, {})
+            for key, value in values.items():
+                if isinstance(value, list):
+                    current = target.get(key)
+                    target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    target[key] = target.get(key, 0.0) + value
+    return merged
+
+
+class MetricsFile:
+    """Bu worker'ın anlık görüntüsünü METRICS_DIR altına yazar."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+        self.flushed_at = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def flush(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self.flushed_at < METRICS_FLUSH_INTERVAL:
+            return
+        with self._lock:
+            self.flushed_at = now
+            # fork sonrası dosya adı yeni pid'le oluşturulur.
+            self.path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(registry.snapshot(), f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def remove(self):
+        """Worker kapanırken çağrılır; değerleri artık toplama girmez."""
+        with self._lock:
+            try:
+                os.unlink(os.path.join(self.directory, f"metrics-{os.getpid()}.json"))
+            except FileNotFoundError:
+                pass
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # Windows'ta os.kill(pid, 0) süreci sonlandırır; kontrol yapılmaz.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def load_snapshots(directory: str) -> list[dict]:
+    snapshots = []
+    for path in sorted(glob.glob(os.path.join(directory, "metrics-*.json"))):
+        pid = os.path.basename(path)[len("metrics-") : -len(".json")]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            # Kapanışta silemeden ölmüş worker; sayaçları yeniden toplanmasın.
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # Yazılırken okunan ya da silinen dosya; bir sonraki okumada gelir.
+            continue
+    return snapshots
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: tuple[str, ...], key: str, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, json.loads(key))]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(data: dict, db_path: str | None = None) -> str:
+    lines = []
+    for name in sorted(data):
+        try:
+            kind, documentation, labelnames = registry.describe(name)
+        except KeyError:
+            continue
+        full_name = METRICS_PREFIX + name
+        lines.append(f"# HELP {full_name} {documentation}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for key, value in sorted(data[name].items()):
+            if kind == "histogram":
+                buckets = registry.metrics[name].buckets
+                cumulative = 0.0
+                for bound, count in zip((*buckets, float("inf")), value):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _format_labels(labelnames, key, 'le="' + le + '"')
+                    lines.append(f"{full_name}_bucket{labels} {_format_value(cumulative)}")
+                lines.append(f"{full_name}_sum{_format_labels(labelnames, key)} {_format_value(value[-2])}")
+                lines.append(f"{full_name}_count{_format_labels(labelnames, key)} {_format_value(value[-1])}")
+            else:
+                lines.append(f"{full_name}{_format_labels(labelnames, key)} {_format_value(value)}")
+
+    lines += _cache_ratio_lines(data)
+    if db_path:
+        lines += _db_size_lines(db_path)
+    return "\n".join(lines) + "\n"
+
+
+def _cache_ratio_lines(data: dict) -> list[str]:
+    hits = data.get("cache_hits_total", {})
+    misses = data.get("cache_misses_total", {})
+    if not hits and not misses:
+        return []
+    name = METRICS_PREFIX + "cache_hit_ratio"
+    lines = [f"# HELP {name} Cache isabet oranı (tüm worker'lar)", f"# TYPE {name} gauge"]
+    for key in sorted(set(hits) | set(misses)):
+        h, m = hits.get(key, 0.0), misses.get(key, 0.0)
+        lines.append(f"{name}{_format_labels(('cache',), key)} {_format_value(h / (h + m) if h + m else 0.0)}")
+    return lines
+
+
+def _db_size_lines(db_path: str) -> list[str]:
+    lines = []
+    for suffix, name, documentation in (
+        ("", "db_file_bytes", "Veritabanı dosyası boyutu"),
+        ("-wal", "db_wal_bytes", "WAL dosyası boyutu"),
+    ):
+        try:
+            size = os.path.getsize(db_path + suffix)
+        except OSError:
+            size = 0
+        full_name = METRICS_PREFIX + name
+        lines += [f"# HELP {full_name} {documentation}", f"# TYPE {full_name} gauge", f"{full_name} {size}"]
+    return lines
+
+
+_file: MetricsFile | None = None
+
+
+def collect_text(db_path: str | None = None) -> str:
+    if _file is None:
+        return render(registry.snapshot(), db_path)
+    _file.flush(force=True)
+    return render(merge_snapshots(load_snapshots(_file.directory)), db_path)
+
+
+def _cache_collector(caches: dict[str, object], attribute: str) -> Callable[[], dict[tuple, float]]:
+    return lambda: {(name,): float(getattr(cache, attribute, 0)) for name, cache in caches.items()}
+
+
+def init_metrics(app, directory: str | None = None):
+    global _file
+
+    from catalog_cache import catalog_cache
+    from fragment_cache import fragment_cache
+
+    caches = {"catalog": catalog_cache, "fragment": fragment_cache}
+    cart_store = app.extensions.get("cart_store")
+    if hasattr(cart_store, "hits"):
+        caches["cart"] = cart_store
+    registry.register_collector("cache_hits_total", "Cache isabetleri", ("cache",), _cache_collector(caches, "hits"))
+    registry.register_collector("cache_misses_total", "Cache ıskaları", ("cache",), _cache_collector(caches, "misses"))
+
+    directory = METRICS_DIR if directory is None else directory
+    if directory:
+        _file = MetricsFile(directory)
+        atexit.register(lambda: _file.remove())
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or "404"
+        REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, method=request.method)
+        REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        profile = current_profile()
+        if profile is not None:
+            REQUEST_DB_TIME.observe(profile.sql_ms / 1000, endpoint=endpoint)
+        if _file is not None:
+            _file.flush()
+        return response
+
+
+def metrics_response() -> Response:
+    return Response(collect_text(current_app.config["DB_PATH"]), content_type=CONTENT_TYPE)
+
+
+if __name__ == "__main__":
+    if not METRICS_DIR:
+        print("Kullanım: METRICS_DIR=<klasör> python metrics.py")
+        sys.exit(1)
+    sys.stdout.write(render(merge_snapshots(load_snapshots(METRICS_DIR))))
@@ -0,0 +1,736 @@
+"""
+Sürümlü şema migration'ları
+
+Her migration numaralıdır; uygulanan son numara veritabanı başlığındaki
+PRAGMA user_version'da, geçmişi schema_migrations tablosunda tutulur.
+Açılışta yalnızca user_version okunur; şema güncelse başka hiçbir sorgu
+çalışmaz. Migration gerekiyorsa dosya kilidiyle tek bir process uygular,
+diğer worker'lar kilidi bekleyip güncel şemayla devam eder.
+
+Kullanım:
+    python migrations.py status
+    python migrations.py up [sürüm]
+    python migrations.py down <sürüm>    # verilen sürüme kadar geri alır
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from contextlib import contextmanager
+from typing import Callable, NamedTuple
+
+from database import (
+    FTS_FOLD_SQL,
+    ORDER_TOTALS_UPDATE_SQL,
+    UPDATED_AT_SQL,
+    apply_journal_mode,
+    create_connection,
+    get_db_path,
+    now_str,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    up: Callable
+    down: Callable | None
+
+
+class IrreversibleMigrationError(RuntimeError):
+    pass
+
+
+def _fts_values_sql(prefix: str) -> str:
+    cols = ("name", "description", "origin", "process", "tasting_notes")
+    return ", ".join(FTS_FOLD_SQL.format(col=f"{prefix}{c}") for c in cols)
+
+
+def _baseline(cur):
+    # Migration sisteminden önceki init_db'nin tamamı. Eski (user_version = 0)
+    # veritabanlarında da güvenle çalışır: tablolar/kolonlar yoksa eklenir,
+    # eski order_items şemaları taşınır, boş veritabanına örnek ürünler yazılır.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            roast_type TEXT NOT NULL,
+            price_250 REAL NOT NULL,
+            price_500 REAL NOT NULL,
+            price_1000 REAL NOT NULL,
+            stock_gram INTEGER NOT NULL DEFAULT 0,
+            image_path TEXT,
+            is_active INTEGER NOT NULL DEFAULT 1
+        );
+        """
+    )
+
+    cur.execute("PRAGMA table_info(products);")
+    product_cols = [r[1] for r in cur.fetchall()]
+    if "origin" not in product_cols:
+        cur.execute("ALTER TABLE products ADD COLUMN origin TEXT;")
+    if "process" not in product_cols:
+        cur.execute("ALTER TABLE products ADD COLUMN process TEXT;")
+    if "altitude" not in product_cols:
+        cur.execute("ALTER TABLE products ADD COLUMN altitude INTEGER;")
+    if "tasting_notes" not in product_cols:
+        cur.execute("ALTER TABLE products ADD COLUMN tasting_notes TEXT;")
+    if "acidity" not in product_cols:
+        cur.execute("ALTER TABLE products ADD COLUMN acidity INTEGER NOT NULL DEFAULT 3;")
+    if "body" not in product_cols:
+        cur.execute("ALTER TABLE products ADD COLUMN body INTEGER NOT NULL DEFAULT 3;")
+    if "sweetness" not in product_cols:
+        cur.execute("ALTER TABLE products ADD COLUMN sweetness INTEGER NOT NULL DEFAULT 3;")
+    if "espresso_compatible" not in product_cols:
+        cur.execute("ALTER TABLE products ADD COLUMN espresso_compatible INTEGER NOT NULL DEFAULT 0;")
+    if "updated_at" not in product_cols:
+        cur.execute("ALTER TABLE products ADD COLUMN updated_at TEXT;")
+        cur.execute(f"UPDATE products SET updated_at = {UPDATED_AT_SQL} WHERE updated_at IS NULL;")
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_name TEXT NOT NULL,
+            customer_phone TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        """
+    )
+
+    cur.execute("PRAGMA table_info(orders);")
+    order_cols = [r[1] for r in cur.fetchall()]
+    if "delivery_type" not in order_cols:
+        cur.execute("ALTER TABLE orders ADD COLUMN delivery_type TEXT NOT NULL DEFAULT 'pickup';")
+    if "address" not in order_cols:
+        cur.execute("ALTER TABLE orders ADD COLUMN address TEXT;")
+    if "note" not in order_cols:
+        cur.execute("ALTER TABLE orders ADD COLUMN note TEXT;")
+    # Liste sayfaları toplamları order_items'tan toplamak yerine buradan okur.
+    backfill_totals = "total_amount" not in order_cols
+    if "total_amount" not in order_cols:
+        cur.execute("ALTER TABLE orders ADD COLUMN total_amount REAL NOT NULL DEFAULT 0;")
+    if "item_count" not in order_cols:
+        cur.execute("ALTER TABLE orders ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0;")
+    if "total_gram" not in order_cols:
+        cur.execute("ALTER TABLE orders ADD COLUMN total_gram INTEGER NOT NULL DEFAULT 0;")
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            grind_type TEXT NOT NULL,
+            gram INTEGER NOT NULL,
+            price REAL NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 1,
+            FOREIGN KEY(order_id) REFERENCES orders(id) ON DELETE CASCADE,
+            FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE RESTRICT
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS product_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            image_path TEXT NOT NULL,
+            sort_order INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE CASCADE
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            change_gram INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            ref_type TEXT,
+            ref_id INTEGER,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE RESTRICT
+        );
+        """
+    )
+
+    # Basit migration: eski tabloda qty/unit_price varsa, yeni şemaya taşır.
+    cur.execute("PRAGMA table_info(order_items);")
+    cols = [r[1] for r in cur.fetchall()]
+    if "unit_price" in cols or "qty" in cols:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_items_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                grind_type TEXT NOT NULL,
+                gram INTEGER NOT NULL,
+                price REAL NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 1,
+                FOREIGN KEY(order_id) REFERENCES orders(id) ON DELETE CASCADE,
+                FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE RESTRICT
+            );
+            """
+        )
+
+        # Eski tabloda price alanı çoğunlukla toplam fiyat olduğu için direkt taşınır.
+        cur.execute(
+            """
+            INSERT INTO order_items_new (id, order_id, product_id, grind_type, gram, price)
+            SELECT id, order_id, product_id, grind_type, gram, price
+            FROM order_items;
+            """
+        )
+        cur.execute("DROP TABLE order_items;")
+        cur.execute("ALTER TABLE order_items_new RENAME TO order_items;")
+
+    # Adet kolonu: eskiden her adet için ayrı satır yazılıyordu. Aynı siparişteki
+    # birebir aynı satırlar (ürün, öğütme, gram, fiyat) tek satırda birleştirilir.
+    cur.execute("PRAGMA table_info(order_items);")
+    cols = [r[1] for r in cur.fetchall()]
+    if "quantity" not in cols:
+        cur.execute("ALTER TABLE order_items ADD COLUMN quantity INTEGER NOT NULL DEFAULT 1;")
+        cur.execute(
+            """
+            CREATE TEMP TABLE order_items_groups AS
+            SELECT MIN(id) AS keep_id, COUNT(*) AS n
+            FROM order_items
+            GROUP BY order_id, product_id, grind_type, gram, price
+            HAVING COUNT(*) > 1;
+            """
+        )
+        cur.execute(
+            """
+            UPDATE order_items
+            SET quantity = (SELECT n FROM order_items_groups WHERE keep_id = order_items.id)
+            WHERE id IN (SELECT keep_id FROM order_items_groups);
+            """
+        )
+        cur.execute(
+            """
+            DELETE FROM order_items
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM order_items
+                GROUP BY order_id, product_id, grind_type, gram, price
+            );
+            """
+        )
+        cur.execute("DROP TABLE order_items_groups;")
+
+    if backfill_totals:
+        cur.execute(ORDER_TOTALS_UPDATE_SQL)
+
+    # Çok satanlar için önceden hesaplanmış satış özeti (checkout'ta artırılır).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS product_sales_stats (
+            product_id INTEGER PRIMARY KEY,
+            units_sold INTEGER NOT NULL DEFAULT 0,
+            grams_sold INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            last_sold_at TEXT,
+            FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE CASCADE
+        );
+        """
+    )
+
+    # Günlük satış özeti (gün × ürün × gram × öğütme). Raporlar ve son N günün
+    # çok satanları sipariş geçmişi yerine bu tablodan okunur.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            day TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            gram INTEGER NOT NULL,
+            grind_type TEXT NOT NULL,
+            units INTEGER NOT NULL DEFAULT 0,
+            grams INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, product_id, gram, grind_type),
+            FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+        """
+    )
+    # Eski ürün×gün özeti daily_sales ile değiştirildi.
+    cur.execute("DROP TABLE IF EXISTS product_sales_daily;")
+
+    # Basit index'ler
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_product_images_product_id ON product_images(product_id);")
+    # Keyset sayfalama: filtre + (created_at, id) sırası aynı index'ten okunur
+    # (id rowid olduğu için index'e örtük olarak eklenir).
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_created_at ON orders(status, created_at);")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_stock_movements_product_created_at "
+        "ON stock_movements(product_id, created_at);"
+    )
+    # Yukarıdaki bileşik index product_id aramalarını da karşılıyor.
+    cur.execute("DROP INDEX IF EXISTS idx_stock_movements_product_id;")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_created_at ON stock_movements(created_at);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products(updated_at);")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_product_sales_stats_units "
+        "ON product_sales_stats(units_sold DESC, product_id DESC);"
+    )
+
+    # updated_at her ürün değişikliğinde (stok, aktiflik, galeri dahil) güncellenir;
+    # katalog cache'i diğer worker'lardaki değişiklikleri buradan anlar.
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_touch_insert
+        AFTER INSERT ON products
+        WHEN NEW.updated_at IS NULL
+        BEGIN
+            UPDATE products SET updated_at = {UPDATED_AT_SQL} WHERE id = NEW.id;
+        END;
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_touch_update
+        AFTER UPDATE ON products
+        WHEN NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE products SET updated_at = {UPDATED_AT_SQL} WHERE id = NEW.id;
+        END;
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_product_images_touch_insert
+        AFTER INSERT ON product_images
+        BEGIN
+            UPDATE products SET updated_at = {UPDATED_AT_SQL} WHERE id = NEW.product_id;
+        END;
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_product_images_touch_delete
+        AFTER DELETE ON product_images
+        BEGIN
+            UPDATE products SET updated_at = {UPDATED_AT_SQL} WHERE id = OLD.product_id;
+        END;
+        """
+    )
+
+    # Tam metin arama: isim, açıklama, menşei, işleme ve tadım notları.
+    # Index trigger'larla products tablosuyla senkron tutulur.
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, description, origin, process, tasting_notes,
+            tokenize = "unicode61 remove_diacritics 2",
+            prefix = '2 3'
+        );
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_insert
+        AFTER INSERT ON products
+        BEGIN
+            INSERT INTO products_fts (rowid, name, description, origin, process, tasting_notes)
+            VALUES (NEW.id, {_fts_values_sql("NEW.")});
+        END;
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_update
+        AFTER UPDATE OF name, description, origin, process, tasting_notes ON products
+        BEGIN
+            DELETE FROM products_fts WHERE rowid = OLD.id;
+            INSERT INTO products_fts (rowid, name, description, origin, process, tasting_notes)
+            VALUES (NEW.id, {_fts_values_sql("NEW.")});
+        END;
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_delete
+        AFTER DELETE ON products
+        BEGIN
+            DELETE FROM products_fts WHERE rowid = OLD.id;
+        END;
+        """
+    )
+    # Index yeni oluşturulduysa (ya da trigger'lar öncesinden kalma kayıt varsa) doldur.
+    cur.execute("SELECT (SELECT COUNT(*) FROM products) - (SELECT COUNT(*) FROM products_fts);")
+    if int(cur.fetchone()[0]) != 0:
+        cur.execute("DELETE FROM products_fts;")
+        cur.execute(
+            f"""
+            INSERT INTO products_fts (rowid, name, description, origin, process, tasting_notes)
+            SELECT id, {_fts_values_sql("")} FROM products;
+            """
+        )
+
+    # İlk kurulumda örnek ürünler (uygulama boş açılmasın diye).
+    cur.execute("SELECT COUNT(*) FROM products;")
+    count = int(cur.fetchone()[0])
+    if count == 0:
+        cur.executemany(
+            """
+            INSERT INTO products (name, description, roast_type, price_250, price_500, price_1000, stock_gram, image_path, is_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+            """,
+            [
+                (
+                    "Kolombiya Supremo",
+                    "Çikolata ve fındık notaları. Dengeli gövde.",
+                    "Orta",
+                    220.0,
+                    410.0,
+                    780.0,
+                    10000,  # 10 kg
+                    "https://res.cloudinary.com/doduufpwn/image/upload/kahve/f7zzfyfphqbkc02u8ikr",
+                ),
+                (
+                    "Etiyopya Yirgacheffe",
+                    "Çiçeksi aroma, narenciye asiditesi.",
+                    "Açık",
+                    250.0,
+                    470.0,
+                    890.0,
+                    10000,  # 10 kg
+                    "https://res.cloudinary.com/doduufpwn/image/upload/kahve/fy5s9rhdwrijm3wnzxpr",
+                ),
+                (
+                    "Brezilya Santos",
+                    "Karamel tatlılığı, düşük asidite.",
+                    "Koyu",
+                    210.0,
+                    395.0,
+                    750.0,
+                    10000,  # 10 kg
+                    "https://res.cloudinary.com/doduufpwn/image/upload/kahve/nz5z5tiwedvcxz9fcjrv",
+                ),
+                (
+                    "Guatemala Antigua",
+                    "Baharatlı bitiş, kakao notaları.",
+                    "Orta",
+                    235.0,
+                    440.0,
+                    840.0,
+                    10000,  # 10 kg
+                    "https://res.cloudinary.com/doduufpwn/image/upload/kahve/i5vxuwqxpeansc4mjag6",
+                ),
+                (
+                    "Kenya AA",
+                    "Canlı asidite, kırmızı meyve notaları.",
+                    "Açık",
+                    265.0,
+                    495.0,
+                    945.0,
+                    10000,  # 10 kg
+                    "https://res.cloudinary.com/doduufpwn/image/upload/kahve/icx6z4pf1z1subck6wn3",
+                ),
+                (
+                    "Costa Rica Tarrazu",
+                    "Temiz fincan, karamel ve narenciye.",
+                    "Orta",
+                    245.0,
+                    465.0,
+                    895.0,
+                    10000,  # 10 kg
+                    "https://res.cloudinary.com/doduufpwn/image/upload/kahve/yr9wetjfpypjg7pjgy5q",
+                ),
+                (
+                    "Espresso Harmanı",
+                    "Yoğun gövde, kremamsı bitiş. Espresso için ideal.",
+                    "Koyu",
+                    230.0,
+                    430.0,
+                    820.0,
+                    10000,  # 10 kg
+                    "https://res.cloudinary.com/doduufpwn/image/upload/kahve/zh9aqxetn75eyccwwytr",
+                ),
+                (
+                    "Filtre Harmanı",
+                    "Dengeli, aromatik. Günlük filtre için.",
+                    "Orta",
+                    215.0,
+                    405.0,
+                    770.0,
+                    10000,  # 10 kg
+                    "https://res.cloudinary.com/doduufpwn/image/upload/kahve/bmpdmvkeryapy5i2nvzw",
+                ),
+            ],
+        )
+
+
+def _stock_reservations(cur):
+    # Checkout sırasında süreli stok ayırmaları (bkz. reservations.py).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stock_reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            holder TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            gram INTEGER NOT NULL,
+            expires_at TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE CASCADE
+        );
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_stock_reservations_product_expires "
+        "ON stock_reservations(product_id, expires_at);"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_reservations_holder ON stock_reservations(holder);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_reservations_expires_at ON stock_reservations(expires_at);")
+
+
+def _drop_stock_reservations(cur):
+    cur.execute("DROP TABLE IF EXISTS stock_reservations;")
+
+
+def _carts(cur):
+    # Sunucu tarafı sepetler; cookie'de yalnızca id ve sürüm tutulur (bkz. cart_store.py).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS carts (
+            id TEXT PRIMARY KEY,
+            items TEXT NOT NULL DEFAULT '[]',
+            version TEXT NOT NULL,
+            phone TEXT,
+            updated_at TEXT NOT NULL
+        );
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_carts_phone_updated_at ON carts(phone, updated_at);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_carts_updated_at ON carts(updated_at);")
+
+
+def _drop_carts(cur):
+    cur.execute("DROP TABLE IF EXISTS carts;")
+
+
+def _image_variants(cur):
+    # Ürün görsellerinin küçültülmüş WebP/JPEG kopyaları (bkz. image_variants.py).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS image_variants (
+            image_path TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            format TEXT NOT NULL,
+            variant_path TEXT NOT NULL,
+            bytes INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (image_path, width, format)
+        ) WITHOUT ROWID;
+        """
+    )
+
+
+def _drop_image_variants(cur):
+    cur.execute("DROP TABLE IF EXISTS image_variants;")
+
+
+def _upload_jobs(cur):
+    # Görsellerin CDN'e arka planda yüklenmesi için iş kuyruğu (bkz. upload_queue.py).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS upload_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            local_path TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TEXT NOT NULL,
+            last_error TEXT,
+            result_url TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_upload_jobs_status_next_attempt ON upload_jobs(status, next_attempt_at);"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_upload_jobs_local_path ON upload_jobs(local_path);")
+
+
+def _drop_upload_jobs(cur):
+    cur.execute("DROP TABLE IF EXISTS upload_jobs;")
+
+
+def _rate_limit_attempts(cur):
+    # Worker'lar arasında ortak deneme sınırı sayaçları (bkz. cart_store.RateLimiter).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rate_limit_attempts (
+            key TEXT NOT NULL,
+            attempted_at TEXT NOT NULL
+        );
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_rate_limit_attempts_key_attempted_at ON rate_limit_attempts(key, attempted_at);"
+    )
+
+
+def _drop_rate_limit_attempts(cur):
+    cur.execute("DROP TABLE IF EXISTS rate_limit_attempts;")
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "baseline", _baseline, None),
+    Migration(2, "stock_reservations", _stock_reservations, _drop_stock_reservations),
+    Migration(3, "carts", _carts, _drop_carts),
+    Migration(4, "image_variants", _image_variants, _drop_image_variants),
+    Migration(5, "upload_jobs", _upload_jobs, _drop_upload_jobs),
+    Migration(6, "rate_limit_attempts", _rate_limit_attempts, _drop_rate_limit_attempts),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(conn) -> int:
+    return int(conn.execute("PRAGMA user_version;").fetchone()[0])
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Aynı veritabanını kullanan process'ler arasında tek migration çalıştırıcısı."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _ensure_history_table(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        );
+        """
+    )
+    conn.commit()
+
+
+def _run(conn, migration: Migration, direction: str):
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE;")
+        if direction == "up":
+            migration.up(cur)
+            cur.execute(
+                "INSERT OR REPLACE INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, now_str()),
+            )
+            new_version = migration.version
+        else:
+            migration.down(cur)
+            cur.execute("DELETE FROM schema_migrations WHERE version=?", (migration.version,))
+            new_version = migration.version - 1
+        # user_version da transaction'ın parçası; yarım kalan migration sürümü ilerletmez.
+        cur.execute(f"PRAGMA user_version = {int(new_version)};")
+        conn.commit()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def migrate(db_path: str, target: int | None = None) -> list[int]:
+    """Şemayı `target` sürümüne (varsayılan: en son) yükseltir; uygulananları döner."""
+    target = LATEST_VERSION if target is None else target
+    conn = create_connection(db_path)
+    try:
+        # Hızlı yol: tek PRAGMA okuması, kilit yok.
+        if current_version(conn) >= target:
+            return []
+
+        with _file_lock(db_path + ".migrate.lock"):
+            # Kilidi beklerken başka bir worker migration'ı bitirmiş olabilir.
+            version = current_version(conn)
+            if version >= target:
+                return []
+            # Kalıcı ayar; yeni veya eski dosya WAL'a bu noktada geçer.
+            apply_journal_mode(db_path)
+            _ensure_history_table(conn)
+            applied = []
+            for migration in MIGRATIONS:
+                if version < migration.version <= target:
+                    _run(conn, migration, "up")
+                    applied.append(migration.version)
+            return applied
+    finally:
+        conn.close()
+
+
+def rollback(db_path: str, target: int) -> list[int]:
+    """`target` sürümünden sonraki migration'ları sondan başa geri alır."""
+    conn = create_connection(db_path)
+    try:
+        with _file_lock(db_path + ".migrate.lock"):
+            version = current_version(conn)
+            pending = [m for m in reversed(MIGRATIONS) if target < m.version <= version]
+            # Yarıda kalmasın diye geri alınamayan adım baştan kontrol edilir.
+            for migration in pending:
+                if migration.down is None:
+                    raise IrreversibleMigrationError(f"{migration.version} ({migration.name}) geri alınamaz")
+            for migration in pending:
+                _run(conn, migration, "down")
+            return [m.version for m in pending]
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    db_path = get_db_path(os.environ.get("DB_PATH"))
+
+    if command == "status":
+        conn = create_connection(db_path)
+        try:
+            version = current_version(conn)
+        finally:
+            conn.close()
+        for m in MIGRATIONS:
+            print(f"[{'x' if m.version <= version else ' '}] {m.version:03d} {m.name}")
+        print(f"Sürüm: {version} / {LATEST_VERSION}")
+    elif command == "up":
+        # Şema güncel olsa da depolama profili değişmiş olabilir.
+        apply_journal_mode(db_path)
+        applied = migrate(db_path, int(sys.argv[2]) if len(sys.argv) > 2 else None)
+        print(f"Uygulandı: {applied or 'yok'}")
+    elif command == "down" and len(sys.argv) > 2:
+        reverted = rollback(db_path, int(sys.argv[2]))
+        print(f"Geri alındı: {reverted or 'yok'}")
+    else:
+        print("Kullanım: python migrations.py status|up [sürüm]|down <sürüm>")
+        sys.exit(1)
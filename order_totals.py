@@ -0,0 +1,66 @@
+"""
+Siparişlerdeki denormalize toplamların (total_amount, item_count, total_gram) kontrolü
+
+Kullanım:
+    python order_totals.py verify     # order_items ile uyuşmayan siparişleri listeler
+    python order_totals.py backfill   # tüm siparişlerin toplamlarını yeniden hesaplar
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+from database import ORDER_TOTALS_UPDATE_SQL, db_cursor, fetch_all, get_db_path
+
+
+def find_drift(db_path: str):
+    """Kayıtlı toplamı order_items'tan hesaplanandan farklı olan siparişleri döner."""
+    return fetch_all(
+        db_path,
+        """
+        SELECT
+            o.id,
+            o.total_amount,
+            o.item_count,
+            o.total_gram,
+            COALESCE(SUM(oi.price * oi.quantity), 0) AS actual_amount,
+            COALESCE(SUM(oi.quantity), 0) AS actual_item_count,
+            COALESCE(SUM(oi.gram * oi.quantity), 0) AS actual_total_gram
+        FROM orders o
+        LEFT JOIN order_items oi ON oi.order_id = o.id
+        GROUP BY o.id
+        HAVING ABS(o.total_amount - actual_amount) > 0.005
+            OR o.item_count != actual_item_count
+            OR o.total_gram != actual_total_gram
+        ORDER BY o.id
+        """,
+    )
+
+
+def backfill_order_totals(db_path: str) -> int:
+    with db_cursor(db_path) as (conn, cur):
+        cur.execute(ORDER_TOTALS_UPDATE_SQL)
+        return cur.rowcount
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    db_path = get_db_path(os.environ.get("DB_PATH"))
+
+    if command == "verify":
+        rows = find_drift(db_path)
+        for r in rows:
+            print(
+                f"#{r['id']}: tutar {r['total_amount']:.2f} != {r['actual_amount']:.2f}, "
+                f"adet {r['item_count']} != {r['actual_item_count']}, "
+                f"gram {r['total_gram']} != {r['actual_total_gram']}"
+            )
+        print(f"Uyuşmayan sipariş: {len(rows)}")
+        sys.exit(1 if rows else 0)
+    elif command == "backfill":
+        n = backfill_order_totals(db_path)
+        print(f"Toplamları yeniden hesaplanan sipariş: {n}")
+    else:
+        print("Kullanım: python order_totals.py verify|backfill")
+        sys.exit(1)
@@ -0,0 +1,120 @@
+"""
+Keyset (cursor) sayfalama: OFFSET yerine son görülen (created_at, id) değerinden devam eder
+"""
+
+from __future__ import annotations
+
+import base64
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from database import TIMESTAMP_FORMAT, fetch_all
+
+
+PAGE_SIZE = 50
+
+
+class Page(NamedTuple):
+    rows: list
+    next_cursor: str | None  # daha eski kayıtlar
+    prev_cursor: str | None  # daha yeni kayıtlar
+
+
+class InvalidCursorError(ValueError):
+    """Sayfa imleci çözülemedi (bozuk veya elle değiştirilmiş)."""
+
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    raw = f"{created_at}|{int(row_id)}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> tuple[str, int] | None:
+    """Boş imleç için None döner; geçersiz imleçte InvalidCursorError yükseltir."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").rsplit("|", 1)
+        datetime.strptime(created_at, TIMESTAMP_FORMAT)
+        return created_at, int(row_id)
+    except Exception as e:
+        raise InvalidCursorError(f"Geçersiz sayfa imleci: {cursor!r}") from e
+
+
+def date_range_bounds(date_from: str, date_to: str) -> tuple[str | None, str | None]:
+    """'YYYY-MM-DD' girişlerini [başlangıç, bitiş) zaman damgası aralığına çevirir.
+
+    Kolon fonksiyona sarılmadığı için created_at index'i kullanılabilir.
+    """
+
+    def _parse(v: str) -> datetime | None:
+        try:
+            return datetime.strptime((v or "").strip(), "%Y-%m-%d")
+        except ValueError:
+            return None
+
+    start = _parse(date_from)
+    end = _parse(date_to)
+    return (
+        start.strftime("%Y-%m-%d %H:%M:%S") if start else None,
+        (end + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S") if end else None,
+    )
+
+
+def fetch_keyset_page(
+    db_path: str,
+    select_sql: str,
+    where: list[str],
+    params: list[object],
+    order_col: str,
+    id_col: str,
+    after: str | None = None,
+    before: str | None = None,
+    limit: int = PAGE_SIZE,
+) -> Page:
+    """(order_col, id_col) üzerinden azalan sırada bir sayfa döner.
+
+    `after` verilirse imlecin gerisindeki (daha eski), `before` verilirse
+    önündeki (daha yeni) kayıtlar okunur. Satırlarda `created_at` ve `id`
+    alanları bulunmalıdır. Bozuk imleçte InvalidCursorError yükselir.
+    """
+    where = list(where)
+    params = list(params)
+
+    after_key = decode_cursor(after)
+    before_key = None if after_key else decode_cursor(before)
+
+    if before_key:
+        where.append(f"({order_col}, {id_col}) > (?, ?)")
+        params.extend(before_key)
+        direction = "ASC"
+    else:
+        if after_key:
+            where.append(f"({order_col}, {id_col}) < (?, ?)")
+            params.extend(after_key)
+        direction = "DESC"
+
+    sql = select_sql
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order_col} {direction}, {id_col} {direction} LIMIT ?"
+    params.append(limit + 1)
+
+    rows = fetch_all(db_path, sql, tuple(params))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before_key:
+        rows.reverse()
+
+    if not rows:
+        return Page(rows, None, None)
+
+    first, last = rows[0], rows[-1]
+    older_exists = has_more if not before_key else True
+    newer_exists = has_more if before_key else bool(after_key)
+    return Page(
+        rows,
+        encode_cursor(last["created_at"], last["id"]) if older_exists else None,
+        encode_cursor(first["created_at"], first["id"]) if newer_exists else None,
+    )
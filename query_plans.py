@@ -0,0 +1,77 @@
+"""
+Sık çalışan sorguların EXPLAIN QUERY PLAN kontrolü
+
+Her sorgunun planında tam tablo/index taraması (SCAN) ve geçici B-tree ile
+sıralama/gruplama (USE TEMP B-TREE) olmamalı; tüm erişimler SEARCH ile
+index üzerinden, ORDER BY index sırasıyla yapılmalı.
+
+Kullanım:
+    python query_plans.py
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+from app.routes.admin import ACTIVE_ORDER_STATUSES, DASHBOARD_ACTIVE_SQL, DASHBOARD_TODAY_SQL
+from database import create_connection, explain_query_plan, get_db_path, tr_day_bounds
+from migrations import LATEST_VERSION, current_version
+
+
+def plan_checks() -> list[tuple[str, str, tuple]]:
+    start, end = tr_day_bounds()
+    return [
+        ("dashboard: bugünkü siparişler", DASHBOARD_TODAY_SQL, (start, end)),
+        ("dashboard: aktif siparişler", DASHBOARD_ACTIVE_SQL, tuple(ACTIVE_ORDER_STATUSES)),
+        (
+            "siparişler: durum + tarih sayfası",
+            "SELECT o.* FROM orders o WHERE o.status = ? AND o.created_at >= ? AND o.created_at < ? "
+            "AND (o.created_at, o.id) < (?, ?) ORDER BY o.created_at DESC, o.id DESC LIMIT 51",
+            ("alındı", start, end, end, 0),
+        ),
+        (
+            "stok hareketleri: ürün sayfası",
+            "SELECT sm.*, p.name FROM stock_movements sm JOIN products p ON p.id = sm.product_id "
+            "WHERE sm.product_id = ? AND (sm.created_at, sm.id) < (?, ?) "
+            "ORDER BY sm.created_at DESC, sm.id DESC LIMIT 51",
+            (1, end, 0),
+        ),
+    ]
+
+
+def check_plans(db_path: str) -> list[tuple[str, list[str], bool]]:
+    results = []
+    for name, sql, params in plan_checks():
+        plan = explain_query_plan(db_path, sql, params)
+        index_driven = not any(line.startswith(("SCAN", "USE TEMP B-TREE")) for line in plan)
+        results.append((name, plan, index_driven))
+    return results
+
+
+def schema_version(db_path: str) -> int | None:
+    """Veritabanının şema sürümü; dosya yoksa None (dosya oluşturulmaz)."""
+    if not os.path.exists(db_path):
+        return None
+    conn = create_connection(db_path)
+    try:
+        return current_version(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    db_path = get_db_path(os.environ.get("DB_PATH"))
+    version = schema_version(db_path)
+    if version is None or version < LATEST_VERSION:
+        found = "veritabanı yok" if version is None else f"şema sürümü {version} / {LATEST_VERSION}"
+        print(f"{db_path}: {found}. Önce migration'ları çalıştırın: python migrations.py up")
+        sys.exit(2)
+
+    failed = 0
+    for name, plan, ok in check_plans(db_path):
+        print(f"[{'OK' if ok else 'HATA'}] {name}")
+        for line in plan:
+            print(f"    {line}")
+        failed += 0 if ok else 1
+    sys.exit(1 if failed else 0)
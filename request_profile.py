@@ -0,0 +1,265 @@
+"""
+İstek bazında profil: SQL sayısı/süresi, en yavaş sorgular, şablon süresi, bağlantılar
+
+REQUEST_PROFILE=1 ile açılır. Açıkken yeni SQLite bağlantıları sorguları
+ölçen alt sınıfla oluşturulur (database.set_connection_factory); her
+istekte toplanan değerler Server-Timing başlığıyla döner ve son istekler
+/admin/debug/requests sayfasında en yavaş sorguların planlarıyla listelenir.
+Kapalıyken hiçbir hook kurulmaz, bağlantılar eskisi gibidir ve debug sayfası 404 döner.
+
+Sorgu parametreleri (telefon, adres...) saklanmaz; yalnızca türleri ve
+uzunlukları tutulur, planlar NULL parametrelerle çıkarılır.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from flask import before_render_template, g, request, template_rendered
+
+from database import explain_query_plan, now_str, set_connection_factory
+
+
+REQUEST_PROFILE = os.environ.get("REQUEST_PROFILE", "") not in ("", "0")
+# Debug sayfasında tutulan son istek sayısı (worker başına).
+PROFILE_HISTORY = int(os.environ.get("REQUEST_PROFILE_HISTORY", "100"))
+SLOWEST_STATEMENTS = 5
+
+_current: ContextVar[RequestProfile | None] = ContextVar("request_profile", default=None)
+_history: deque[RequestProfile] = deque(maxlen=PROFILE_HISTORY)
+_history_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+class StatementStats:
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        # En yavaş çalışmanın parametre özetleri (değerler değil); executemany'de None.
+        self.params: list[str] | None = None
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, endpoint: str | None):
+        self.id = next(_ids)
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.started_at = now_str()
+        self.status = 0
+        self.total_ms = 0.0
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.templates: list[str] = []
+        self.connections_opened = 0
+        self._connections: set[int] = set()
+        self._statements: dict[str, StatementStats] = {}
+        self._start = time.perf_counter()
+        self._template_starts: list[float] = []
+
+    @property
+    def connections_used(self) -> int:
+        return len(self._connections)
+
+    def record(self, conn, sql: str, params, ms: float, counted: bool = True):
+        stats = self._statements.get(sql)
+        if stats is None:
+            stats = self._statements[sql] = StatementStats(sql)
+        if counted:
+            self.sql_count += 1
+            stats.count += 1
+            self._connections.add(id(conn))
+            if ms >= stats.max_ms:
+                stats.max_ms = ms
+                stats.params = describe_params(params)
+        self.sql_ms += ms
+        stats.total_ms += ms
+
+    def slowest(self, n: int = SLOWEST_STATEMENTS) -> list[StatementStats]:
+        return sorted(self._statements.values(), key=lambda s: s.total_ms, reverse=True)[:n]
+
+    def finish(self, status: int):
+        self.status = status
+        self.total_ms = (time.perf_counter() - self._start) * 1000
+        # Geçmişte yalnızca en yavaş sorgular tutulur.
+        self._statements = {s.sql: s for s in self.slowest()}
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            [
+                f'db;dur={self.sql_ms:.1f};desc="SQL x{self.sql_count}"',
+                f'tpl;dur={self.template_ms:.1f};desc="Template"',
+                f'total;dur={self.total_ms:.1f};desc="Total"',
+            ]
+        )
+
+
+def describe_params(params) -> list[str] | None:
+    """Parametre değerleri yerine tür ve uzunlukları: ["int", "str(11)", "None"]."""
+    if params is None:
+        return None
+    values = params.values() if isinstance(params, dict) else params
+    described = []
+    for v in values:
+        if isinstance(v, (str, bytes)):
+            described.append(f"{type(v).__name__}({len(v)})")
+        else:
+            described.append(type(v).__name__)
+    return described
+
+
+def _record(conn, sql: str, params, start: float, counted: bool = True):
+    profile = _current.get()
+    if profile is not None:
+        profile.record(conn, sql, params, (time.perf_counter() - start) * 1000, counted)
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """execute süresine satırları okuma (fetch*) süresi de eklenir; SQLite işi adım adım yapar."""
+
+    _last_sql = ""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._last_sql = sql
+            _record(self.connection, sql, parameters, start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._last_sql = sql
+            _record(self.connection, sql, None, start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _record(self.connection, self._last_sql, None, start, counted=False)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            _record(self.connection, self._last_sql, None, start, counted=False)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _record(self.connection, self._last_sql, None, start, counted=False)
+
+
+class ProfilingConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        profile = _current.get()
+        if profile is not None:
+            profile.connections_opened += 1
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def current_profile() -> RequestProfile | None:
+    return _current.get()
+
+
+def recent_profiles() -> list[RequestProfile]:
+    """Son istekler, en yenisi başta."""
+    with _history_lock:
+        return list(reversed(_history))
+
+
+def get_profile(profile_id: int) -> RequestProfile | None:
+    with _history_lock:
+        return next((p for p in _history if p.id == profile_id), None)
+
+
+def query_plan(db_path: str, stats: StatementStats) -> list[str]:
+    """Parametreler NULL verilerek EXPLAIN QUERY PLAN; planlanamıyorsa boş liste."""
+    if stats.params is None or not stats.sql.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+        return []
+    try:
+        return explain_query_plan(db_path, stats.sql, (None,) * len(stats.params))
+    except sqlite3.Error:
+        return []
+
+
+def _template_started(sender, template, context, **extra):
+    profile = _current.get()
+    if profile is not None:
+        profile._template_starts.append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    profile = _current.get()
+    if profile is None or not profile._template_starts:
+        return
+    ms = (time.perf_counter() - profile._template_starts.pop()) * 1000
+    # İç içe render'lar dıştakinin süresine zaten dahil.
+    if not profile._template_starts:
+        profile.template_ms += ms
+    profile.templates.append(template.name or "")
+
+
+def profiling_enabled(app) -> bool:
+    return bool(app.extensions.get("request_profile"))
+
+
+def init_request_profile(app, enabled: bool | None = None):
+    enabled = app.config.get("REQUEST_PROFILE", REQUEST_PROFILE) if enabled is None else enabled
+    app.extensions["request_profile"] = bool(enabled)
+    # Admin menüsündeki "Profil" bağlantısı yalnızca profil açıkken görünür.
+    app.jinja_env.globals["request_profile_enabled"] = bool(enabled)
+    if not enabled:
+        return
+
+    set_connection_factory(ProfilingConnection)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+    @app.before_request
+    def start_request_profile():
+        profile = RequestProfile(request.method, request.path, request.endpoint)
+        g._request_profile_token = _current.set(profile)
+
+    @app.after_request
+    def finish_request_profile(response):
+        profile = _current.get()
+        if profile is None:
+            return response
+        profile.finish(response.status_code)
+        response.headers["Server-Timing"] = profile.server_timing()
+        if request.endpoint != "static":
+            with _history_lock:
+                _history.append(profile)
+        return response
+
+    @app.teardown_request
+    def clear_request_profile(exc=None):
+        token = g.pop("_request_profile_token", None)
+        if token is not None:
+            _current.reset(token)
@@ -0,0 +1,206 @@
+"""
+Stok rezervasyonları: checkout sayfası açıldığında sepetteki ürünler için süreli ayırma
+
+Ayırmalar stoktan düşülmez; gösterilen "kullanılabilir stok" ve sipariş
+anındaki stok kontrolü, başkalarının süresi dolmamış ayırmalarını hesaba katar.
+Sipariş verilince sahibinin ayırmaları aynı transaction'da silinir.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+
+from database import TIMESTAMP_FORMAT, db_cursor, fetch_all, now_str, retry_on_busy, transaction, tr_now
+
+
+# Ayırmanın geçerlilik süresi (saniye).
+STOCK_HOLD_TTL = int(os.environ.get("STOCK_HOLD_TTL", "600"))
+# Süresi dolmuş ayırmaları temizleyen arka plan thread'inin aralığı (saniye).
+REAPER_INTERVAL = float(os.environ.get("STOCK_HOLD_REAPER_INTERVAL", "60"))
+# Vitrinde gösterilen ayrılmış gram özeti bu kadar saniye process içinde tutulur.
+HELD_SNAPSHOT_TTL = 2.0
+
+
+def _expires_at(ttl: int) -> str:
+    return (tr_now() + timedelta(seconds=ttl)).strftime(TIMESTAMP_FORMAT)
+
+
+def held_by_others(cur, product_ids: list[int], holder: str | None) -> dict[int, int]:
+    """Verilen ürünlerde `holder` dışındakilerin aktif ayırmaları (gram)."""
+    if not product_ids:
+        return {}
+    placeholders = ", ".join("?" for _ in product_ids)
+    cur.execute(
+        f"""
+        SELECT product_id, SUM(gram) AS g
+        FROM stock_reservations
+        WHERE product_id IN ({placeholders}) AND expires_at > ? AND holder != ?
+        GROUP BY product_id
+        """,
+        (*product_ids, now_str(), holder or ""),
+    )
+    return {int(r["product_id"]): int(r["g"]) for r in cur.fetchall()}
+
+
+def delete_holds(cur, holder: str):
+    cur.execute("DELETE FROM stock_reservations WHERE holder=?", (holder,))
+
+
+def _reserve(db_path: str, holder: str, required: dict[int, int], ttl: int) -> list[dict]:
+    ids = list(required)
+    created_at = now_str()
+    expires_at = _expires_at(ttl)
+
+    with transaction(db_path) as cur:
+        # Sahibinin önceki ayırmaları sepet değişmiş olabileceği için yenilenir.
+        delete_holds(cur, holder)
+        if not ids:
+            return []
+
+        placeholders = ", ".join("?" for _ in ids)
+        cur.execute(f"SELECT id, name, stock_gram FROM products WHERE id IN ({placeholders}) AND is_active=1", ids)
+        products = {int(r["id"]): r for r in cur.fetchall()}
+        held = held_by_others(cur, ids, holder)
+
+        rows = []
+        shortages = []
+        for pid, need in required.items():
+            product = products.get(pid)
+            if product is None:
+                continue
+            available = max(int(product["stock_gram"] or 0) - held.get(pid, 0), 0)
+            granted = min(need, available)
+            if granted > 0:
+                rows.append((holder, pid, granted, expires_at, created_at))
+            if granted < need:
+                # Yetmeyen kısım hata değil; sipariş anında tekrar denenir.
+                shortages.append(
+                    {
+                        "product_id": pid,
+                        "name": product["name"],
+                        "required_gram": need,
+                        "available_gram": available,
+                        "held_gram": held.get(pid, 0),
+                    }
+                )
+
+        cur.executemany(
+            """
+            INSERT INTO stock_reservations (holder, product_id, gram, expires_at, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+    return shortages
+
+
+def reserve(db_path: str, holder: str, required: dict[int, int], ttl: int = STOCK_HOLD_TTL) -> list[dict]:
+    """`holder` için ayırmaları yeniler; tam ayrılamayan ürünleri döner.
+
+    Sıcak ürünlerde kısmi ayırma yapılır; kilit alınamazsa ayırmasız devam
+    edilir (stok kontrolü sipariş anında zaten yapılıyor).
+    """
+    try:
+        return retry_on_busy(_reserve, db_path, holder, required, ttl)
+    except sqlite3.OperationalError:
+        return []
+
+
+def _release(db_path: str, holder: str):
+    with db_cursor(db_path) as (conn, cur):
+        delete_holds(cur, holder)
+
+
+def release(db_path: str, holder: str):
+    """Ayırmaları bırakır; kilit alınamazsa süre dolunca temizlenirler."""
+    try:
+        retry_on_busy(_release, db_path, holder)
+    except sqlite3.OperationalError:
+        pass
+
+
+def sweep_expired(db_path: str) -> int:
+    with db_cursor(db_path) as (conn, cur):
+        cur.execute("DELETE FROM stock_reservations WHERE expires_at <= ?", (now_str(),))
+        return cur.rowcount
+
+
+_held_snapshot: dict[str, tuple[float, dict[int, int]]] = {}
+
+
+def _shared_held(db_path: str) -> dict[int, int]:
+    now = time.monotonic()
+    cached = _held_snapshot.get(db_path)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    rows = fetch_all(
+        db_path,
+        "SELECT product_id, SUM(gram) AS g FROM stock_reservations WHERE expires_at > ? GROUP BY product_id",
+        (now_str(),),
+    )
+    held = {int(r["product_id"]): int(r["g"]) for r in rows}
+    _held_snapshot[db_path] = (now + HELD_SNAPSHOT_TTL, held)
+    return held
+
+
+def held_grams_by_product(db_path: str, holder: str | None = None) -> dict[int, int]:
+    """Vitrinde stoktan düşülecek aktif ayırmalar; kısa süreli process içi cache'li.
+
+    Özet herkes için ortaktır; `holder` verilirse kendi ayırmaları özetten
+    geri eklenir, böylece ziyaretçi kendi ayırdığı stoğu tükenmiş görmez.
+    """
+    held = _shared_held(db_path)
+    if not holder:
+        return held
+
+    own = fetch_all(
+        db_path,
+        "SELECT product_id, SUM(gram) AS g FROM stock_reservations WHERE holder = ? AND expires_at > ? GROUP BY product_id",
+        (holder, now_str()),
+    )
+    if not own:
+        return held
+    held = dict(held)
+    for r in own:
+        pid = int(r["product_id"])
+        remaining = held.get(pid, 0) - int(r["g"])
+        if remaining > 0:
+            held[pid] = remaining
+        else:
+            held.pop(pid, None)
+    return held
+
+
+_reapers: dict[str, tuple[int, threading.Thread]] = {}
+_reapers_lock = threading.Lock()
+
+
+def _reaper_loop(db_path: str, interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            sweep_expired(db_path)
+        except Exception as e:
+            print(f"Rezervasyon temizleme hatası: {e}")
+
+
+def start_reaper(db_path: str, interval: float = REAPER_INTERVAL):
+    """Süresi dolan ayırmaları periyodik siler (worker process başına bir thread)."""
+    with _reapers_lock:
+        running = _reapers.get(db_path)
+        # fork sonrası parent'ın thread'i child'da çalışmaz; pid ile kontrol edilir.
+        if running and running[0] == os.getpid() and running[1].is_alive():
+            return
+        thread = threading.Thread(
+            target=_reaper_loop,
+            args=(db_path, interval),
+            name="stock-reservation-reaper",
+            daemon=True,
+        )
+        thread.start()
+        _reapers[db_path] = (os.getpid(), thread)
@@ -0,0 +1,216 @@
+"""
+Satış özetleri: çok satanlar (product_sales_stats) ve günlük satışlar (daily_sales)
+
+İkisi de checkout transaction'ında artımlı güncellenir ve sipariş geçmişinden
+yeniden kurulabilir.
+
+Kullanım:
+    python sales_stats.py rebuild
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from database import db_cursor, fetch_all, fetch_one, get_db_path, now_str
+
+
+# 0 = tüm zamanlar; örn. 7 veya 30 verilirse son N günün satışları sıralanır.
+BEST_SELLER_WINDOW_DAYS = int(os.environ.get("BEST_SELLER_WINDOW_DAYS", "0"))
+
+
+def record_order_sales(cur, lines: list[tuple[int, int, str, int, float]], sold_at: str):
+    """Sipariş transaction'ı içinde çağrılır.
+
+    lines: (product_id, gram, öğütme, adet, birim fiyat)
+    """
+    day = sold_at[:10]
+    per_product = defaultdict(lambda: [0, 0, 0.0])
+    per_variant = defaultdict(lambda: [0, 0, 0.0])
+    for pid, gram, grind_type, qty, unit_price in lines:
+        for totals in (per_product[pid], per_variant[(pid, gram, grind_type)]):
+            totals[0] += qty
+            totals[1] += gram * qty
+            totals[2] += unit_price * qty
+
+    cur.executemany(
+        """
+        INSERT INTO product_sales_stats (product_id, units_sold, grams_sold, revenue, last_sold_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(product_id) DO UPDATE SET
+            units_sold = units_sold + excluded.units_sold,
+            grams_sold = grams_sold + excluded.grams_sold,
+            revenue = revenue + excluded.revenue,
+            last_sold_at = MAX(COALESCE(last_sold_at, ''), excluded.last_sold_at)
+        """,
+        [(pid, units, grams, revenue, sold_at) for pid, (units, grams, revenue) in per_product.items()],
+    )
+    cur.executemany(
+        """
+        INSERT INTO daily_sales (day, product_id, gram, grind_type, units, grams, revenue)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(day, product_id, gram, grind_type) DO UPDATE SET
+            units = units + excluded.units,
+            grams = grams + excluded.grams,
+            revenue = revenue + excluded.revenue
+        """,
+        [
+            (day, pid, gram, grind_type, units, grams, revenue)
+            for (pid, gram, grind_type), (units, grams, revenue) in per_variant.items()
+        ],
+    )
+
+
+def rebuild_sales_stats(db_path: str) -> int:
+    """Özet tabloları sipariş geçmişinden baştan hesaplar; ürün sayısını döner."""
+    with db_cursor(db_path) as (conn, cur):
+        cur.execute("DELETE FROM product_sales_stats;")
+        cur.execute(
+            """
+            INSERT INTO product_sales_stats (product_id, units_sold, grams_sold, revenue, last_sold_at)
+            SELECT
+                oi.product_id,
+                SUM(oi.quantity),
+                SUM(oi.gram * oi.quantity),
+                SUM(oi.price * oi.quantity),
+                MAX(o.created_at)
+            FROM order_items oi
+            JOIN orders o ON o.id = oi.order_id
+            GROUP BY oi.product_id
+            """
+        )
+        count = cur.rowcount
+
+        cur.execute("DELETE FROM daily_sales;")
+        cur.execute(
+            """
+            INSERT INTO daily_sales (day, product_id, gram, grind_type, units, grams, revenue)
+            SELECT
+                substr(o.created_at, 1, 10),
+                oi.product_id,
+                oi.gram,
+                oi.grind_type,
+                SUM(oi.quantity),
+                SUM(oi.gram * oi.quantity),
+                SUM(oi.price * oi.quantity)
+            FROM order_items oi
+            JOIN orders o ON o.id = oi.order_id
+            GROUP BY substr(o.created_at, 1, 10), oi.product_id, oi.gram, oi.grind_type
+            """
+        )
+    return count
+
+
+def bootstrap_sales_stats(db_path: str):
+    # Tablolar yeni eklendiyse (eski veritabanı) geçmiş siparişlerden bir kez doldur.
+    row = fetch_one(
+        db_path,
+        """
+        SELECT
+            EXISTS(SELECT 1 FROM product_sales_stats) AND EXISTS(SELECT 1 FROM daily_sales) AS has_stats,
+            EXISTS(SELECT 1 FROM order_items) AS has_items
+        """,
+    )
+    if not row["has_stats"] and row["has_items"]:
+        rebuild_sales_stats(db_path)
+
+
+def _days_ago(days: int) -> str:
+    # Gün sınırı sipariş tarihleriyle aynı saat diliminde (TR) hesaplanır.
+    today = datetime.strptime(now_str()[:10], "%Y-%m-%d")
+    return (today - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def query_best_sellers(db_path: str, limit: int = 4, window_days: int = BEST_SELLER_WINDOW_DAYS):
+    if window_days <= 0:
+        # (units_sold DESC, product_id DESC) index'i sırayla okunur; ilk `limit` aktif ürün yeter.
+        return fetch_all(
+            db_path,
+            """
+            SELECT p.*, s.units_sold AS sold_count
+            FROM product_sales_stats s
+            JOIN products p ON p.id = s.product_id
+            WHERE p.is_active=1 AND s.units_sold > 0
+            ORDER BY s.units_sold DESC, s.product_id DESC
+            LIMIT ?
+            """,
+            (limit,),
+        )
+
+    return fetch_all(
+        db_path,
+        """
+        SELECT p.*, w.sold_count
+        FROM (
+            SELECT product_id, SUM(units) AS sold_count
+            FROM daily_sales
+            WHERE day >= ?
+            GROUP BY product_id
+        ) w
+        JOIN products p ON p.id = w.product_id
+        WHERE p.is_active=1
+        ORDER BY w.sold_count DESC, p.id DESC
+        LIMIT ?
+        """,
+        (_days_ago(window_days - 1), limit),
+    )
+
+
+def sales_report(db_path: str, day_from: str, day_to: str) -> dict:
+    """[day_from, day_to] (dahil, 'YYYY-MM-DD') aralığı için günlük özetten rapor."""
+    params = (day_from, day_to)
+    by_day = fetch_all(
+        db_path,
+        """
+        SELECT day, SUM(units) AS units, SUM(grams) AS grams, SUM(revenue) AS revenue
+        FROM daily_sales
+        WHERE day >= ? AND day <= ?
+        GROUP BY day
+        ORDER BY day ASC
+        """,
+        params,
+    )
+    by_product = fetch_all(
+        db_path,
+        """
+        SELECT ds.product_id, p.name AS product_name,
+               SUM(ds.units) AS units, SUM(ds.grams) AS grams, SUM(ds.revenue) AS revenue
+        FROM daily_sales ds
+        JOIN products p ON p.id = ds.product_id
+        WHERE ds.day >= ? AND ds.day <= ?
+        GROUP BY ds.product_id
+        ORDER BY revenue DESC, units DESC
+        """,
+        params,
+    )
+    by_variant = fetch_all(
+        db_path,
+        """
+        SELECT gram, grind_type, SUM(units) AS units, SUM(grams) AS grams, SUM(revenue) AS revenue
+        FROM daily_sales
+        WHERE day >= ? AND day <= ?
+        GROUP BY gram, grind_type
+        ORDER BY gram ASC, units DESC
+        """,
+        params,
+    )
+    totals = {
+        "units": sum(int(r["units"]) for r in by_day),
+        "grams": sum(int(r["grams"]) for r in by_day),
+        "revenue": sum(float(r["revenue"]) for r in by_day),
+    }
+    return {"by_day": by_day, "by_product": by_product, "by_variant": by_variant, "totals": totals}
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "rebuild"
+    if command != "rebuild":
+        print("Kullanım: python sales_stats.py rebuild")
+        sys.exit(1)
+
+    db_path = get_db_path(os.environ.get("DB_PATH"))
+    n = rebuild_sales_stats(db_path)
+    print(f"Satış özetleri yeniden hesaplandı: {n} ürün")
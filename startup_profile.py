@@ -0,0 +1,128 @@
+"""
+Açılış süresi ölçümü: hangi import ve hangi başlatma adımı ne kadar sürüyor
+
+STARTUP_PROFILE=1 ile uygulama modülünden önce import edilirse import'ları
+(kendi süresi ve alt import'larla toplam) ve create_app içindeki adımları
+ölçer; create_app bitince rapor yazdırılır. STARTUP_PROFILE_FILE verilirse
+rapor JSON olarak o dosyaya da yazılır. Kapalıyken adımlar boş context'tir.
+
+Kullanım:
+    python startup_profile.py            # app.py'yi ölçümle yükleyip raporu basar
+    STARTUP_PROFILE=1 python app.py
+"""
+
+from __future__ import annotations
+
+import builtins
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+
+STARTUP_PROFILE = os.environ.get("STARTUP_PROFILE", "") not in ("", "0")
+STARTUP_PROFILE_FILE = os.environ.get("STARTUP_PROFILE_FILE", "")
+REPORT_TOP = 15
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.started = time.perf_counter()
+        # modül adı -> (toplam ms, kendi ms)
+        self.imports: dict[str, tuple[float, float]] = {}
+        self.steps: list[tuple[str, float]] = []
+        self._stack: list[float] = []
+        self._original_import = None
+
+    def install(self):
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        original = self._original_import
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            # Yalnızca ilk kez yüklenen modüller ölçülür; sys.modules'tan gelenler bedava.
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            self._stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                total = (time.perf_counter() - start) * 1000
+                children = self._stack.pop()
+                if self._stack:
+                    self._stack[-1] += total
+                if name not in self.imports:
+                    self.imports[name] = (total, total - children)
+
+        builtins.__import__ = timed_import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, (time.perf_counter() - start) * 1000))
+
+    def as_dict(self, top: int = REPORT_TOP) -> dict:
+        slowest = sorted(self.imports.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "import_ms": round(sum(own for _total, own in self.imports.values()), 1),
+            "imports": [
+                {"module": name, "self_ms": round(own, 1), "total_ms": round(total, 1)}
+                for name, (total, own) in slowest
+            ],
+            "steps": [{"step": name, "ms": round(ms, 1)} for name, ms in self.steps],
+        }
+
+    def report(self, top: int = REPORT_TOP) -> str:
+        data = self.as_dict(top)
+        lines = [f"Açılış: {data['total_ms']} ms (import: {data['import_ms']} ms)", "", "En yavaş import'lar (kendi / toplam ms):"]
+        for row in data["imports"]:
+            lines.append(f"  {row['self_ms']:8.1f} {row['total_ms']:8.1f}  {row['module']}")
+        lines += ["", "Başlatma adımları (ms):"]
+        for row in data["steps"]:
+            lines.append(f"  {row['ms']:8.1f}  {row['step']}")
+        return "\n".join(lines)
+
+
+profiler = StartupProfiler() if STARTUP_PROFILE else None
+if profiler is not None:
+    profiler.install()
+
+
+def startup_step(name: str):
+    """create_app adımlarını sarar; ölçüm kapalıysa hiçbir şey yapmaz."""
+    return profiler.step(name) if profiler is not None else nullcontext()
+
+
+def finish_startup_profile():
+    """create_app sonunda çağrılır: import ölçümünü kapatır ve raporu bir kez yazar."""
+    global profiler
+    if profiler is None:
+        return
+    finished, profiler = profiler, None
+    finished.uninstall()
+    if STARTUP_PROFILE_FILE:
+        with open(STARTUP_PROFILE_FILE, "w", encoding="utf-8") as f:
+            json.dump(finished.as_dict(), f, ensure_ascii=False, indent=2)
+    print(finished.report())
+
+
+if __name__ == "__main__":
+    import runpy
+
+    # Ölçüm, app.py'nin import ettiği (ayrı) startup_profile modülünde yapılır.
+    os.environ["STARTUP_PROFILE"] = "1"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    # app.py çalıştırılır (create_app dahil) ama sunucu başlatılmaz.
+    runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"), run_name="app_profile")
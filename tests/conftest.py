@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import init_db  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Tüm migration'ları uygulanmış, örnek ürünlü boş veritabanı."""
+    path = str(tmp_path / "test.db")
+    init_db(path)
+    return path
+
+
+@pytest.fixture
+def customer():
+    return {"name": "Ali Veli", "phone": "05321234567", "delivery_type": "pickup"}
+
+
+@pytest.fixture
+def line():
+    """Sepet satırı üretir: line(ürün_id, gram=250, qty=1, unit_price=100.0)."""
+
+    def make(product_id, gram=250, qty=1, unit_price=100.0):
+        return {"product_id": product_id, "gram": gram, "grind_type": "Türk", "qty": qty, "unit_price": unit_price}
+
+    return make
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "app.db"))
+    monkeypatch.delenv("UPLOAD_BACKEND", raising=False)
+    monkeypatch.delenv("CLOUDINARY_CLOUD_NAME", raising=False)
+
+    from app import create_app
+
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,13 @@
+from assets import BUILD_DIR, build_assets
+
+
+def test_build_skips_product_images(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "client.css").write_text("body {  color : red ; }", encoding="utf-8")
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "Kenya AA Açık.png").write_bytes(b"\x89PNG" + b"0" * 1024)
+
+    manifest = build_assets(str(tmp_path))
+
+    assert list(manifest) == ["css/client.css"]
+    assert not (tmp_path / BUILD_DIR / "images").exists()
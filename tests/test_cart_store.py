@@ -0,0 +1,127 @@
+import pytest
+
+from cart_store import LRUCartBackend, RateLimiter, SQLiteCartBackend
+
+ITEMS = [{"product_id": 1, "gram": 250, "grind_type": "Türk", "qty": 2, "unit_price": 100.0}]
+
+
+@pytest.fixture
+def backend(db_path):
+    return SQLiteCartBackend(db_path)
+
+
+def test_cached_version_is_served_without_db(backend, monkeypatch):
+    lru = LRUCartBackend(backend)
+    lru.save("c1", ITEMS, "v1")
+    monkeypatch.setattr(backend, "load", lambda *a, **k: pytest.fail("veritabanına gidilmemeli"))
+
+    assert lru.load("c1", "v1") == ("v1", ITEMS)
+    assert (lru.hits, lru.misses) == (1, 0)
+
+
+def test_version_change_in_other_worker_invalidates(backend):
+    worker_a, worker_b = LRUCartBackend(backend), LRUCartBackend(backend)
+    worker_a.save("c1", ITEMS, "v1")
+    changed = ITEMS + [{**ITEMS[0], "gram": 500}]
+    worker_b.save("c1", changed, "v2")
+
+    # Cookie'deki sürüm cache'tekinden farklı: veritabanından okunur ve cache yenilenir.
+    assert worker_a.load("c1", "v2") == ("v2", changed)
+    assert (worker_a.hits, worker_a.misses) == (0, 1)
+    assert worker_a.load("c1", "v2") == ("v2", changed)
+    assert worker_a.hits == 1
+
+
+def test_cached_items_are_isolated_from_callers(backend):
+    lru = LRUCartBackend(backend)
+    lru.save("c1", ITEMS, "v1")
+    lru.load("c1", "v1")[1].append({"product_id": 2})
+    assert lru.load("c1", "v1")[1] == ITEMS
+
+
+def test_least_recently_used_entry_is_evicted(backend):
+    lru = LRUCartBackend(backend, max_entries=2)
+    for cart_id in ("c1", "c2"):
+        lru.save(cart_id, ITEMS, "v1")
+    lru.load("c1", "v1")
+    lru.save("c3", ITEMS, "v1")
+
+    assert list(lru._entries) == ["c1", "c3"]
+    # Cache'ten düşen sepet veritabanından gelir.
+    assert lru.load("c2", "v1") == ("v1", ITEMS)
+    assert lru.misses == 1
+
+
+def test_recover_copies_cart_without_sharing_it(app, client):
+    store = app.extensions["cart_store"]
+    store.save("owner", ITEMS, "v1")
+    store.attach_phone("owner", "05321234567")
+
+    client.post("/cart/recover", data={"phone": "0532 123 45 67"})
+    with client.session_transaction() as s:
+        assert s["cart_id"] != "owner"
+        assert s["cart_n"] == 2
+        assert store.load(s["cart_id"])[1] == ITEMS
+    assert store.load("owner") == ("v1", ITEMS)
+
+
+def test_recover_is_rate_limited_per_client_and_phone(app, client, monkeypatch):
+    monkeypatch.setattr("cart_store.recover_limiter", RateLimiter(limit=2, window=60))
+
+    def attempt(phone="05321234567", ip="10.0.0.1"):
+        r = client.post(
+            "/cart/recover", data={"phone": phone}, environ_base={"REMOTE_ADDR": ip}, follow_redirects=True
+        )
+        return "fazla deneme" in r.get_data(as_text=True)
+
+    assert [attempt() for _ in range(3)] == [False, False, True]
+    # Başka numara ya da başka istemci etkilenmez.
+    assert not attempt(phone="05329876543")
+    assert not attempt(ip="10.0.0.2")
+
+
+def test_rate_limit_is_shared_between_workers(db_path):
+    # Her worker kendi limiter nesnesine sahip; sayaç veritabanında ortak.
+    worker_a, worker_b = RateLimiter(limit=2, window=60), RateLimiter(limit=2, window=60)
+    assert worker_a.allow(db_path, "k")
+    assert worker_b.allow(db_path, "k")
+    assert not worker_a.allow(db_path, "k")
+    assert worker_b.allow(db_path, "other")
+
+
+def test_forwarded_client_ip_is_used_behind_proxy(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "proxy.db"))
+    monkeypatch.setenv("PROXY_FIX_HOPS", "1")
+    monkeypatch.setattr("cart_store.recover_limiter", RateLimiter(limit=1, window=60))
+    from app import create_app
+
+    client = create_app().test_client()
+
+    def attempt(forwarded_for):
+        r = client.post(
+            "/cart/recover",
+            data={"phone": "05321234567"},
+            headers={"X-Forwarded-For": forwarded_for},
+            follow_redirects=True,
+        )
+        return "fazla deneme" in r.get_data(as_text=True)
+
+    assert [attempt("1.1.1.1"), attempt("1.1.1.1")] == [False, True]
+    # Aynı proxy arkasındaki başka bir müşteri kilitlenmez.
+    assert not attempt("2.2.2.2")
+
+
+def test_recover_merges_into_current_cart(app, client):
+    store = app.extensions["cart_store"]
+    store.save("owner", ITEMS + [{**ITEMS[0], "product_id": 3, "qty": 1}], "v1")
+    store.attach_phone("owner", "05321234567")
+    client.post("/cart/add", data={"product_id": 2, "gram": 500, "grind_type": "Filtre", "qty": 1})
+    client.post("/cart/add", data={"product_id": 1, "gram": 250, "grind_type": "Türk", "qty": 1})
+
+    for _ in range(2):
+        client.post("/cart/recover", data={"phone": "05321234567"})
+    with client.session_transaction() as s:
+        items = store.load(s["cart_id"])[1]
+    lines = {(it["product_id"], it["gram"], it["qty"]) for it in items}
+    # Mevcut satır korunur, ortak satırda büyük adet kalır, tekrar getirmek adetleri katlamaz.
+    assert lines == {(2, 500, 1), (1, 250, 2), (3, 250, 1)}
@@ -0,0 +1,42 @@
+from catalog_search import RANK_SQL, build_match_query, fold_tr
+from database import fetch_all
+
+
+def _search(db_path, q="", origin=""):
+    rows = fetch_all(
+        db_path,
+        "SELECT p.name FROM products_fts JOIN products p ON p.id = products_fts.rowid"
+        f" WHERE products_fts MATCH ? ORDER BY {RANK_SQL}, p.id DESC",
+        (build_match_query(q, origin),),
+    )
+    return [r["name"] for r in rows]
+
+
+def test_fold_tr_maps_dotless_i():
+    assert fold_tr("Açık Kavrum") == "Açik Kavrum"
+    assert fold_tr(None) == ""
+
+
+def test_build_match_query_prefixes_each_term():
+    assert build_match_query("kol sup") == '"kol"* AND "sup"*'
+    assert build_match_query("", "Kenya") == 'origin : ("Kenya"*)'
+    # Tırnak ve operatörler kelime dışı karakter olarak atılır.
+    assert build_match_query('"kenya" OR -') == '"kenya"* AND "OR"*'
+    assert build_match_query("  ", "") is None
+
+
+def test_case_insensitive_match(db_path):
+    assert _search(db_path, "kenya")[0] == "Kenya AA"
+    assert _search(db_path, "ETIYOPYA")[0] == "Etiyopya Yirgacheffe"
+
+
+def test_dotless_i_matches_both_spellings(db_path):
+    harman = {"Espresso Harmanı", "Filtre Harmanı"}
+    assert set(_search(db_path, "harmanı")) == harman
+    assert set(_search(db_path, "harmani")) == harman
+    assert set(_search(db_path, "HARMANI")) == harman
+
+
+def test_prefix_match(db_path):
+    assert _search(db_path, "kol")[0] == "Kolombiya Supremo"
+    assert _search(db_path, "bre san") == ["Brezilya Santos"]
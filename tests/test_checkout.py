@@ -0,0 +1,66 @@
+import pytest
+
+import checkout
+from checkout import StockShortageError, place_order
+from database import execute, fetch_one
+
+def _count(db_path, table):
+    return fetch_one(db_path, f"SELECT COUNT(*) AS n FROM {table}")["n"]
+
+
+def _stock(db_path, product_id):
+    return fetch_one(db_path, "SELECT stock_gram FROM products WHERE id=?", (product_id,))["stock_gram"]
+
+
+def test_order_decrements_stock(db_path, line, customer):
+    execute(db_path, "UPDATE products SET stock_gram=1000 WHERE id IN (1, 2)")
+    order_id = place_order(db_path, [line(1, qty=2), line(2, gram=500)], customer)
+
+    assert _stock(db_path, 1) == 500
+    assert _stock(db_path, 2) == 500
+    order = fetch_one(db_path, "SELECT total_amount, item_count, total_gram FROM orders WHERE id=?", (order_id,))
+    assert (order["total_amount"], order["item_count"], order["total_gram"]) == (300, 3, 1000)
+    assert _count(db_path, "stock_movements") == 2
+
+
+def test_shortage_rejects_whole_order(db_path, line, customer):
+    execute(db_path, "UPDATE products SET stock_gram=1000 WHERE id=1")
+    execute(db_path, "UPDATE products SET stock_gram=200 WHERE id=2")
+    execute(db_path, "UPDATE products SET is_active=0 WHERE id=3")
+    orders = _count(db_path, "orders")
+
+    with pytest.raises(StockShortageError) as exc:
+        place_order(db_path, [line(1), line(2), line(3), line(99999)], customer)
+
+    reasons = {s["product_id"]: (s["reason"], s["missing_gram"]) for s in exc.value.shortages}
+    assert reasons[2] == ("insufficient", 50)
+    assert reasons[3][0] == "inactive"
+    assert reasons[99999][0] == "missing"
+    assert 1 not in reasons
+    # Yeterli stoklu ürüne de dokunulmaz.
+    assert _stock(db_path, 1) == 1000
+    assert _count(db_path, "orders") == orders
+
+
+def test_same_product_lines_are_summed(db_path, line, customer):
+    execute(db_path, "UPDATE products SET stock_gram=600 WHERE id=1")
+    with pytest.raises(StockShortageError):
+        place_order(db_path, [line(1, gram=500), line(1, gram=250)], customer)
+    assert _stock(db_path, 1) == 600
+
+
+def test_failure_mid_transaction_rolls_back(db_path, monkeypatch, line, customer):
+    execute(db_path, "UPDATE products SET stock_gram=1000 WHERE id=1")
+    orders, items, movements = (_count(db_path, t) for t in ("orders", "order_items", "stock_movements"))
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(checkout, "record_order_sales", broken)
+    with pytest.raises(RuntimeError):
+        place_order(db_path, [line(1)], customer)
+
+    assert _stock(db_path, 1) == 1000
+    assert _count(db_path, "orders") == orders
+    assert _count(db_path, "order_items") == items
+    assert _count(db_path, "stock_movements") == movements
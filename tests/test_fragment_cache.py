@@ -0,0 +1,50 @@
+import pytest
+
+from database import execute, fetch_one
+from fragment_cache import fragment_cache, product_card
+
+
+def _product(db_path):
+    return fetch_one(db_path, "SELECT * FROM products WHERE id=1")
+
+
+def _card(app):
+    with app.test_request_context("/"):
+        return str(product_card(_product(app.config["DB_PATH"])))
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    fragment_cache.clear()
+    yield
+    fragment_cache.clear()
+
+
+def test_stock_and_updated_at_changes_rerender(app):
+    db_path = app.config["DB_PATH"]
+    execute(db_path, "UPDATE products SET stock_gram=1000 WHERE id=1")
+    assert "Stok yok" not in _card(app)
+    assert _card(app) == _card(app)
+    assert fragment_cache.misses == 1
+
+    # Stok updated_at'i değiştirmese de anahtarın parçası.
+    execute(db_path, "UPDATE products SET stock_gram=0 WHERE id=1")
+    assert "Stok yok" in _card(app)
+
+    execute(db_path, "UPDATE products SET name='Yeni Ad' WHERE id=1")
+    assert "Yeni Ad" in _card(app)
+    assert fragment_cache.misses == 3
+
+
+def test_apps_with_different_databases_do_not_share_cards(app, tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "other.db"))
+    from app import create_app
+
+    other = create_app()
+    execute(app.config["DB_PATH"], "UPDATE products SET name='Birinci' WHERE id=1")
+    execute(other.config["DB_PATH"], "UPDATE products SET name='İkinci' WHERE id=1")
+    # updated_at aynı saniyeye düşse de kartlar karışmamalı.
+    execute(other.config["DB_PATH"], "UPDATE products SET updated_at=? WHERE id=1", (_product(app.config["DB_PATH"])["updated_at"],))
+
+    assert "Birinci" in _card(app)
+    assert "İkinci" in _card(other)
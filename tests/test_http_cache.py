@@ -0,0 +1,47 @@
+from catalog_cache import invalidate_catalog
+from database import execute
+from http_cache import release_id
+
+
+def test_unchanged_page_returns_304(client):
+    r = client.get("/product/1")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    assert "private" in r.headers["Cache-Control"]
+
+    r = client.get("/product/1", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.data == b""
+    assert r.headers["ETag"] == etag
+
+
+def test_product_change_invalidates_etag(app, client):
+    etag = client.get("/").headers["ETag"]
+    execute(app.config["DB_PATH"], "UPDATE products SET price_250=price_250+1 WHERE id=1")
+    invalidate_catalog(app.config["DB_PATH"])
+
+    r = client.get("/", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+def test_cart_change_invalidates_etag(client):
+    etag = client.get("/product/1").headers["ETag"]
+    client.post("/cart/add", data={"product_id": 1, "gram": 250, "grind_type": "Türk", "qty": 1})
+    # Flash mesajı bekleyen sayfa ETag'siz render edilir.
+    r = client.get("/product/1", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert "ETag" not in r.headers
+
+    r = client.get("/product/1", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+def test_release_id_is_stable_across_processes(app, monkeypatch):
+    monkeypatch.delenv("RENDER_GIT_COMMIT", raising=False)
+    # Başka bir worker aynı dosyalardan aynı kimliği üretir.
+    assert release_id(app) == app.extensions["release_id"]
+
+    monkeypatch.setenv("RENDER_GIT_COMMIT", "abc123")
+    assert release_id(app) == "abc123"
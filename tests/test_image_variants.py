@@ -0,0 +1,48 @@
+import io
+
+import pytest
+
+from database import execute, fetch_all
+
+pytest.importorskip("PIL")
+
+
+def _png(width=1200, height=800) -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (120, 80, 40)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_variants_are_generated_after_the_request(app, client, tmp_path):
+    app.static_folder = str(tmp_path / "static")
+    data = {
+        "name": "Varyantlı",
+        "roast_type": "Orta",
+        "price_250": "100",
+        "price_500": "190",
+        "price_1000": "350",
+        "stock_gram": "5",
+        "image_file": (io.BytesIO(_png()), "kahve.png"),
+    }
+    assert client.post("/admin/products/new", data=data, content_type="multipart/form-data").status_code == 302
+    db_path = app.config["DB_PATH"]
+    product = fetch_all(db_path, "SELECT id, image_path FROM products WHERE name='Varyantlı'")[0]
+
+    worker = app.extensions["image_variants"]
+    assert worker is not None
+    worker.jobs.join()
+
+    rows = fetch_all(db_path, "SELECT width, format FROM image_variants WHERE image_path=?", (product["image_path"],))
+    assert {(r["width"], r["format"]) for r in rows} >= {(320, "webp"), (640, "jpeg")}
+    html = client.get(f"/product/{product['id']}").get_data(as_text=True)
+    assert "srcset=" in html
+
+
+def test_page_falls_back_to_original_until_variants_exist(app, client):
+    db_path = app.config["DB_PATH"]
+    execute(db_path, "DELETE FROM image_variants")
+    execute(db_path, "UPDATE products SET image_path='images/yok.png' WHERE id=1")
+    html = client.get("/product/1").get_data(as_text=True)
+    assert 'src="/static/images/yok.png' in html
@@ -0,0 +1,128 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from database import fetch_all, fetch_one, init_db
+from migrations import LATEST_VERSION, IrreversibleMigrationError, migrate, rollback
+
+# Migration sisteminden önceki init_db'nin ürettiği şema (user_version = 0).
+LEGACY_SCHEMA = """
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, description TEXT,
+        roast_type TEXT NOT NULL, price_250 REAL NOT NULL, price_500 REAL NOT NULL,
+        price_1000 REAL NOT NULL, stock_gram INTEGER NOT NULL DEFAULT 0,
+        image_path TEXT, is_active INTEGER NOT NULL DEFAULT 1
+    );
+    CREATE TABLE orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, customer_name TEXT NOT NULL,
+        customer_phone TEXT NOT NULL, status TEXT NOT NULL, created_at TEXT NOT NULL,
+        delivery_type TEXT NOT NULL DEFAULT 'pickup', address TEXT, note TEXT
+    );
+    CREATE TABLE order_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, order_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL, grind_type TEXT NOT NULL, gram INTEGER NOT NULL,
+        price REAL NOT NULL
+    );
+"""
+LEGACY_PRODUCT = """
+    INSERT INTO products (name, roast_type, price_250, price_500, price_1000, stock_gram)
+    VALUES ('Eski Kahve', 'Orta', 100, 190, 350, 5000);
+"""
+
+
+def _tables(db_path):
+    return {r["name"] for r in fetch_all(db_path, "SELECT name FROM sqlite_master WHERE type='table'")}
+
+
+def _user_version(db_path):
+    return fetch_one(db_path, "PRAGMA user_version")[0]
+
+
+def test_upgrade_from_baseline(tmp_path):
+    db_path = str(tmp_path / "baseline.db")
+    assert migrate(db_path, target=1) == [1]
+    assert _user_version(db_path) == 1
+    assert "carts" not in _tables(db_path)
+    products = fetch_one(db_path, "SELECT COUNT(*) AS n FROM products")["n"]
+
+    assert migrate(db_path) == list(range(2, LATEST_VERSION + 1))
+    assert _user_version(db_path) == LATEST_VERSION
+    assert {"stock_reservations", "carts", "image_variants", "upload_jobs"} <= _tables(db_path)
+    assert [r["version"] for r in fetch_all(db_path, "SELECT version FROM schema_migrations ORDER BY version")] == list(
+        range(1, LATEST_VERSION + 1)
+    )
+    # Veri korunur; ikinci çalıştırma hiçbir şey yapmaz.
+    assert fetch_one(db_path, "SELECT COUNT(*) AS n FROM products")["n"] == products
+    assert migrate(db_path) == []
+
+
+def test_upgrade_from_pre_migration_schema(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        LEGACY_SCHEMA
+        + LEGACY_PRODUCT
+        + """
+        INSERT INTO orders (customer_name, customer_phone, status, created_at)
+        VALUES ('Ali', '05321234567', 'alındı', '2024-01-01 10:00:00');
+        INSERT INTO order_items (order_id, product_id, grind_type, gram, price) VALUES (1, 1, 'Türk', 250, 100);
+        INSERT INTO order_items (order_id, product_id, grind_type, gram, price) VALUES (1, 1, 'Filtre', 500, 190);
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    assert migrate(db_path) == list(range(1, LATEST_VERSION + 1))
+    product = fetch_one(db_path, "SELECT name, updated_at FROM products WHERE id=1")
+    assert product["name"] == "Eski Kahve"
+    assert product["updated_at"]
+    # Boş olmayan veritabanına örnek ürün eklenmez.
+    assert fetch_one(db_path, "SELECT COUNT(*) AS n FROM products")["n"] == 1
+    assert fetch_one(db_path, "SELECT total_amount FROM orders WHERE id=1")["total_amount"] == 290
+    # FTS dizini mevcut ürünlerle doldurulur.
+    assert fetch_all(db_path, "SELECT rowid FROM products_fts WHERE products_fts MATCH 'eski'")
+
+
+def test_baseline_collapses_per_unit_order_items(tmp_path):
+    # quantity kolonundan önce her adet ayrı satır olarak yazılıyordu.
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        LEGACY_SCHEMA
+        + LEGACY_PRODUCT
+        + """
+        INSERT INTO orders (customer_name, customer_phone, status, created_at)
+        VALUES ('Ali', '05321234567', 'alındı', '2024-01-01 10:00:00'),
+               ('Ayşe', '05331234567', 'hazır', '2024-01-02 10:00:00');
+        INSERT INTO order_items (order_id, product_id, grind_type, gram, price) VALUES
+            (1, 1, 'Türk', 250, 100), (1, 1, 'Türk', 250, 100), (1, 1, 'Filtre', 500, 190),
+            (1, 1, 'Türk', 250, 100), (2, 1, 'Türk', 250, 100), (2, 1, 'Türk', 250, 100);
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    migrate(db_path, target=1)
+
+    items = fetch_all(db_path, "SELECT id, order_id, grind_type, quantity FROM order_items ORDER BY id")
+    assert [tuple(r) for r in items] == [(1, 1, "Türk", 3), (3, 1, "Filtre", 1), (5, 2, "Türk", 2)]
+    totals = fetch_all(db_path, "SELECT total_amount, item_count, total_gram FROM orders ORDER BY id")
+    assert [tuple(r) for r in totals] == [(490, 4, 1250), (200, 2, 500)]
+
+
+def test_rollback_stops_before_irreversible_baseline(db_path):
+    assert rollback(db_path, 1) == list(range(LATEST_VERSION, 1, -1))
+    assert _user_version(db_path) == 1
+    assert "stock_reservations" not in _tables(db_path)
+
+    with pytest.raises(IrreversibleMigrationError):
+        rollback(db_path, 0)
+    assert _user_version(db_path) == 1
+
+
+def test_current_schema_skips_journal_mode(db_path, monkeypatch):
+    assert fetch_one(db_path, "PRAGMA journal_mode")[0] == "wal"
+    monkeypatch.setattr(migrations, "apply_journal_mode", lambda *a: pytest.fail("şema güncelken uygulanmamalı"))
+
+    assert init_db(db_path) == []
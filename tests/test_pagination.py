@@ -0,0 +1,64 @@
+import base64
+
+import pytest
+
+from database import execute_many
+from pagination import InvalidCursorError, decode_cursor, encode_cursor, fetch_keyset_page
+
+SELECT_ORDERS = "SELECT id, created_at FROM orders"
+
+
+@pytest.fixture
+def orders(db_path):
+    # Aynı saniyede verilen siparişler: sıra id ile belirlenir.
+    execute_many(
+        db_path,
+        "INSERT INTO orders (customer_name, customer_phone, status, created_at) VALUES ('Ali', '05321234567', 'alındı', ?)",
+        [("2024-01-01 10:00:00",)] * 5 + [("2024-01-02 10:00:00",)] * 2,
+    )
+    return db_path
+
+
+def _page(db_path, after=None, before=None):
+    return fetch_keyset_page(db_path, SELECT_ORDERS, [], [], "created_at", "id", after=after, before=before, limit=3)
+
+
+def _ids(page):
+    return [r["id"] for r in page.rows]
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor("2024-01-01 10:00:00", 42)) == ("2024-01-01 10:00:00", 42)
+    assert decode_cursor("") is None
+
+
+def test_pages_forward_and_back_across_equal_timestamps(orders):
+    first = _page(orders)
+    assert _ids(first) == [7, 6, 5]
+    assert first.prev_cursor is None
+
+    second = _page(orders, after=first.next_cursor)
+    assert _ids(second) == [4, 3, 2]
+    third = _page(orders, after=second.next_cursor)
+    assert _ids(third) == [1]
+    assert third.next_cursor is None
+
+    back = _page(orders, before=third.prev_cursor)
+    assert _ids(back) == [4, 3, 2]
+    assert _ids(_page(orders, before=back.prev_cursor)) == [7, 6, 5]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "bozuk!!",
+        base64.urlsafe_b64encode(b"2024-01-01 10:00:00|abc").decode(),
+        base64.urlsafe_b64encode(b"' OR 1=1 --|5").decode(),
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    ],
+)
+def test_invalid_cursor(client, cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+    assert client.get("/admin/orders", query_string={"after": cursor}).status_code == 400
+    assert client.get("/admin/stock-movements", query_string={"before": cursor}).status_code == 400
@@ -0,0 +1,16 @@
+from query_plans import check_plans
+
+
+def test_hot_queries_use_indexes_without_temp_sort(db_path):
+    failures = {name: plan for name, plan, ok in check_plans(db_path) if not ok}
+    assert failures == {}
+
+
+def test_temp_btree_sort_is_flagged(db_path, monkeypatch):
+    monkeypatch.setattr(
+        "query_plans.plan_checks",
+        lambda: [("sıralı", "SELECT * FROM orders WHERE status IN (?, ?) ORDER BY created_at DESC", ("a", "b"))],
+    )
+    [(_name, plan, ok)] = check_plans(db_path)
+    assert "USE TEMP B-TREE FOR ORDER BY" in plan
+    assert not ok
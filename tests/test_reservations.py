@@ -0,0 +1,67 @@
+import pytest
+
+from checkout import StockShortageError, place_order
+from database import execute, fetch_all, fetch_one
+from reservations import held_grams_by_product, reserve, sweep_expired
+
+PAST = "2000-01-01 00:00:00"
+
+
+def _holds(db_path):
+    return fetch_all(db_path, "SELECT holder, product_id, gram FROM stock_reservations ORDER BY id")
+
+
+@pytest.fixture
+def stocked(db_path):
+    execute(db_path, "UPDATE products SET stock_gram=1000 WHERE id=1")
+    return db_path
+
+
+def test_hold_blocks_other_carts_but_not_owner(stocked, line, customer):
+    assert reserve(stocked, "a", {1: 750}) == []
+
+    with pytest.raises(StockShortageError) as exc:
+        place_order(stocked, [line(1, 500)], customer, holder="b")
+    assert exc.value.shortages[0]["held_gram"] == 750
+
+    place_order(stocked, [line(1, 250, qty=3)], customer, holder="a")
+    # Ayırma sipariş transaction'ında silinir.
+    assert _holds(stocked) == []
+    assert fetch_one(stocked, "SELECT stock_gram FROM products WHERE id=1")["stock_gram"] == 250
+
+
+def test_partial_hold_reports_shortage(stocked):
+    reserve(stocked, "a", {1: 750})
+    shortages = reserve(stocked, "b", {1: 500})
+    assert shortages[0]["available_gram"] == 250
+    assert [(h["holder"], h["gram"]) for h in _holds(stocked)] == [("a", 750), ("b", 250)]
+
+
+def test_rereserve_replaces_owner_holds(stocked):
+    reserve(stocked, "a", {1: 750})
+    reserve(stocked, "a", {1: 250})
+    assert [(h["holder"], h["gram"]) for h in _holds(stocked)] == [("a", 250)]
+
+
+def test_expired_hold_is_ignored_and_reaped(stocked, line, customer):
+    reserve(stocked, "a", {1: 750})
+    reserve(stocked, "b", {1: 100})
+    execute(stocked, "UPDATE stock_reservations SET expires_at=? WHERE holder='a'", (PAST,))
+
+    assert held_grams_by_product(stocked) == {1: 100}
+    place_order(stocked, [line(1, 500)], customer, holder="c")
+
+    assert sweep_expired(stocked) == 1
+    assert [h["holder"] for h in _holds(stocked)] == ["b"]
+    assert sweep_expired(stocked) == 0
+
+
+def test_viewer_does_not_see_own_hold_as_taken(stocked):
+    reserve(stocked, "a", {1: 750})
+    reserve(stocked, "b", {1: 100})
+
+    assert held_grams_by_product(stocked) == {1: 850}
+    assert held_grams_by_product(stocked, "a") == {1: 100}
+    assert held_grams_by_product(stocked, "b") == {1: 750}
+    # Ortak özet düzeltmeden etkilenmez.
+    assert held_grams_by_product(stocked) == {1: 850}
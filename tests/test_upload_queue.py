@@ -0,0 +1,133 @@
+import os
+
+import upload_queue
+from database import execute, fetch_one
+
+
+class FailingUploader(upload_queue.LocalUploader):
+    """İlk `fail_times` çağrıda ağ hatası veren yerel yükleyici."""
+
+    def __init__(self, static_folder: str, fail_times: int):
+        super().__init__(static_folder)
+        self.fail_times = fail_times
+        self.calls = 0
+
+    def upload(self, file_path: str) -> dict:
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            raise ConnectionError("yapay hata")
+        return super().upload(file_path)
+
+
+def _local_image(static_folder, rel_path="images/test.png"):
+    target = os.path.join(static_folder, rel_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + b"\0" * 64)
+    return rel_path
+
+
+def test_failed_upload_is_retried_and_swaps_image_path(db_path, tmp_path):
+    static_folder = str(tmp_path / "static")
+    rel_path = _local_image(static_folder)
+    execute(db_path, "UPDATE products SET image_path=? WHERE id=1", (rel_path,))
+    uploader = FailingUploader(static_folder, fail_times=1)
+
+    upload_queue.enqueue(db_path, [rel_path])
+    assert upload_queue.run_pending(db_path, static_folder, uploader) == 0
+    job = fetch_one(db_path, "SELECT status, attempts, last_error FROM upload_jobs")
+    assert (job["status"], job["attempts"]) == ("pending", 1)
+    assert "yapay hata" in job["last_error"]
+
+    # Bekleme süresini atla.
+    execute(db_path, "UPDATE upload_jobs SET next_attempt_at='2000-01-01 00:00:00'")
+    assert upload_queue.run_pending(db_path, static_folder, uploader) == 1
+    job = fetch_one(db_path, "SELECT status, attempts, result_url FROM upload_jobs")
+    assert (job["status"], job["attempts"]) == ("done", 2)
+    assert fetch_one(db_path, "SELECT image_path FROM products WHERE id=1")["image_path"] == job["result_url"]
+
+
+def test_job_fails_after_max_attempts(db_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_queue, "UPLOAD_MAX_ATTEMPTS", 2)
+    static_folder = str(tmp_path / "static")
+    rel_path = _local_image(static_folder)
+    uploader = FailingUploader(static_folder, fail_times=10)
+
+    upload_queue.enqueue(db_path, [rel_path])
+    for _ in range(2):
+        upload_queue.run_pending(db_path, static_folder, uploader)
+        execute(db_path, "UPDATE upload_jobs SET next_attempt_at='2000-01-01 00:00:00'")
+    assert fetch_one(db_path, "SELECT status FROM upload_jobs")["status"] == "failed"
+
+
+def test_done_upload_is_reused_for_same_path(db_path, tmp_path):
+    static_folder = str(tmp_path / "static")
+    rel_path = _local_image(static_folder)
+    upload_queue.enqueue(db_path, [rel_path])
+    upload_queue.run_pending(db_path, static_folder, upload_queue.LocalUploader(static_folder))
+    url = fetch_one(db_path, "SELECT result_url FROM upload_jobs")["result_url"]
+
+    execute(db_path, "UPDATE products SET image_path=? WHERE id=2", (rel_path,))
+    upload_queue.enqueue(db_path, [rel_path])
+    assert fetch_one(db_path, "SELECT image_path FROM products WHERE id=2")["image_path"] == url
+    assert fetch_one(db_path, "SELECT COUNT(*) AS n FROM upload_jobs")["n"] == 1
+
+
+def test_make_uploader_reads_dotenv_only_when_needed(tmp_path, monkeypatch):
+    monkeypatch.delenv("UPLOAD_BACKEND", raising=False)
+    monkeypatch.delenv("CLOUDINARY_CLOUD_NAME", raising=False)
+    monkeypatch.setattr(upload_queue, "has_env_file", lambda: True)
+    loads = []
+
+    def load_env():
+        # .env'den gelen değer yalnızca load_env çağrılınca görünür.
+        loads.append(1)
+        monkeypatch.setenv("CLOUDINARY_CLOUD_NAME", "demo")
+
+    monkeypatch.setattr(upload_queue, "load_env", load_env)
+    assert isinstance(upload_queue.make_uploader(str(tmp_path), "local"), upload_queue.LocalUploader)
+    assert loads == []
+
+    assert isinstance(upload_queue.make_uploader(str(tmp_path)), upload_queue.CloudinaryUploader)
+    assert loads == [1]
+
+
+def test_edit_form_renders_cdn_urls_as_is(app, client):
+    db_path = app.config["DB_PATH"]
+    url = "https://res.cloudinary.com/demo/image/upload/v1/kahve/abc.png"
+    execute(db_path, "UPDATE products SET image_path=? WHERE id=1", (url,))
+    execute(
+        db_path,
+        "INSERT INTO product_images (product_id, image_path, sort_order, created_at) VALUES (1, ?, 1, '2024-01-01 00:00:00')",
+        (url,),
+    )
+    html = client.get("/admin/products/1/edit").get_data(as_text=True)
+    assert f'src="{url}"' in html
+    assert "/static/https" not in html
+
+
+def _edit_form(**overrides):
+    form = {
+        "name": "Kenya AA",
+        "roast_type": "Orta",
+        "price_250": "100",
+        "price_500": "190",
+        "price_1000": "350",
+        "stock_gram": "5",
+    }
+    form.update(overrides)
+    return form
+
+
+def test_stale_edit_form_keeps_swapped_cdn_url(app, client):
+    db_path = app.config["DB_PATH"]
+    url = "https://res.cloudinary.com/demo/image/upload/v1/kahve/abc.png"
+    # Form yerel yolla açıldı, bu sırada yükleme bitip adres değişti.
+    execute(db_path, "UPDATE products SET image_path=? WHERE id=1", (url,))
+    form = _edit_form(image_path="images/eski.png", image_path_original="images/eski.png")
+    assert client.post("/admin/products/1/edit", data=form).status_code == 302
+    assert fetch_one(db_path, "SELECT image_path FROM products WHERE id=1")["image_path"] == url
+
+    form = _edit_form(image_path="images/yeni.png", image_path_original=url)
+    client.post("/admin/products/1/edit", data=form)
+    assert fetch_one(db_path, "SELECT image_path FROM products WHERE id=1")["image_path"] == "images/yeni.png"
@@ -0,0 +1,285 @@
+"""
+Görsellerin CDN'e (Cloudinary) arka planda yüklenmesi
+
+Admin route'ları yüklenen dosyayı yerelde kaydedip kuyruğa ekler ve hemen
+döner; ürün o sırada yerel adresle gösterilir. Arka plandaki thread işi
+SQLite'taki upload_jobs tablosundan alır, hata olursa artan beklemeyle
+tekrar dener, başarılı olunca image_path'leri CDN adresiyle değiştirir.
+
+UPLOAD_BACKEND:
+    cloudinary  CLOUDINARY_* ortam değişkenleriyle gerçek yükleme
+    local       Ağ olmadan deneme: dosyayı static/images/cdn altına kopyalayıp
+                Cloudinary yanıtı biçiminde sonuç döner
+    (boş)       CLOUDINARY_CLOUD_NAME (ortamda ya da .env'de) tanımlıysa cloudinary,
+                değilse kuyruk kapalı
+
+Kullanım:
+    python upload_queue.py status
+    python upload_queue.py retry     # başarısız işleri tekrar kuyruğa alır
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from flask import current_app
+
+from catalog_cache import invalidate_catalog
+from cloudinary_config import has_env_file, load_env
+from database import TIMESTAMP_FORMAT, UPDATED_AT_SQL, fetch_all, get_db_path, now_str, transaction, tr_now
+
+
+UPLOAD_BACKEND = os.environ.get("UPLOAD_BACKEND", "")
+UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", "kahve")
+UPLOAD_MAX_ATTEMPTS = int(os.environ.get("UPLOAD_MAX_ATTEMPTS", "5"))
+UPLOAD_BACKOFF = 5.0  # saniye; her denemede ikiye katlanır
+# "running" durumunda bu kadar kalan iş, worker'ı ölmüş sayılıp tekrar alınır.
+UPLOAD_LEASE = 300
+POLL_INTERVAL = 5.0
+
+
+class CloudinaryUploader:
+    """cloudinary.uploader.upload; hata durumunda exception yükselir (tekrar denensin diye)."""
+
+    def __init__(self, folder: str = UPLOAD_FOLDER):
+        self.folder = folder
+        self._configured = False
+
+    def upload(self, file_path: str) -> dict:
+        # SDK ve .env ilk gerçek yüklemede yüklenir; açılışa maliyeti yok.
+        if not self._configured:
+            from cloudinary_config import init_cloudinary
+
+            init_cloudinary()
+            self._configured = True
+        from cloudinary.uploader import upload
+
+        return upload(file_path, folder=self.folder, resource_type="image")
+
+
+class LocalUploader:
+    """Cloudinary yerine geçen yerel yükleyici; yanıt biçimi aynıdır."""
+
+    def __init__(self, static_folder: str, folder: str = UPLOAD_FOLDER):
+        self.static_folder = static_folder
+        self.folder = folder
+
+    def upload(self, file_path: str) -> dict:
+        public_id = f"{self.folder}/{uuid.uuid4().hex[:20]}"
+        ext = os.path.splitext(file_path)[1].lstrip(".").lower() or "jpg"
+        rel_path = f"images/cdn/{public_id}.{ext}"
+        target = os.path.join(self.static_folder, rel_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(file_path, target)
+        version = int(time.time())
+        return {
+            "public_id": public_id,
+            "version": version,
+            "format": ext,
+            "resource_type": "image",
+            "bytes": os.path.getsize(target),
+            "created_at": now_str(),
+            "url": f"/static/{rel_path}",
+            "secure_url": f"/static/{rel_path}",
+        }
+
+
+def make_uploader(static_folder: str, backend: str | None = None):
+    if backend is None:
+        backend = os.environ.get("UPLOAD_BACKEND", UPLOAD_BACKEND)
+    if not backend and not os.environ.get("CLOUDINARY_CLOUD_NAME") and has_env_file():
+        # Ayarlar yalnızca .env'de olabilir; dotenv yalnızca seçim için gerekince yüklenir.
+        load_env()
+        backend = os.environ.get("UPLOAD_BACKEND", "")
+    if not backend:
+        backend = "cloudinary" if os.environ.get("CLOUDINARY_CLOUD_NAME") else ""
+    if backend == "cloudinary":
+        return CloudinaryUploader()
+    if backend == "local":
+        return LocalUploader(static_folder)
+    return None
+
+
+def _after(seconds: float) -> str:
+    return (tr_now() + timedelta(seconds=seconds)).strftime(TIMESTAMP_FORMAT)
+
+
+def enqueue(db_path: str, local_paths: list[str]) -> list[int]:
+    """Yerel görselleri kuyruğa ekler; aynı dosya için bekleyen iş varsa yenisi açılmaz.
+
+    Dosya daha önce yüklenmişse (içerik adresli yollar aynı kalır) CDN adresi hemen uygulanır.
+    """
+    job_ids = []
+    with transaction(db_path) as cur:
+        for local_path in dict.fromkeys(local_paths):
+            cur.execute(
+                """
+                SELECT id, status, result_url FROM upload_jobs
+                WHERE local_path=? AND status IN ('pending', 'running', 'done')
+                ORDER BY id DESC LIMIT 1
+                """,
+                (local_path,),
+            )
+            existing = cur.fetchone()
+            if existing and existing["status"] == "done":
+                _swap_image_path(cur, local_path, existing["result_url"])
+                continue
+            if existing:
+                job_ids.append(int(existing["id"]))
+                continue
+            created_at = now_str()
+            cur.execute(
+                """
+                INSERT INTO upload_jobs (local_path, status, attempts, next_attempt_at, created_at, updated_at)
+                VALUES (?, 'pending', 0, ?, ?, ?)
+                """,
+                (local_path, created_at, created_at, created_at),
+            )
+            job_ids.append(int(cur.lastrowid))
+    return job_ids
+
+
+def _swap_image_path(cur, local_path: str, url: str):
+    # products üzerindeki trigger updated_at'i kendisi günceller; galeri için elle dokunulur.
+    cur.execute("UPDATE products SET image_path=? WHERE image_path=?", (url, local_path))
+    cur.execute(
+        f"""
+        UPDATE products SET updated_at = {UPDATED_AT_SQL}
+        WHERE id IN (SELECT product_id FROM product_images WHERE image_path=?)
+        """,
+        (local_path,),
+    )
+    cur.execute("UPDATE product_images SET image_path=? WHERE image_path=?", (url, local_path))
+
+
+def claim_job(db_path: str):
+    now = now_str()
+    lease_expired = (tr_now() - timedelta(seconds=UPLOAD_LEASE)).strftime(TIMESTAMP_FORMAT)
+    with transaction(db_path) as cur:
+        cur.execute(
+            """
+            SELECT id, local_path, attempts FROM upload_jobs
+            WHERE (status='pending' AND next_attempt_at <= ?)
+               OR (status='running' AND updated_at < ?)
+            ORDER BY next_attempt_at, id
+            LIMIT 1
+            """,
+            (now, lease_expired),
+        )
+        job = cur.fetchone()
+        if job is None:
+            return None
+        cur.execute(
+            "UPDATE upload_jobs SET status='running', attempts=attempts+1, updated_at=? WHERE id=?",
+            (now, job["id"]),
+        )
+        return {"id": int(job["id"]), "local_path": job["local_path"], "attempts": int(job["attempts"]) + 1}
+
+
+def run_job(db_path: str, static_folder: str, uploader, job: dict) -> bool:
+    try:
+        result = uploader.upload(os.path.join(static_folder, job["local_path"]))
+        url = result["secure_url"]
+    except Exception as e:
+        failed = job["attempts"] >= UPLOAD_MAX_ATTEMPTS
+        delay = UPLOAD_BACKOFF * (2 ** (job["attempts"] - 1)) * random.uniform(0.5, 1.5)
+        with transaction(db_path) as cur:
+            cur.execute(
+                "UPDATE upload_jobs SET status=?, last_error=?, next_attempt_at=?, updated_at=? WHERE id=?",
+                ("failed" if failed else "pending", str(e)[:500], _after(delay), now_str(), job["id"]),
+            )
+        print(f"CDN yükleme hatası ({job['local_path']}, deneme {job['attempts']}): {e}")
+        return False
+
+    with transaction(db_path) as cur:
+        cur.execute(
+            "UPDATE upload_jobs SET status='done', result_url=?, last_error=NULL, updated_at=? WHERE id=?",
+            (url, now_str(), job["id"]),
+        )
+        _swap_image_path(cur, job["local_path"], url)
+    invalidate_catalog(db_path)
+    return True
+
+
+def run_pending(db_path: str, static_folder: str, uploader) -> int:
+    """Zamanı gelmiş tüm işleri sırayla çalıştırır; başarılı olanların sayısını döner."""
+    done = 0
+    while True:
+        job = claim_job(db_path)
+        if job is None:
+            return done
+        done += 1 if run_job(db_path, static_folder, uploader, job) else 0
+
+
+class UploadWorker:
+    def __init__(self, db_path: str, static_folder: str, uploader, poll_interval: float = POLL_INTERVAL):
+        self.db_path = db_path
+        self.static_folder = static_folder
+        self.uploader = uploader
+        self.poll_interval = poll_interval
+        self.wakeup = threading.Event()
+        self.pid = os.getpid()
+        self.thread = threading.Thread(target=self._loop, name="upload-queue-worker", daemon=True)
+
+    def _loop(self):
+        while True:
+            try:
+                run_pending(self.db_path, self.static_folder, self.uploader)
+            except Exception as e:
+                print(f"Yükleme kuyruğu hatası: {e}")
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+
+    def alive(self) -> bool:
+        # fork sonrası parent'ın thread'i child'da çalışmaz.
+        return self.pid == os.getpid() and self.thread.is_alive()
+
+
+def init_upload_queue(app, uploader=None):
+    if uploader is None:
+        uploader = make_uploader(app.static_folder)
+    app.extensions["upload_queue"] = None
+    if uploader is None:
+        return
+    worker = UploadWorker(app.config["DB_PATH"], app.static_folder, uploader)
+    worker.thread.start()
+    app.extensions["upload_queue"] = worker
+
+
+def enqueue_uploads(local_paths: list[str]):
+    """Admin route'larından çağrılır; kuyruk kapalıysa görseller yerelde kalır."""
+    worker = current_app.extensions.get("upload_queue")
+    if worker is None or not local_paths:
+        return
+    enqueue(current_app.config["DB_PATH"], local_paths)
+    if not worker.alive():
+        worker = UploadWorker(worker.db_path, worker.static_folder, worker.uploader)
+        worker.thread.start()
+        current_app.extensions["upload_queue"] = worker
+    worker.wakeup.set()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    db_path = get_db_path(os.environ.get("DB_PATH"))
+    if command == "status":
+        for r in fetch_all(db_path, "SELECT status, COUNT(*) AS c FROM upload_jobs GROUP BY status ORDER BY status"):
+            print(f"{r['status']}: {r['c']}")
+    elif command == "retry":
+        with transaction(db_path) as cur:
+            cur.execute(
+                "UPDATE upload_jobs SET status='pending', attempts=0, next_attempt_at=?, updated_at=? "
+                "WHERE status='failed'",
+                (now_str(), now_str()),
+            )
+            print(f"Tekrar kuyruğa alındı: {cur.rowcount}")
+    else:
+        print("Kullanım: python upload_queue.py status|retry")
+        sys.exit(1)
@@ -0,0 +1,161 @@
+"""
+İçerik adresli görsel yükleme: dosya adı içeriğin sha256 özetidir
+
+Aynı görsel kaç kez yüklenirse yüklensin diskte tek kopya tutulur ve
+bir adresin içeriği hiç değişmez; bu yüzden yüklemeler bir yıl (immutable)
+cache'lenebilir. Dosyalar parça parça okunup yazılır, belleğe alınmaz.
+
+Kullanım:
+    python upload_store.py gc     # hiçbir üründe kullanılmayan dosyaları siler
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+from flask import request
+from werkzeug.utils import secure_filename
+
+from database import fetch_all, get_db_path
+
+
+UPLOAD_PREFIX = "images/cas"
+CHUNK_SIZE = 64 * 1024
+UPLOAD_MAX_AGE = 365 * 24 * 60 * 60
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif"}
+# gc, bu süreden yeni dosyalara dokunmaz (kaydı henüz yazılmamış yüklemeler).
+GC_MIN_AGE = 24 * 60 * 60
+
+
+class UnsupportedImageError(ValueError):
+    """Yüklenen dosya izin verilen görsel türlerinden değil."""
+
+
+def _extension(filename: str) -> str:
+    ext = os.path.splitext(secure_filename(filename or ""))[1].lower()
+    if ext == ".jpeg":
+        ext = ".jpg"
+    return ext if ext in ALLOWED_EXTENSIONS else ""
+
+
+def sniff_image(head: bytes) -> str:
+    """Dosyanın ilk baytlarından görsel türünün uzantısı; tanınmıyorsa boş."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return ".gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[4:8] == b"ftyp":
+        # Ana marka ve uyumlu markalar ftyp kutusunun içinde.
+        box = head[8 : int.from_bytes(head[:4], "big")]
+        brands = {box[i : i + 4] for i in range(0, len(box), 4)}
+        if brands & {b"avif", b"avis"}:
+            return ".avif"
+    return ""
+
+
+def content_path(digest: str, ext: str) -> str:
+    # İlk iki bayta göre iki seviyeli klasör; tek klasörde binlerce dosya birikmez.
+    return f"{UPLOAD_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def save_upload(file, static_folder: str) -> str:
+    """Yüklenen dosyayı kaydeder; static'e göre göreli yolunu döner.
+
+    Uzantısı ya da içeriği izin verilen görsel türlerinden değilse hiçbir
+    şey yazmadan UnsupportedImageError verir. Dosya, içeriğinden anlaşılan
+    türün uzantısıyla saklanır.
+    """
+    head = file.stream.read(CHUNK_SIZE)
+    ext = sniff_image(head)
+    if not _extension(file.filename) or not ext:
+        raise UnsupportedImageError(f"Desteklenmeyen görsel dosyası: {file.filename} (JPEG, PNG, WebP, GIF ya da AVIF olmalı)")
+
+    root = os.path.join(static_folder, UPLOAD_PREFIX)
+    os.makedirs(root, exist_ok=True)
+
+    digest = hashlib.sha256()
+    # Özet belli olmadan hedef yol bilinmez; önce aynı diskteki geçici dosyaya yazılır.
+    fd, tmp_path = tempfile.mkstemp(dir=root, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            chunk = head
+            while chunk:
+                digest.update(chunk)
+                out.write(chunk)
+                chunk = file.stream.read(CHUNK_SIZE)
+
+        rel_path = content_path(digest.hexdigest(), ext)
+        full_path = os.path.join(static_folder, rel_path)
+        if os.path.exists(full_path):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(tmp_path, full_path)
+        return rel_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def is_content_addressed(image_path: str | None) -> bool:
+    return bool(image_path) and image_path.startswith(UPLOAD_PREFIX + "/")
+
+
+def init_upload_store(app):
+    @app.after_request
+    def cache_content_addressed(response):
+        if request.endpoint != "static" or response.status_code != 200:
+            return response
+        if is_content_addressed((request.view_args or {}).get("filename")):
+            response.cache_control.public = True
+            response.cache_control.max_age = UPLOAD_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
+
+
+def collect_garbage(db_path: str, static_folder: str, min_age: float = GC_MIN_AGE) -> int:
+    rows = fetch_all(
+        db_path,
+        """
+        SELECT image_path FROM products WHERE image_path LIKE ?
+        UNION
+        SELECT image_path FROM product_images WHERE image_path LIKE ?
+        """,
+        (UPLOAD_PREFIX + "/%", UPLOAD_PREFIX + "/%"),
+    )
+    referenced = {r["image_path"] for r in rows}
+    root = os.path.join(static_folder, UPLOAD_PREFIX)
+    cutoff = time.time() - min_age
+
+    removed = 0
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            full_path = os.path.join(dirpath, name)
+            rel_path = os.path.relpath(full_path, static_folder).replace(os.sep, "/")
+            if rel_path in referenced or os.path.getmtime(full_path) > cutoff:
+                continue
+            os.unlink(full_path)
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "gc"
+    if command != "gc":
+        print("Kullanım: python upload_store.py gc")
+        sys.exit(1)
+
+    db_path = get_db_path(os.environ.get("DB_PATH"))
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "static")
+    n = collect_garbage(db_path, static_folder)
+    print(f"Kullanılmayan yükleme silindi: {n}")